@@ -0,0 +1,236 @@
+"""Per-ASIN sentiment aggregates, maintained incrementally at ingest time.
+
+``ProductAggregates`` keeps overall sentiment counts plus per-date and
+per-country buckets, so the read endpoints cost O(buckets) instead of a scan
+over every stored review.
+
+It also keeps trend rollups of the ISO-dated reviews by day, ISO week
+("2024-W05") and month ("2024-03"). Each rollup bucket holds sentiment counts
+and the confidence sum in integer millionths (so incremental and rebuilt sums
+agree exactly); ``trend()`` slices one granularity by date range and adds
+rolling positive-rate and mean-confidence windows.
+"""
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from review_dates import date_sort_key, normalize_date
+
+SENTIMENTS = ("POSITIVE", "NEUTRAL", "NEGATIVE")
+GRANULARITIES = ("day", "week", "month")
+# Rolling window (in periods) used when the caller doesn't give one
+DEFAULT_WINDOWS = {"day": 7, "week": 4, "month": 3}
+CONFIDENCE_SCALE = 1_000_000
+CONFIDENCE_KEY = "confidence_micros"
+
+
+@lru_cache(maxsize=65536)
+def periods_of(day: str) -> Optional[Tuple[str, str, str]]:
+    """``(day, week, month)`` period labels of an ISO day label, or None if it isn't a date."""
+    try:
+        d = date.fromisoformat(day)
+    except ValueError:
+        return None
+    if d.isoformat() != day:
+        return None
+    year, week, _ = d.isocalendar()
+    return day, f"{year}-W{week:02d}", day[:7]
+
+
+def period_index(label: str, granularity: str) -> int:
+    """Consecutive integer index of a period label, for calendar-aware rolling windows."""
+    if granularity == "day":
+        return date.fromisoformat(label).toordinal()
+    if granularity == "week":
+        year, week = label.split("-W")
+        return date.fromisocalendar(int(year), int(week), 1).toordinal() // 7
+    year, month = label.split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def confidence_micros(confidence: float) -> int:
+    return round(confidence * CONFIDENCE_SCALE)
+
+
+def _empty_bucket() -> Dict[str, int]:
+    return {s: 0 for s in SENTIMENTS}
+
+
+class ProductAggregates:
+    def __init__(self):
+        self.review_count = 0
+        self.counts: Dict[str, int] = _empty_bucket()
+        self.by_date: Dict[str, Dict[str, int]] = {}
+        self.by_country: Dict[Optional[str], Dict[str, int]] = {}
+        # granularity -> period -> {sentiment: n, ..., CONFIDENCE_KEY: micros}
+        self.rollups: Dict[str, Dict[str, Dict[str, int]]] = {g: {} for g in GRANULARITIES}
+
+    @classmethod
+    def from_results(cls, results: Iterable[Dict[str, Any]]) -> "ProductAggregates":
+        agg = cls()
+        agg.add(results)
+        return agg
+
+    def add(self, results: Iterable[Dict[str, Any]]) -> None:
+        for r in results:
+            self.review_count += 1
+            s = r.get("sentiment", "NEUTRAL")
+            if s in self.counts:
+                self.counts[s] += 1
+            # "day" is the normalized date stored at ingest time
+            day = r.get("day") or normalize_date(r.get("date"))
+            date_bucket = self.by_date.get(day)
+            if date_bucket is None:
+                date_bucket = self.by_date[day] = _empty_bucket()
+            date_bucket[s] = date_bucket.get(s, 0) + 1
+            country = r.get("country", "Unknown")
+            country_bucket = self.by_country.get(country)
+            if country_bucket is None:
+                country_bucket = self.by_country[country] = _empty_bucket()
+            country_bucket[s] = country_bucket.get(s, 0) + 1
+            periods = periods_of(day)
+            if periods is not None:
+                micros = confidence_micros(r.get("confidence", 0.0))
+                for granularity, period in zip(GRANULARITIES, periods):
+                    rollup = self.rollups[granularity]
+                    bucket = rollup.get(period)
+                    if bucket is None:
+                        bucket = rollup[period] = {**_empty_bucket(), CONFIDENCE_KEY: 0}
+                    bucket[s] = bucket.get(s, 0) + 1
+                    bucket[CONFIDENCE_KEY] += micros
+
+    def merge_day(self, day: str, counts: Dict[str, int], micros: int, granularities=GRANULARITIES) -> None:
+        """Add one day's pre-aggregated sentiment counts and confidence sum to the rollups."""
+        periods = periods_of(day)
+        if periods is None:
+            return
+        for granularity, period in zip(GRANULARITIES, periods):
+            if granularity not in granularities:
+                continue
+            rollup = self.rollups[granularity]
+            bucket = rollup.get(period)
+            if bucket is None:
+                bucket = rollup[period] = {**_empty_bucket(), CONFIDENCE_KEY: 0}
+            for s, n in counts.items():
+                bucket[s] = bucket.get(s, 0) + n
+            bucket[CONFIDENCE_KEY] += micros
+
+    def copy(self, rollups: Sequence[str] = GRANULARITIES) -> "ProductAggregates":
+        """An independent copy; trend rollups not in ``rollups`` are left empty."""
+        agg = ProductAggregates()
+        agg.review_count = self.review_count
+        agg.counts = dict(self.counts)
+        agg.by_date = {k: dict(v) for k, v in self.by_date.items()}
+        agg.by_country = {k: dict(v) for k, v in self.by_country.items()}
+        for granularity in rollups:
+            if granularity in self.rollups:
+                agg.rollups[granularity] = {k: dict(v) for k, v in self.rollups[granularity].items()}
+        return agg
+
+    def timeseries(self) -> Dict[str, List]:
+        labels = sorted(self.by_date.keys(), key=date_sort_key)
+        return {
+            "labels": labels,
+            "positive": [self.by_date[k].get("POSITIVE", 0) for k in labels],
+            "neutral": [self.by_date[k].get("NEUTRAL", 0) for k in labels],
+            "negative": [self.by_date[k].get("NEGATIVE", 0) for k in labels],
+        }
+
+    def trend(
+        self,
+        granularity: str = "day",
+        day_from: Optional[str] = None,
+        day_to: Optional[str] = None,
+        window: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """One granularity's rollups for the periods overlapping [day_from, day_to], with rolling windows.
+
+        Rolling values cover the ``window`` calendar periods ending at each
+        label (empty periods count as zero reviews), including periods before
+        the requested range.
+        """
+        window = window or DEFAULT_WINDOWS[granularity]
+        rollup = self.rollups[granularity]
+        indexed = sorted((period_index(p, granularity), p) for p in rollup)
+        lo = period_index(periods_of(day_from)[GRANULARITIES.index(granularity)], granularity) if day_from else None
+        hi = period_index(periods_of(day_to)[GRANULARITIES.index(granularity)], granularity) if day_to else None
+        out: Dict[str, Any] = {
+            "granularity": granularity,
+            "window": window,
+            "labels": [],
+            "positive": [],
+            "neutral": [],
+            "negative": [],
+            "positive_rate": [],
+            "mean_confidence": [],
+            "rolling_positive_rate": [],
+            "rolling_mean_confidence": [],
+        }
+        # Running sums over the window, kept with a trailing pointer into ``indexed``
+        run_total = run_positive = run_micros = 0
+        tail = 0
+        for index, period in indexed:
+            if hi is not None and index > hi:
+                break
+            bucket = rollup[period]
+            total = sum(n for k, n in bucket.items() if k != CONFIDENCE_KEY)
+            run_total += total
+            run_positive += bucket.get("POSITIVE", 0)
+            run_micros += bucket[CONFIDENCE_KEY]
+            while indexed[tail][0] <= index - window:
+                old = rollup[indexed[tail][1]]
+                run_total -= sum(n for k, n in old.items() if k != CONFIDENCE_KEY)
+                run_positive -= old.get("POSITIVE", 0)
+                run_micros -= old[CONFIDENCE_KEY]
+                tail += 1
+            if lo is not None and index < lo:
+                continue
+            out["labels"].append(period)
+            out["positive"].append(bucket.get("POSITIVE", 0))
+            out["neutral"].append(bucket.get("NEUTRAL", 0))
+            out["negative"].append(bucket.get("NEGATIVE", 0))
+            out["positive_rate"].append(bucket.get("POSITIVE", 0) / total if total else 0.0)
+            out["mean_confidence"].append(bucket[CONFIDENCE_KEY] / CONFIDENCE_SCALE / total if total else 0.0)
+            out["rolling_positive_rate"].append(run_positive / run_total if run_total else 0.0)
+            out["rolling_mean_confidence"].append(run_micros / CONFIDENCE_SCALE / run_total if run_total else 0.0)
+        # Every dated review falls in exactly one period of each granularity
+        out["undated"] = self.review_count - sum(
+            n for bucket in rollup.values() for k, n in bucket.items() if k != CONFIDENCE_KEY
+        )
+        return out
+
+    def country_breakdown(self) -> Dict[str, List]:
+        countries = list(self.by_country.keys())
+        return {
+            "countries": countries,
+            "positive": [self.by_country[c].get("POSITIVE", 0) for c in countries],
+            "neutral": [self.by_country[c].get("NEUTRAL", 0) for c in countries],
+            "negative": [self.by_country[c].get("NEGATIVE", 0) for c in countries],
+        }
+
+    def compact(self) -> Dict[str, Any]:
+        """Counts and per-date/per-country buckets as ``[key, positive, neutral, negative]`` rows (for deltas)."""
+
+        def rows(buckets):
+            return [[k, b.get("POSITIVE", 0), b.get("NEUTRAL", 0), b.get("NEGATIVE", 0)] for k, b in buckets.items()]
+
+        return {
+            "review_count": self.review_count,
+            "counts": self.counts,
+            "dates": rows(self.by_date),
+            "countries": rows(self.by_country),
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "review_count": self.review_count,
+            "counts": self.counts,
+            "by_date": self.by_date,
+            "by_country": self.by_country,
+            "rollups": self.rollups,
+        }
+
+    def diff(self, other: "ProductAggregates") -> List[str]:
+        """Names of the parts of the state that differ from ``other``."""
+        mine, theirs = self.state(), other.state()
+        return [k for k in mine if mine[k] != theirs[k]]
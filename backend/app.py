@@ -1,21 +1,102 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, ValidationError
 from typing import List, Dict, Any, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-import re
-
-# --- NLTK for lightweight sentiment analysis ---
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-nltk.download("vader_lexicon")
-
-
-sia = SentimentIntensityAnalyzer()
-
-
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import zlib
+
+# --- NLTK VADER for lightweight sentiment analysis ---
+# The lexicon is loaded from the compiled copy built by `python -m lexicon`;
+# startup never touches the network.
+from lexicon import load_analyzer
+from sentiment_engine import VaderBatchScorer
+from score_cache import ScoreCache, text_key
+from scoring_pool import ScoringPool
+from storage import REVIEW_FIELDS, ReviewFilter, ReviewStore, make_store
+from ndjson_stream import iter_lines
+from metrics import SIZE_BUCKETS, MetricsMiddleware, Registry
+from sampling_profiler import RequestProfiler
+from review_dates import normalize_date
+from micro_batcher import MicroBatcher
+from ingest_queue import IngestQueue
+from live_updates import DeltaBroker, format_event
+from review_index import ReviewIndex
+from shared_store import RemoteStore
+
+
+sia = load_analyzer()
+# Vectorized scorer for /predict_batch; produces the same scores as sia
+batch_scorer = VaderBatchScorer(sia)
+
+# Repeated review texts (the extension re-sends them on every page load) are
+# answered from a bounded cache keyed by a digest of the normalized text.
+score_cache = ScoreCache(
+    max_bytes=int(float(os.environ.get("SCORE_CACHE_MB", "64")) * 1024 * 1024),
+    ttl=float(os.environ["SCORE_CACHE_TTL"]) if os.environ.get("SCORE_CACHE_TTL") else None,
+)
 
-app = FastAPI(title="Sentiment API")
+# Opt-in multi-core mode: SCORING_WORKERS=N shards batches of at least
+# SCORING_POOL_MIN_BATCH uncached texts across N worker processes.
+SCORING_WORKERS = int(os.environ.get("SCORING_WORKERS", "0"))
+SCORING_POOL_MIN_BATCH = int(os.environ.get("SCORING_POOL_MIN_BATCH", "2000"))
+scoring_pool: Optional[ScoringPool] = None
+
+# Concurrent /predict calls that miss the score cache are coalesced: a call is
+# scored at once unless a batch is already being scored; calls arriving
+# meanwhile are scored together when it finishes (or PREDICT_BATCH_WINDOW_MS
+# after the first of them, or at PREDICT_MAX_BATCH). A window of 0 scores
+# every call on its own.
+PREDICT_BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", "2"))
+PREDICT_MAX_BATCH = int(os.environ.get("PREDICT_MAX_BATCH", "64"))
+
+
+# Set once _warm_up is done
+warmed_up = threading.Event()
+
+def _warm_up() -> None:
+    # The search index lives in memory and is rebuilt from the store on startup
+    if review_index is not None and STORE.index is None:
+        with STAGE_SECONDS.time(("search_index_build",)):
+            STORE.attach_index(review_index)
+    # Warm the score cache with the texts already ingested, scored by the analyzer
+    texts = (r["text"] for asin in STORE.asins() for r in STORE.iter_results(asin))
+    score_cache.warm(texts, _score_texts)
+    warmed_up.set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global scoring_pool
+    # Passes over everything stored run in the background, so a large store is served at once
+    if review_index is not None and STORE.index is None:
+        review_index.begin_backfill()
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    if SCORING_WORKERS > 0:
+        scoring_pool = ScoringPool(SCORING_WORKERS, min_batch=SCORING_POOL_MIN_BATCH)
+    live_updates.bind(asyncio.get_running_loop())
+    STORE.add_listener(live_updates.publish)
+    await ingest_queue.start()
+    yield
+    # Reviews accepted by /ingest_reviews are committed before the store closes
+    await ingest_queue.close()
+    STORE.remove_listener(live_updates.publish)
+    live_updates.bind(None)
+    if scoring_pool is not None:
+        scoring_pool.close()
+        scoring_pool = None
+    STORE.close()
+
+
+app = FastAPI(title="Sentiment API", lifespan=lifespan)
 
 # ⚠ For MVP: open CORS. Tighten later to only your extension/domain.
 app.add_middleware(
@@ -26,6 +107,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ===== Metrics =====
+# Served on /metrics in the Prometheus text format. PROFILE_DIR=<dir> also
+# samples every request's stacks into <dir> as flamegraph-ready .folded files.
+metrics = Registry()
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Request latency until the last body byte is sent", ("method", "route", "status"))
+SCORING_SECONDS = metrics.histogram("scoring_batch_seconds", "Time to score one batch of uncached texts", ("scorer",))
+SCORING_BATCH_SIZE = metrics.histogram(
+    "scoring_batch_size", "Uncached texts per scoring batch", ("scorer",), buckets=SIZE_BUCKETS)
+STAGE_SECONDS = metrics.histogram("stage_duration_seconds", "Time spent in a stage of request handling", ("stage",))
+PREDICT_COALESCED = metrics.histogram(
+    "predict_coalesced_batch_size", "Uncached /predict texts scored together", buckets=SIZE_BUCKETS)
+REVIEWS_INGESTED = metrics.counter("reviews_ingested_total", "Reviews received for ingest, by outcome", ("outcome",))
+
+profiler = None
+if os.environ.get("PROFILE_DIR"):
+    profiler = RequestProfiler(os.environ["PROFILE_DIR"], float(os.environ.get("PROFILE_INTERVAL", "0.005")))
+app.add_middleware(MetricsMiddleware, histogram=HTTP_LATENCY, profiler=profiler)
+
 
 # Simple neutral heuristic: if confidence < 0.60, call it NEUTRAL
 NEUTRAL_THRESHOLD = 0.60
@@ -36,9 +136,7 @@ class PredictIn(BaseModel):
 class PredictBatchIn(BaseModel):
     texts: List[str]
 
-def classify(text: str) -> Dict[str, Any]:
-    scores = sia.polarity_scores(text)
-    compound = scores["compound"]
+def label_compound(compound: float) -> Dict[str, Any]:
     if compound >= 0.06:
         label = "POSITIVE"
     elif compound <= -0.04:
@@ -47,18 +145,83 @@ def classify(text: str) -> Dict[str, Any]:
         label = "NEUTRAL"
     return {"sentiment": label, "confidence": abs(compound)}
 
+def classify(text: str) -> Dict[str, Any]:
+    key = text_key(text)
+    cached = score_cache.get(key)
+    if cached is not None:
+        return cached
+    with SCORING_SECONDS.time(("single",)):
+        result = label_compound(sia.polarity_scores(text)["compound"])
+    SCORING_BATCH_SIZE.observe(1, ("single",))
+    score_cache.put(key, result)
+    return result
+
+def _score_texts(texts: List[str]) -> List[Dict[str, Any]]:
+    # Uncached scoring without touching the cache or its hit counters
+    return [label_compound(c) for c in batch_scorer.compound_scores(texts)]
+
+def classify_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    keys = [text_key(t) for t in texts]
+    results: List[Optional[Dict[str, Any]]] = [score_cache.get(k) for k in keys]
+    return _score_misses(texts, keys, results)
+
+def _score_misses(texts: List[str], keys: List[bytes], results: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Fill the None slots of ``results`` by scoring their texts and caching the scores."""
+    # Only cache misses go to the analyzer, each distinct text once
+    pending: Dict[bytes, List[int]] = {}
+    for i, r in enumerate(results):
+        if r is None:
+            pending.setdefault(keys[i], []).append(i)
+    if pending:
+        slots = list(pending.values())
+        miss_texts = [texts[idx[0]] for idx in slots]
+        if scoring_pool is not None and scoring_pool.accepts(len(miss_texts)):
+            with SCORING_SECONDS.time(("pool",)):
+                compounds = scoring_pool.compound_scores(miss_texts)
+            SCORING_BATCH_SIZE.observe(len(miss_texts), ("pool",))
+        else:
+            with SCORING_SECONDS.time(("vectorized",)):
+                compounds = batch_scorer.compound_scores(miss_texts)
+            SCORING_BATCH_SIZE.observe(len(miss_texts), ("vectorized",))
+        for key, idx, compound in zip(pending.keys(), slots, compounds):
+            result = label_compound(compound)
+            score_cache.put(key, result)
+            for i in idx:
+                results[i] = dict(result)
+    return results
+
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
+def _predict_coalesced(texts: List[str]) -> List[Dict[str, Any]]:
+    # Texts reach here after missing the cache in predict()
+    PREDICT_COALESCED.observe(len(texts))
+    return _score_misses(texts, [text_key(t) for t in texts], [None] * len(texts))
+
+predict_batcher: Optional[MicroBatcher] = None
+if PREDICT_BATCH_WINDOW_MS > 0:
+    predict_batcher = MicroBatcher(_predict_coalesced, max_batch=PREDICT_MAX_BATCH, window=PREDICT_BATCH_WINDOW_MS / 1000)
+
 @app.post("/predict")
-def predict(body: PredictIn):
-    return classify(body.text)
+async def predict(body: PredictIn):
+    if predict_batcher is None:
+        return await run_in_threadpool(classify, body.text)
+    cached = score_cache.get(text_key(body.text))
+    if cached is not None:
+        return cached
+    return await predict_batcher.submit(body.text)
 
 @app.post("/predict_batch")
 def predict_batch(body: PredictBatchIn):
-    return {"results": [classify(t) for t in body.texts]}
+    with STAGE_SECONDS.time(("classify_batch",)):
+        results = classify_batch(body.texts)
+    return {"results": results}
+
+@app.get("/cache_stats")
+def cache_stats():
+    return score_cache.stats()
 
 
 # ===== Ingestion and Analytics Store =====
@@ -75,8 +238,26 @@ class IngestResultsBody(BaseModel):
     title: str
     results: List[ReviewResult]
 
-# In-memory store: { asin: { "title": str, "results": [ReviewResult...], "updated_at": iso } }
-DATA_STORE: Dict[str, Dict[str, Any]] = {}
+# Review store: SQLite (WAL) by default, or REVIEW_STORE=memory for process-local dicts
+STORE: ReviewStore = make_store()
+
+# Every store commit is pushed to /events subscribers as a compact per-ASIN delta
+live_updates = DeltaBroker(
+    history=int(os.environ.get("EVENTS_HISTORY", "1000")),
+    queue_size=int(os.environ.get("EVENTS_QUEUE_SIZE", "1000")),
+)
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS", "15"))
+# Streams are closed after this long (clients resume with Last-Event-ID); an open
+# stream would otherwise hold up the server's graceful shutdown indefinitely
+EVENTS_MAX_SECONDS = float(os.environ.get("EVENTS_MAX_SECONDS", "300"))
+
+# Inverted index over stored review texts for /search and /top_terms (SEARCH_INDEX=0 disables it).
+# A shared store (REVIEW_STORE=remote) comes with the index its server keeps, if any.
+review_index: Optional[ReviewIndex] = None
+if isinstance(STORE, RemoteStore):
+    review_index = STORE.index
+elif os.environ.get("SEARCH_INDEX", "1") != "0":
+    review_index = ReviewIndex(batch_scorer.word)
 
 @app.post("/ingest_results")
 def ingest_results(body: IngestResultsBody):
@@ -84,133 +265,473 @@ def ingest_results(body: IngestResultsBody):
     if len(asin) != 10:
         raise HTTPException(status_code=400, detail="Invalid ASIN")
 
-    if asin not in DATA_STORE:
-        DATA_STORE[asin] = {
-            "title": body.title,
-            "results": [],
-            "updated_at": datetime.utcnow().isoformat(),
-        }
-    # Append; do not dedupe for MVP
-    DATA_STORE[asin]["results"].extend([r.model_dump() for r in body.results])
-    DATA_STORE[asin]["title"] = body.title or DATA_STORE[asin]["title"]
-    DATA_STORE[asin]["updated_at"] = datetime.utcnow().isoformat()
-    return {"ok": True, "stored": len(body.results)}
+    # Reviews already stored for this ASIN (same text, date and country) are skipped
+    with STAGE_SECONDS.time(("store_write",)):
+        stored = STORE.add_results(asin, body.title, [r.model_dump() for r in body.results])
+    REVIEWS_INGESTED.inc(stored, ("stored",))
+    REVIEWS_INGESTED.inc(len(body.results) - stored, ("skipped",))
+    return {"ok": True, "stored": stored, "skipped": len(body.results) - stored}
+
+
+class ReviewText(BaseModel):
+    text: str
+    date: Optional[str] = None
+    country: Optional[str] = None
+
+class IngestReviewsBody(BaseModel):
+    asin: str
+    title: str
+    reviews: List[ReviewText]
+
+def _score_queued(texts: List[str]) -> List[Dict[str, Any]]:
+    with STAGE_SECONDS.time(("ingest_score",)):
+        return classify_batch(texts)
+
+def _store_queued(asin: str, title: str, results: List[Dict[str, Any]]) -> int:
+    with STAGE_SECONDS.time(("store_write",)):
+        stored = STORE.add_results(asin, title, results)
+    REVIEWS_INGESTED.inc(stored, ("stored",))
+    REVIEWS_INGESTED.inc(len(results) - stored, ("skipped",))
+    return stored
+
+# /ingest_reviews answers once reviews are queued; up to INGEST_QUEUE_DEPTH requests, and
+# INGEST_QUEUE_REVIEWS reviews between them, wait to be scored (INGEST_MAX_BATCH reviews
+# at a time, across requests) and stored
+ingest_queue = IngestQueue(
+    _score_queued,
+    _store_queued,
+    depth=int(os.environ.get("INGEST_QUEUE_DEPTH", "1000")),
+    max_batch=int(os.environ.get("INGEST_MAX_BATCH", "2000")),
+    max_reviews=int(os.environ.get("INGEST_QUEUE_REVIEWS", "100000")),
+)
+
+@app.post("/ingest_reviews", status_code=202)
+async def ingest_reviews(body: IngestReviewsBody):
+    """Score and store raw review texts in the background.
+
+    Answers 202 as soon as the reviews are queued, or 429 (retry after the
+    Retry-After seconds) while the queue is full; a request with more reviews
+    than the whole queue holds gets 413. Stored reviews show up in
+    the store, and on /events, once the pipeline commits them.
+    """
+    asin = body.asin.strip().upper()
+    if len(asin) != 10:
+        raise HTTPException(status_code=400, detail="Invalid ASIN")
+    if len(body.reviews) > ingest_queue.max_reviews:
+        raise HTTPException(status_code=413, detail=f"At most {ingest_queue.max_reviews} reviews per request")
+    reviews = [r.model_dump() for r in body.reviews]
+    try:
+        queued = ingest_queue.submit(asin, body.title, reviews) if reviews else 0
+    except asyncio.QueueFull:
+        REVIEWS_INGESTED.inc(len(reviews), ("queue_full",))
+        raise HTTPException(status_code=429, detail="Ingest queue is full", headers={"Retry-After": "1"})
+    return {"ok": True, "accepted": len(reviews), "queued": queued}
+
+@app.get("/ingest_stats")
+def ingest_stats():
+    return ingest_queue.stats()
+
+
+class StreamRecord(ReviewResult):
+    asin: str
+    title: str = ""
+
+# Records buffered before /ingest_stream commits them to the store
+INGEST_STREAM_CHUNK = int(os.environ.get("INGEST_STREAM_CHUNK", "1000"))
+
+@app.post("/ingest_stream")
+async def ingest_stream(request: Request):
+    """Bulk ingest from an NDJSON body (one StreamRecord per line, optionally gzip-encoded).
+
+    Lines are parsed and validated one at a time and committed every
+    INGEST_STREAM_CHUNK records. The NDJSON response has an "error" line per
+    rejected input line, a "progress" line per committed chunk and a final "done"
+    line; it is spooled to a temporary file so large reports stay out of memory.
+    """
+    gzipped = request.headers.get("content-encoding", "").lower() == "gzip"
+    report = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    totals = {"lines": 0, "accepted": 0, "stored": 0, "skipped": 0, "errors": 0, "chunks": 0}
+    pending: Dict[str, Dict[str, Any]] = {}
+    pending_count = 0
+
+    def emit(kind: str, **fields):
+        report.write((json.dumps({"type": kind, **fields}, default=str) + "\n").encode())
+
+    async def commit():
+        nonlocal pending, pending_count
+        for asin, group in pending.items():
+            with STAGE_SECONDS.time(("store_write",)):
+                stored = await run_in_threadpool(STORE.add_results, asin, group["title"], group["results"])
+            totals["stored"] += stored
+            totals["skipped"] += len(group["results"]) - stored
+            REVIEWS_INGESTED.inc(stored, ("stored",))
+            REVIEWS_INGESTED.inc(len(group["results"]) - stored, ("skipped",))
+        totals["chunks"] += 1
+        pending, pending_count = {}, 0
+        emit("progress", **totals)
+
+    failure = None
+    try:
+        async for line_no, line, error in iter_lines(request.stream(), gzip=gzipped):
+            totals["lines"] = line_no
+            if error is None:
+                try:
+                    with STAGE_SECONDS.time(("stream_validate",)):
+                        record = StreamRecord.model_validate_json(line)
+                    asin = record.asin.strip().upper()
+                    if len(asin) != 10:
+                        error = ValueError("Invalid ASIN")
+                except ValidationError as e:
+                    error = e
+            if error is not None:
+                totals["errors"] += 1
+                REVIEWS_INGESTED.inc(1, ("rejected",))
+                message = error.errors(include_url=False, include_input=False) if isinstance(error, ValidationError) else str(error)
+                emit("error", line=line_no, error=message)
+                continue
+            group = pending.setdefault(asin, {"title": "", "results": []})
+            group["title"] = record.title or group["title"]
+            group["results"].append(record.model_dump(exclude={"asin", "title"}))
+            pending_count += 1
+            totals["accepted"] += 1
+            if pending_count >= INGEST_STREAM_CHUNK:
+                await commit()
+    except (zlib.error, ClientDisconnect) as e:
+        failure = str(e) or type(e).__name__
+    if pending_count:
+        await commit()
+    if failure is None:
+        emit("done", ok=True, **totals)
+    else:
+        emit("done", ok=False, error=failure, **totals)
+
+    report.seek(0)
+
+    def drain():
+        with report:
+            while True:
+                chunk = report.read(64 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+
+    return StreamingResponse(drain(), media_type="application/x-ndjson")
+
+
+@app.get("/aggregates/check")
+def aggregates_check():
+    mismatches = STORE.check_aggregates()
+    return {"ok": not mismatches, "checked": len(STORE.asins()), "mismatches": mismatches}
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison, as If-None-Match uses
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+def _conditional(request: Request, etag: str, build) -> Response:
+    """304 if the client's If-None-Match already has ``etag``, else ``build()`` as JSON tagged with it."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(build(), headers=headers)
 
 
 @app.get("/products")
-def list_products():
-    summaries = []
-    for asin, payload in DATA_STORE.items():
-        results = payload.get("results", [])
-        counts = {"POSITIVE": 0, "NEUTRAL": 0, "NEGATIVE": 0}
-        for r in results:
-            s = r.get("sentiment")
-            if s in counts:
-                counts[s] += 1
-        summaries.append({
+def list_products(request: Request):
+    # The version is read before the data, so a concurrent write can only make the ETag stale, never the body
+    etag = f'"{STORE.store_id}-{STORE.version()}"'
+    return _conditional(request, etag, lambda: {"products": STORE.summaries()})
+
+
+# Reads of a snapshot raced by concurrent commits before it is returned without a version
+SNAPSHOT_ATTEMPTS = 3
+
+@app.get("/dashboard_snapshot/{asin}")
+def dashboard_snapshot(asin: str, request: Request):
+    """Everything the dashboard shows for one product, revalidated with If-None-Match."""
+    asin = asin.strip().upper()
+    version = STORE.version(asin)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Unknown ASIN")
+
+    def build():
+        # Live clients apply /events deltas on top of this body, so it must be exactly
+        # one version: re-read if a commit landed meanwhile, and give up with None
+        read = version
+        for _ in range(SNAPSHOT_ATTEMPTS):
+            product = STORE.product(asin)
+            agg = STORE.aggregates(asin, rollups=())
+            latest = STORE.version(asin)
+            if latest == read:
+                break
+            read = latest
+        else:
+            read = None
+        return {
             "asin": asin,
-            "title": payload.get("title", asin),
-            "updated_at": payload.get("updated_at"),
-            "review_count": len(results),
-            "counts": counts,
-        })
-    return {"products": summaries}
+            "version": read,
+            "product": {
+                "asin": asin,
+                "title": product["title"],
+                "updated_at": product["updated_at"],
+                "review_count": agg.review_count,
+                "counts": agg.counts,
+            },
+            "timeseries": {"asin": asin, **agg.timeseries()},
+            "country_sentiment": {"asin": asin, **agg.country_breakdown()},
+        }
+
+    return _conditional(request, f'"{STORE.store_id}-{asin}-{version}"', build)
 
 
+@app.get("/events")
+async def events(request: Request, asin: Optional[List[str]] = Query(None)):
+    """Server-sent events: one "delta" per store commit, optionally only for the given ASINs.
+
+    A delta carries the product's new version, title and updated_at plus what
+    the commit added: review_count, counts and [key, positive, neutral, negative]
+    rows for the dates and countries it touched. A client that sees a version
+    gap, or gets a "resync" event (it fell behind, or its Last-Event-ID is no
+    longer retained), should reload from /dashboard_snapshot.
+    """
+    asins = {a.strip().upper() for a in asin} if asin else None
+    last_id = request.headers.get("last-event-id", "").strip()
+    subscription = live_updates.subscribe(asins, int(last_id) if last_id.isdigit() else None)
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + EVENTS_MAX_SECONDS
+        try:
+            yield "retry: 3000\n\n"
+            while loop.time() < deadline:
+                timeout = min(EVENTS_KEEPALIVE_SECONDS, deadline - loop.time())
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            live_updates.unsubscribe(subscription)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+
+# Reviews per /product/{asin} JSON page; format=ndjson streams every match unless limit is given
+PRODUCT_PAGE_SIZE = int(os.environ.get("PRODUCT_PAGE_SIZE", "500"))
+PRODUCT_MAX_PAGE_SIZE = 5000
+
+def _day_param(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a YYYY-MM-DD date")
+
 @app.get("/product/{asin}")
-def get_product(asin: str):
+def get_product(
+    asin: str,
+    cursor: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=PRODUCT_MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    sentiment: Optional[List[str]] = Query(None),
+    country: Optional[List[str]] = Query(None),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """Stored reviews for ``asin``, filtered server-side and paginated by cursor.
+
+    ``fields`` is a comma-separated projection of REVIEW_FIELDS; ``sentiment``
+    and ``country`` may be repeated; ``date_from``/``date_to`` bound the
+    normalized review day (inclusive). JSON pages carry ``next_cursor`` (null on
+    the last page). ``format=ndjson`` streams a "product" line, one "review" line
+    per match and an "end" line with ``next_cursor``.
+    """
     asin = asin.strip().upper()
-    if asin not in DATA_STORE:
+    product = STORE.product(asin)
+    if product is None:
         raise HTTPException(status_code=404, detail="Unknown ASIN")
-    return {"asin": asin, **DATA_STORE[asin]}
+    projection = REVIEW_FIELDS
+    if fields:
+        projection = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = [f for f in projection if f not in REVIEW_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}; expected some of {list(REVIEW_FIELDS)}")
+    where = ReviewFilter(
+        sentiments=[s.strip().upper() for s in sentiment] if sentiment else None,
+        countries=country,
+        day_from=_day_param(date_from, "date_from"),
+        day_to=_day_param(date_to, "date_to"),
+    )
+    matches = STORE.scan(asin, cursor, where)
+    header = {"asin": asin, "title": product["title"], "updated_at": product["updated_at"]}
+
+    if format == "ndjson":
+        def lines():
+            # Rows are read lazily from the store and flushed in ~64KB chunks
+            buf = [json.dumps({"type": "product", **header})]
+            size, count, next_cursor = 0, 0, None
+            for position, r in matches:
+                if limit is not None and count == limit:
+                    next_cursor = position
+                    break
+                line = json.dumps({"type": "review", **{f: r.get(f) for f in projection}})
+                buf.append(line)
+                size += len(line)
+                count += 1
+                if size >= 64 * 1024:
+                    yield ("\n".join(buf) + "\n").encode()
+                    buf, size = [], 0
+            matches.close()
+            buf.append(json.dumps({"type": "end", "count": count, "next_cursor": next_cursor}))
+            yield ("\n".join(buf) + "\n").encode()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    page_size = limit or PRODUCT_PAGE_SIZE
+    results, next_cursor = [], None
+    with STAGE_SECONDS.time(("product_page",)):
+        for position, r in matches:
+            if len(results) == page_size:
+                next_cursor = position
+                break
+            results.append({f: r.get(f) for f in projection})
+        matches.close()
+    return {**header, "results": results, "next_cursor": next_cursor}
 
 
 @app.get("/timeseries/{asin}")
-def timeseries(asin: str):
+def timeseries(
+    asin: str,
+    granularity: Optional[str] = Query(None, pattern="^(day|week|month)$"),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    window: Optional[int] = Query(None, ge=1, le=366),
+):
+    """Per-date sentiment counts, or with any parameter a trend rollup slice.
+
+    The rollup covers ISO-dated reviews by ``granularity`` (day, week or month;
+    default day) for periods overlapping [date_from, date_to], with per-period
+    positive rate and mean confidence plus rolling averages over ``window``
+    periods.
+    """
     asin = asin.strip().upper()
-    if asin not in DATA_STORE:
+    if asin not in STORE:
         raise HTTPException(status_code=404, detail="Unknown ASIN")
-    results = DATA_STORE[asin]["results"]
-    # Aggregate by date (best-effort parse); fallback group as unknown
-    buckets: Dict[str, Dict[str, int]] = {}
-    def normalize_date(raw: str) -> str:
-        s = (raw or "").strip()
-        if not s:
-            return "UNKNOWN"
-        # If string contains pattern like "Reviewed in X on 5 August 2025"
-        m = re.search(r"(\d{1,2}\s+[A-Za-z]+\s+\d{4})", s)
-        if m:
-            date_text = m.group(1)
-            for fmt in ("%d %B %Y", "%d %b %Y"):
-                try:
-                    return datetime.strptime(date_text, fmt).date().isoformat()
-                except Exception:
-                    pass
-        # Try US style: Month DD, YYYY
-        m2 = re.search(r"([A-Za-z]+\s+\d{1,2},\s*\d{4})", s)
-        if m2:
-            date_text = m2.group(1)
-            for fmt in ("%B %d, %Y", "%b %d, %Y"):
-                try:
-                    return datetime.strptime(date_text, fmt).date().isoformat()
-                except Exception:
-                    pass
-        # Try ISO directly
-        try:
-            return datetime.fromisoformat(s).date().isoformat()
-        except Exception:
-            return s  # fallback raw bucket
-
-    for r in results:
-        raw = r.get("date")
-        key = normalize_date(raw)
-        if key not in buckets:
-            buckets[key] = {"POSITIVE": 0, "NEUTRAL": 0, "NEGATIVE": 0}
-        s = r.get("sentiment", "NEUTRAL")
-        if s not in buckets[key]:
-            buckets[key][s] = 0
-        buckets[key][s] += 1
-    # Sort keys if possible
-    def sort_key(k: str):
-        try:
-            return datetime.fromisoformat(k)
-        except Exception:
-            return k
-    labels = sorted(buckets.keys(), key=sort_key)
-    return {
-        "asin": asin,
-        "labels": labels,
-        "positive": [buckets[k].get("POSITIVE", 0) for k in labels],
-        "neutral": [buckets[k].get("NEUTRAL", 0) for k in labels],
-        "negative": [buckets[k].get("NEGATIVE", 0) for k in labels],
-    }
+    rollup = granularity is not None or date_from is not None or date_to is not None or window is not None
+    day_from, day_to = _day_param(date_from, "date_from"), _day_param(date_to, "date_to")
+    with STAGE_SECONDS.time(("aggregates",)):
+        granularity = granularity or "day"
+        agg = STORE.aggregates(asin, rollups=(granularity,) if rollup else ())
+        series = agg.trend(granularity, day_from, day_to, window) if rollup else agg.timeseries()
+    return {"asin": asin, **series}
 
 @app.get("/country_sentiment/{asin}")
 def country_sentiment(asin: str):
     asin = asin.strip().upper()
-    if asin not in DATA_STORE:
+    if asin not in STORE:
         raise HTTPException(status_code=404, detail="Unknown ASIN")
-    results = DATA_STORE[asin]["results"]
-    
-    # Aggregate by country
-    country_buckets: Dict[str, Dict[str, int]] = {}
-    for r in results:
-        country = r.get("country", "Unknown")
-        if country not in country_buckets:
-            country_buckets[country] = {"POSITIVE": 0, "NEUTRAL": 0, "NEGATIVE": 0}
-        sentiment = r.get("sentiment", "NEUTRAL")
-        if sentiment not in country_buckets[country]:
-            country_buckets[country][sentiment] = 0
-        country_buckets[country][sentiment] += 1
-    
+    with STAGE_SECONDS.time(("aggregates",)):
+        breakdown = STORE.aggregates(asin, rollups=()).country_breakdown()
+    return {"asin": asin, **breakdown}
+
+
+# Results per /search page
+SEARCH_MAX_LIMIT = 100
+
+def _search_index() -> ReviewIndex:
+    if review_index is None:
+        raise HTTPException(status_code=503, detail="Search index disabled (SEARCH_INDEX=0)")
+    if not review_index.ready:
+        raise HTTPException(status_code=503, detail="Search index is being built", headers={"Retry-After": "5"})
+    return review_index
+
+@app.get("/search")
+def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    asin: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None),
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+):
+    """Stored reviews containing every term and "quoted phrase" of ``q``, newest first.
+
+    Terms are matched on VADER's tokenization, case- and punctuation-
+    insensitively. ``asin`` and ``sentiment`` may be repeated; pages carry
+    ``next_cursor`` (null on the last page).
+    """
+    index = _search_index()
+    with STAGE_SECONDS.time(("search",)):
+        found = index.search(
+            q,
+            asins={a.strip().upper() for a in asin} if asin else None,
+            sentiments={s.strip().upper() for s in sentiment} if sentiment else None,
+            before=cursor,
+            limit=limit,
+        )
+        by_asin: Dict[str, List[int]] = {}
+        for _, a, position in found["hits"]:
+            by_asin.setdefault(a, []).append(position)
+        reviews = {a: dict(zip(positions, STORE.reviews_at(a, positions))) for a, positions in by_asin.items()}
+    results = [
+        {"asin": a, "position": position, **{f: reviews[a][position].get(f) for f in REVIEW_FIELDS}}
+        for _, a, position in found["hits"]
+    ]
+    next_cursor = found["hits"][-1][0] if found["more"] else None
     return {
-        "asin": asin,
-        "countries": list(country_buckets.keys()),
-        "positive": [country_buckets[c].get("POSITIVE", 0) for c in country_buckets.keys()],
-        "neutral": [country_buckets[c].get("NEUTRAL", 0) for c in country_buckets.keys()],
-        "negative": [country_buckets[c].get("NEGATIVE", 0) for c in country_buckets.keys()],
+        "terms": found["terms"],
+        "phrases": found["phrases"],
+        "total": found["total"],
+        "results": results,
+        "next_cursor": next_cursor,
     }
 
+@app.get("/top_terms/{asin}")
+def top_terms(asin: str, limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT)):
+    """Most common non-stopword terms over all of ``asin``'s positive reviews, and over all its negative ones.
+
+    Each term carries the number and share of reviews of that sentiment
+    containing it, and its share among reviews of the opposite sentiment.
+    """
+    index = _search_index()
+    asin = asin.strip().upper()
+    if asin not in STORE:
+        raise HTTPException(status_code=404, detail="Unknown ASIN")
+    with STAGE_SECONDS.time(("top_terms",)):
+        terms = index.top_terms(asin, limit)
+    if terms is None:
+        terms = {"reviews": {"positive": 0, "negative": 0}, "positive": [], "negative": []}
+    return {"asin": asin, **terms}
+
+
+# Scrape-time gauges for the store and caches
+metrics.gauge("store_products", "Products in the review store", lambda: len(STORE.asins()))
+for _stat in ("subscribers", "published", "resyncs"):
+    metrics.gauge(f"events_{_stat}", f"Live update stream {_stat}", lambda stat=_stat: live_updates.stats()[stat])
+metrics.gauge(
+    "store_reviews", "Stored reviews per ASIN",
+    lambda: [((p["asin"],), p["review_count"]) for p in STORE.summaries()], ("asin",))
+for _stat in ("entries", "bytes", "hits", "misses", "evictions", "expirations"):
+    metrics.gauge(f"score_cache_{_stat}", f"Score cache {_stat}", lambda stat=_stat: score_cache.stats()[stat])
+if review_index is not None:
+    for _stat in ("documents", "terms", "tokens", "array_bytes"):
+        metrics.gauge(f"search_index_{_stat}", f"Search index {_stat}", lambda stat=_stat: review_index.stats()[stat])
+for _stat in ("queued_jobs", "queued_reviews", "accepted", "rejected", "scored", "stored", "skipped", "failed"):
+    metrics.gauge(f"ingest_queue_{_stat}", f"Ingest queue {_stat} (reviews, or requests for queued_jobs)", lambda stat=_stat: ingest_queue.stats()[stat])
+for _stat in ("entries", "hits", "misses"):
+    metrics.gauge(f"date_normalizer_{_stat}", f"Review date normalizer memo {_stat}", lambda stat=_stat: normalize_date.stats()[stat])
+
+@app.get("/metrics")
+def metrics_text():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Optional: serve a simple index to point users to Streamlit app instructions
 @app.get("/")
 def root():
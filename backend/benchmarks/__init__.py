@@ -0,0 +1,4 @@
+"""Performance benchmarks for the sentiment backend.
+
+Run from the ``backend`` directory, e.g. ``python -m benchmarks.batch_scoring``.
+"""
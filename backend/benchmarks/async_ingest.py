@@ -0,0 +1,121 @@
+"""Extension-style ingestion: /predict_batch then /ingest_results, against /ingest_reviews.
+
+N concurrent clients in-process (httpx over ASGI) each send batches of
+uncached reviews of their own ASIN, either as /predict_batch followed by
+/ingest_results or as one /ingest_reviews call answered before scoring. Reports
+the client-side latency per batch and the rate at which reviews end up
+stored (for /ingest_reviews, until the queue has drained), then floods a
+small queue to show the 429s.
+
+    python -m benchmarks.async_ingest [--clients 1 8 32] [--batches 200] [--batch-size 20] [--depth 1000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+# The app reads its settings at import time; keep benchmark reviews out of the default database
+os.environ.setdefault("REVIEW_STORE", "memory")
+import app
+from benchmarks.synthetic import review_results
+from ingest_queue import IngestQueue
+
+_run = 0
+
+
+def batches(count: int, size: int) -> list:
+    global _run
+    _run += 1
+    out = []
+    for b in range(count):
+        results = review_results(size, seed=_run * 100_000 + b)
+        # Distinct texts, so every review is scored
+        out.append([
+            {"text": f"{r['text']} (run {_run} batch {b} #{i})", "date": r["date"], "country": r["country"]}
+            for i, r in enumerate(results)
+        ])
+    return out
+
+
+async def load(clients: int, work: list, combined: bool) -> tuple:
+    latencies = []
+    statuses = {}
+    per_client = len(work) // clients
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+
+        async def worker(c: int, chunk):
+            asin = f"Q{_run:04d}{c:05d}"
+            for reviews in chunk:
+                t = time.perf_counter()
+                if combined:
+                    r = await client.post("/ingest_reviews", json={"asin": asin, "title": "bench", "reviews": reviews})
+                else:
+                    r = await client.post("/predict_batch", json={"texts": [x["text"] for x in reviews]})
+                    scores = r.json()["results"]
+                    results = [{**s, **x} for s, x in zip(scores, reviews)]
+                    r = await client.post("/ingest_results", json={"asin": asin, "title": "bench", "results": results})
+                latencies.append(time.perf_counter() - t)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(c, work[c * per_client:(c + 1) * per_client]) for c in range(clients)))
+        acked = time.perf_counter() - start
+        if combined:
+            # Drain what was accepted
+            await app.ingest_queue.close()
+        stored = time.perf_counter() - start
+    return latencies, acked, stored, statuses
+
+
+async def run(clients: int, work: list, combined: bool, depth: int) -> tuple:
+    app.ingest_queue = IngestQueue(
+        app._score_queued, app._store_queued, depth=depth,
+        max_batch=app.ingest_queue.max_batch, max_reviews=app.ingest_queue.max_reviews,
+    )
+    await app.ingest_queue.start()
+    try:
+        return await load(clients, work, combined)
+    finally:
+        await app.ingest_queue.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=1000, help="INGEST_QUEUE_DEPTH")
+    args = parser.parse_args()
+
+    print(f"{'path':<24} {'clients':>7} {'p50 ms':>8} {'p99 ms':>8} {'acked/s':>8} {'stored/s':>9}")
+    for clients in args.clients:
+        for combined in (False, True):
+            work = batches(args.batches, args.batch_size)
+            latencies, acked, stored, statuses = asyncio.run(run(clients, work, combined, args.depth))
+            if set(statuses) - {200, 202}:
+                raise SystemExit(f"unexpected responses: {statuses}")
+            ms = sorted(x * 1000 for x in latencies)
+            reviews = len(work) * args.batch_size
+            name = "/ingest_reviews" if combined else "/predict_batch+/ingest"
+            print(
+                f"{name:<24} {clients:>7} {statistics.median(ms):>8.2f} {ms[int(0.99 * (len(ms) - 1))]:>8.2f} "
+                f"{reviews / acked:>8.0f} {reviews / stored:>9.0f}"
+            )
+
+    clients = max(args.clients)
+    work = batches(args.batches, args.batch_size)
+    _, _, _, statuses = asyncio.run(run(clients, work, True, depth=4))
+    print(f"\n{clients} clients against a queue of depth 4: {statuses}")
+    print(app.ingest_queue.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Reviews/sec of the per-text VADER loop vs the vectorized batch scorer.
+
+    python -m benchmarks.batch_scoring [--sizes 100 1000 5000] [--repeat 3]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lexicon import load_analyzer
+
+from benchmarks.synthetic import review_texts
+from sentiment_engine import VaderBatchScorer
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sia = load_analyzer()
+    scorer = VaderBatchScorer(sia)
+
+    print(f"{'batch':>8} {'loop rev/s':>12} {'batch rev/s':>12} {'speedup':>8}")
+    for size in args.sizes:
+        texts = review_texts(size, seed=size)
+        expected = [sia.polarity_scores(t) for t in texts]
+        if scorer.polarity_scores(texts) != expected:
+            raise SystemExit(f"batch scorer disagrees with SentimentIntensityAnalyzer at size {size}")
+        loop = best_of(lambda: [sia.polarity_scores(t) for t in texts], args.repeat)
+        batch = best_of(lambda: scorer.polarity_scores(texts), args.repeat)
+        print(f"{size:>8} {size / loop:>12.0f} {size / batch:>12.0f} {loop / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
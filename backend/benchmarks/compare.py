@@ -0,0 +1,80 @@
+"""Compare two benchmark suite result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.25] [--metric p50_ms]
+
+A benchmark regresses when ``current / baseline - 1`` exceeds the threshold
+for the chosen metric. Timings below ``--min-ms`` in both runs are treated as
+noise. Exits non-zero when anything regressed.
+"""
+import argparse
+import json
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_METRIC = "p50_ms"
+DEFAULT_MIN_MS = 0.05
+
+# Run metadata that doesn't describe the workload
+_RUN_ONLY = {"timestamp", "commit"}
+
+
+def config_differences(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Workload settings (scale, store, concurrency, ...) that differ between the two runs."""
+    before, after = baseline.get("meta", {}), current.get("meta", {})
+    keys = (before.keys() | after.keys()) - _RUN_ONLY
+    return sorted(k for k in keys if before.get(k) != after.get(k))
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    metric: str = DEFAULT_METRIC,
+    min_ms: float = DEFAULT_MIN_MS,
+) -> List[Tuple[str, float, float, float, bool]]:
+    """``(name, baseline, current, change, regressed)`` for benchmarks present in both runs."""
+    rows = []
+    for name, stats in current["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if old is None or metric not in old or metric not in stats:
+            continue
+        before, after = old[metric], stats[metric]
+        change = after / before - 1 if before else 0.0
+        regressed = change > threshold and max(before, after) >= min_ms
+        rows.append((name, before, after, change, regressed))
+    return rows
+
+
+def report(rows: List[Tuple[str, float, float, float, bool]], metric: str, differences: List[str] = ()) -> int:
+    """Print the comparison table; returns the number of regressions."""
+    if differences:
+        print(f"warning: the runs differ in {', '.join(differences)}; timings may not be comparable")
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'benchmark':<{width}}  {'baseline ' + metric:>18}  {'current':>10}  {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        flag = "  REGRESSED" if regressed else ""
+        print(f"{name:<{width}}  {before:>18.3f}  {after:>10.3f}  {change:>+8.1%}{flag}")
+    return sum(r[4] for r in rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--metric", default=DEFAULT_METRIC)
+    parser.add_argument("--min-ms", type=float, default=DEFAULT_MIN_MS)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold, args.metric, args.min_ms)
+    regressions = report(rows, args.metric, config_differences(baseline, current))
+    if regressions:
+        raise SystemExit(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Crash recovery of the persistent columnar store, and how fast it comes back.
+
+Starts the API (REVIEW_STORE=columnar with a REVIEW_DATA_DIR) in a
+subprocess, loads --reviews reviews, then repeatedly has --writers clients
+ingest fresh reviews while the server is SIGKILLed mid-write. After every
+restart it checks that:
+
+- every acknowledged /ingest_results batch is stored, exactly once
+- nothing is stored that no client sent
+- the aggregates match the stored reviews (/aggregates/check)
+
+and reports the time from process start to the first served request.
+Exits non-zero on the first violation. tests/test_crash_recovery.py runs
+one small kill of the same kind under pytest.
+
+    python -m benchmarks.crash_recovery [--reviews 200000] [--kills 5] [--writers 4] [--snapshot-mb 4]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from benchmarks.synthetic import catalog, review_results
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def start_server(port: int, data_dir: str, snapshot_mb: float):
+    env = dict(
+        os.environ,
+        REVIEW_STORE="columnar",
+        REVIEW_DATA_DIR=data_dir,
+        SNAPSHOT_WAL_MB=str(snapshot_mb),
+        SEARCH_INDEX="0",
+    )
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    while True:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode} during startup")
+        try:
+            httpx.get(url + "/health", timeout=1).raise_for_status()
+            return proc, url, time.perf_counter() - start
+        except httpx.HTTPError:
+            time.sleep(0.02)
+
+
+def identity(r: dict) -> tuple:
+    # What the store deduplicates reviews on (storage.review_fingerprint)
+    return r["text"], r.get("date"), r.get("country")
+
+
+def stored_reviews(url: str, asin: str) -> list:
+    reviews = []
+    params = {"format": "ndjson", "fields": "text,date,country"}
+    with httpx.stream("GET", f"{url}/product/{asin}", params=params, timeout=60) as r:
+        for line in r.iter_lines():
+            record = json.loads(line)
+            if record["type"] == "review":
+                reviews.append(identity(record))
+    return reviews
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=200_000, help="reviews loaded before the first kill")
+    parser.add_argument("--asins", type=int, default=20)
+    parser.add_argument("--kills", type=int, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--snapshot-mb", type=float, default=4, help="SNAPSHOT_WAL_MB, small so kills hit snapshots too")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    data_dir = tempfile.mkdtemp(prefix="crash-recovery-")
+    # Every review sent, per ASIN, and the reviews whose batch was acknowledged
+    sent = {}
+    acked = {}
+
+    proc, url, ready_s = start_server(args.port, data_dir, args.snapshot_mb)
+    print(f"empty store: serving after {ready_s:.2f}s")
+    with httpx.Client(timeout=60) as client:
+        for asin, title, results in catalog(args.asins, args.reviews, seed=args.seed):
+            for i in range(0, len(results), 1000):
+                batch = results[i:i + 1000]
+                sent.setdefault(asin, set()).update(map(identity, batch))
+                client.post(url + "/ingest_results", json={"asin": asin, "title": title, "results": batch}).raise_for_status()
+                acked.setdefault(asin, set()).update(map(identity, batch))
+    asins = list(sent)
+    lock = threading.Lock()
+    batches = iter(range(10 ** 9))
+
+    def writer(stop: threading.Event):
+        with httpx.Client(timeout=10) as client:
+            while not stop.is_set():
+                with lock:
+                    n = next(batches)
+                asin = asins[n % len(asins)]
+                batch = review_results(rng.randint(1, 200), seed=n)
+                for j, r in enumerate(batch):
+                    r["text"] = f"{r['text']} (crash-recovery batch {n} #{j})"
+                with lock:
+                    sent[asin].update(map(identity, batch))
+                try:
+                    client.post(url + "/ingest_results", json={"asin": asin, "title": "", "results": batch}).raise_for_status()
+                except httpx.HTTPError:
+                    return
+                with lock:
+                    acked[asin].update(map(identity, batch))
+
+    for kill in range(1, args.kills + 1):
+        stop = threading.Event()
+        threads = [threading.Thread(target=writer, args=(stop,)) for _ in range(args.writers)]
+        for t in threads:
+            t.start()
+        time.sleep(rng.uniform(0.5, 3))
+        proc.send_signal(signal.SIGKILL)
+        proc.wait()
+        stop.set()
+        for t in threads:
+            t.join()
+
+        proc, url, ready_s = start_server(args.port, data_dir, args.snapshot_mb)
+        total = 0
+        for asin in asins:
+            reviews = stored_reviews(url, asin)
+            stored = set(reviews)
+            if len(stored) != len(reviews):
+                raise SystemExit(f"kill {kill}: {asin} has {len(reviews) - len(stored)} duplicated reviews")
+            if acked[asin] - stored:
+                raise SystemExit(f"kill {kill}: {asin} lost {len(acked[asin] - stored)} acknowledged reviews")
+            if stored - sent[asin]:
+                raise SystemExit(f"kill {kill}: {asin} has {len(stored - sent[asin])} reviews nobody sent")
+            # Unacknowledged writes that made it to the log before the kill count as written
+            acked[asin] = stored
+            total += len(stored)
+        check = httpx.get(url + "/aggregates/check", timeout=300).json()
+        if not check["ok"]:
+            raise SystemExit(f"kill {kill}: aggregates differ from stored reviews: {check['mismatches']}")
+        files = sorted(os.listdir(data_dir))
+        print(f"kill {kill}: {total} reviews intact, serving after {ready_s:.2f}s ({', '.join(files)})")
+
+    proc.send_signal(signal.SIGTERM)
+    proc.wait()
+    shutil.rmtree(data_dir)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Per-call cost of the original per-request date normalizer vs review_dates.normalize_date.
+
+Also checks that both agree on every absolute date string (the original left
+relative strings such as "3 weeks ago" as raw buckets).
+
+    python -m benchmarks.date_normalizer [--reviews 100000] [--distinct 300]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import review_date
+from review_dates import DateNormalizer
+
+
+def legacy_normalize_date(raw: str) -> str:
+    # The normalizer timeseries() used to define inline, kept as the baseline
+    s = (raw or "").strip()
+    if not s:
+        return "UNKNOWN"
+    m = re.search(r"(\d{1,2}\s+[A-Za-z]+\s+\d{4})", s)
+    if m:
+        date_text = m.group(1)
+        for fmt in ("%d %B %Y", "%d %b %Y"):
+            try:
+                return datetime.strptime(date_text, fmt).date().isoformat()
+            except Exception:
+                pass
+    m2 = re.search(r"([A-Za-z]+\s+\d{1,2},\s*\d{4})", s)
+    if m2:
+        date_text = m2.group(1)
+        for fmt in ("%B %d, %Y", "%b %d, %Y"):
+            try:
+                return datetime.strptime(date_text, fmt).date().isoformat()
+            except Exception:
+                pass
+    try:
+        return datetime.fromisoformat(s).date().isoformat()
+    except Exception:
+        return s
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    countries = ["India", "the United States", "the United Kingdom", "Canada"]
+    pool = [review_date(rng, rng.choice(countries)) for _ in range(args.distinct)]
+    pool += ["", "  ", "Sept 5, 2024", "31 February 2024", "March 3,2024", "2024-02-29T10:00:00", "5 Aug 2023"]
+    raws = [rng.choice(pool) for _ in range(args.reviews)]
+
+    normalize = DateNormalizer()
+    for raw in set(pool):
+        new, old = normalize(raw), legacy_normalize_date(raw)
+        if new != old and not re.search(r"\d+\s+\w+\s+ago", raw):
+            raise SystemExit(f"normalizers disagree on {raw!r}: {new!r} != {old!r}")
+
+    start = time.perf_counter()
+    for raw in raws:
+        legacy_normalize_date(raw)
+    legacy = time.perf_counter() - start
+
+    cold = DateNormalizer()
+    start = time.perf_counter()
+    for raw in raws:
+        cold(raw)
+    memoized = time.perf_counter() - start
+
+    parser, today = DateNormalizer(), datetime.utcnow().date()
+    start = time.perf_counter()
+    for raw in set(pool):
+        parser._parse(raw.strip(), today)
+    uncached = (time.perf_counter() - start) / len(set(pool)) * len(raws)
+
+    print(f"{args.reviews} dates, {len(set(pool))} distinct")
+    print(f"legacy     {legacy / args.reviews * 1e6:8.2f} us/date")
+    print(f"compiled   {uncached / args.reviews * 1e6:8.2f} us/date (no memo)")
+    print(f"memoized   {memoized / args.reviews * 1e6:8.2f} us/date ({legacy / memoized:.0f}x faster than legacy)")
+    print(f"memo stats {cold.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Shared store across uvicorn workers: consistency checks and scaling.
+
+For each worker count, starts a store server (python -m shared_store, backed
+by --store) and ``uvicorn app:app --workers N`` with REVIEW_STORE=remote,
+then with --clients threads, each opening a fresh connection per request so
+the kernel spreads them over the workers:
+
+- ingests batches and, right after each acknowledgement, checks /products
+  (served by any worker) already counts them
+- keeps --streams /events subscriptions open and checks each one received
+  every ASIN's versions 1..N in order, whichever worker took the write
+- checks /aggregates/check at the end
+
+and reports the request rates of ingest, /products and cold /predict_batch
+calls. Exits non-zero on the first violation.
+
+    python -m benchmarks.multi_worker [--workers 1 4] [--clients 8] [--seconds 5] [--store columnar]
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from benchmarks.synthetic import review_results, review_texts
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def wait_ready(url: str, procs) -> None:
+    while True:
+        for p in procs:
+            if p.poll() is not None:
+                raise SystemExit(f"{p.args} exited with {p.returncode}")
+        try:
+            httpx.get(url + "/health", timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+
+
+def follow(url: str, seen: dict, stop: threading.Event, ready: threading.Event) -> None:
+    """Record the versions of every change on one /events stream, per ASIN."""
+    with httpx.stream("GET", url + "/events", timeout=None) as r:
+        ready.set()
+        for line in r.iter_lines():
+            if stop.is_set():
+                return
+            if line.startswith("data:"):
+                change = json.loads(line[5:])
+                if "version" in change:
+                    seen.setdefault(change["asin"], []).append(change["version"])
+
+
+def run(workers: int, args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="multi-worker-")
+    socket = os.path.join(tmp, "store.sock")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "shared_store", "--socket", socket],
+        cwd=BACKEND, env=dict(os.environ, REVIEW_STORE=args.store, REVIEW_DB_PATH=os.path.join(tmp, "reviews.db")),
+        stdout=subprocess.DEVNULL,
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(args.port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND, env=dict(os.environ, REVIEW_STORE="remote", STORE_SOCKET=socket, EVENTS_KEEPALIVE_SECONDS="1"),
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(url, [server, api])
+        stop_streams = threading.Event()
+        streams = []
+        for _ in range(args.streams):
+            seen, ready = {}, threading.Event()
+            t = threading.Thread(target=follow, args=(url, seen, stop_streams, ready), daemon=True)
+            t.start()
+            ready.wait(10)
+            streams.append(seen)
+        # Each /events subscription registers in its worker; give them all a moment
+        time.sleep(0.5)
+
+        counts = {"ingest": 0, "products": 0, "predict_batch": 0}
+        acked = {}
+        lock = threading.Lock()
+        errors = []
+        deadline = time.perf_counter() + args.seconds
+
+        def client(c: int) -> None:
+            n = 0
+            texts = review_texts(100, seed=1000 + c)
+            while time.perf_counter() < deadline and not errors:
+                n += 1
+                asin = f"B{(c * 7 + n) % args.asins:09d}"
+                batch = review_results(20, seed=c * 100_000 + n)
+                for j, r in enumerate(batch):
+                    r["text"] = f"{r['text']} (client {c} batch {n} #{j} workers {workers})"
+                stored = httpx.post(url + "/ingest_results", json={"asin": asin, "title": "", "results": batch}).json()["stored"]
+                with lock:
+                    acked[asin] = acked.get(asin, 0) + stored
+                    expected = acked[asin]
+                    counts["ingest"] += 1
+                products = {p["asin"]: p["review_count"] for p in httpx.get(url + "/products").json()["products"]}
+                if products.get(asin, 0) < expected:
+                    errors.append(f"/products counts {products.get(asin, 0)} reviews for {asin} after {expected} were acknowledged")
+                # Distinct texts, so every batch is scored
+                fresh = [f"{t} (client {c} batch {n})" for t in texts]
+                httpx.post(url + "/predict_batch", json={"texts": fresh}, timeout=60).raise_for_status()
+                with lock:
+                    counts["products"] += 1
+                    counts["predict_batch"] += 1
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(c,)) for c in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+        if errors:
+            raise SystemExit(errors[0])
+
+        final = {p["asin"]: p["version"] for p in httpx.get(url + "/products").json()["products"]}
+        time.sleep(1)
+        stop_streams.set()
+        for i, seen in enumerate(streams):
+            for asin, version in final.items():
+                if seen.get(asin) != list(range(1, version + 1)):
+                    got = seen.get(asin, [])
+                    raise SystemExit(f"/events stream {i} saw versions {got[:5]}...{got[-5:]} of {asin}, expected 1..{version}")
+        check = httpx.get(url + "/aggregates/check", timeout=120).json()
+        if not check["ok"]:
+            raise SystemExit(f"aggregates differ from stored reviews: {check['mismatches']}")
+        return {name: n / wall for name, n in counts.items()}
+    finally:
+        api.send_signal(signal.SIGTERM)
+        api.wait()
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--asins", type=int, default=10)
+    parser.add_argument("--streams", type=int, default=4, help="/events subscriptions checked for complete deltas")
+    parser.add_argument("--store", choices=["memory", "sqlite", "columnar"], default="columnar")
+    parser.add_argument("--port", type=int, default=8798)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'ingest/s':>9} {'products/s':>10} {'predict_batch/s':>15}")
+    for workers in args.workers:
+        rates = run(workers, args)
+        print(f"{workers:>7} {rates['ingest']:>9.0f} {rates['products']:>10.0f} {rates['predict_batch']:>15.0f}", flush=True)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Throughput of ScoringPool for 1/2/4/8 workers against the inline scorer.
+
+    python -m benchmarks.pool_scaling [--size 20000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lexicon import load_analyzer
+
+from benchmarks.synthetic import review_texts
+from scoring_pool import ScoringPool
+from sentiment_engine import VaderBatchScorer
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = review_texts(args.size, seed=1)
+    inline_scorer = VaderBatchScorer(load_analyzer())
+    expected, _ = timed(lambda: inline_scorer.compound_scores(texts))  # warm the vocabulary
+    inline = min(timed(lambda: inline_scorer.compound_scores(texts))[1] for _ in range(args.repeat))
+
+    print(f"cpus={os.cpu_count()} batch={args.size}")
+    print(f"{'mode':>10} {'rev/s':>10} {'vs inline':>10}")
+    print(f"{'inline':>10} {args.size / inline:>10.0f} {1.0:>9.2f}x")
+    for workers in args.workers:
+        pool = ScoringPool(workers, min_batch=0)
+        try:
+            got, _ = timed(lambda: pool.compound_scores(texts))  # warm worker vocabularies
+            if got != expected:
+                raise SystemExit(f"pool with {workers} workers returned different scores")
+            elapsed = min(timed(lambda: pool.compound_scores(texts))[1] for _ in range(args.repeat))
+        finally:
+            pool.close()
+        print(f"{workers:>9}w {args.size / elapsed:>10.0f} {inline / elapsed:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
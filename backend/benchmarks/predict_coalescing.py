@@ -0,0 +1,75 @@
+"""Latency/throughput tradeoff of coalescing concurrent /predict calls.
+
+N concurrent clients send uncached single-text /predict requests in-process
+(httpx over ASGI) for each coalescing window; window 0 scores every call on
+its own.
+
+    python -m benchmarks.predict_coalescing [--windows 0 0.5 2 5] [--clients 1 8 32 128] [--requests 2000]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+import app
+from benchmarks.synthetic import review_texts
+from micro_batcher import MicroBatcher
+
+_run = 0
+
+
+async def load(clients: int, texts) -> tuple:
+    latencies = []
+    per_client = len(texts) // clients
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker(chunk):
+            for text in chunk:
+                t = time.perf_counter()
+                r = await client.post("/predict", json={"text": text})
+                latencies.append(time.perf_counter() - t)
+                if r.status_code != 200:
+                    raise SystemExit(f"/predict -> {r.status_code}: {r.text}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(texts[i * per_client:(i + 1) * per_client]) for i in range(clients)))
+        wall = time.perf_counter() - start
+    return latencies, wall
+
+
+def main() -> None:
+    global _run
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 0.5, 2, 5], help="milliseconds")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-batch", type=int, default=app.PREDICT_MAX_BATCH)
+    args = parser.parse_args()
+
+    base = review_texts(args.requests, seed=3)
+    print(f"{'window ms':>9} {'clients':>7} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'mean batch':>10}")
+    for window in args.windows:
+        for clients in args.clients:
+            batcher = MicroBatcher(app._predict_coalesced, max_batch=args.max_batch, window=window / 1000) if window > 0 else None
+            app.predict_batcher = batcher
+            _run += 1
+            # Distinct texts per run so every request misses the score cache
+            texts = [f"{t} (run {_run} #{i})" for i, t in enumerate(base)]
+            latencies, wall = asyncio.run(load(clients, texts))
+            ms = sorted(x * 1000 for x in latencies)
+            mean_batch = batcher.stats()["mean_batch"] if batcher else 1.0
+            print(
+                f"{window:>9} {clients:>7} {statistics.median(ms):>8.2f} {ms[int(0.99 * (len(ms) - 1))]:>8.2f} "
+                f"{len(ms) / wall:>8.0f} {mean_batch:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
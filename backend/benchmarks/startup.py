@@ -0,0 +1,55 @@
+"""Cold-import time of the API module, checked against a budget.
+
+Each run imports ``app`` in a fresh interpreter; the median is compared with
+the budget and the script exits non-zero when it is exceeded.
+
+    python -m benchmarks.startup [--runs 5] [--budget 2.0]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+IMPORT_BUDGET_SECONDS = 2.0
+
+_PROBE = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def import_time() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        # An empty in-memory store, so only the import and lexicon load are timed and no database is created
+        env=dict(os.environ, REVIEW_STORE="memory"),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f"importing app failed:\n{out.stderr}")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.environ.get("IMPORT_BUDGET_SECONDS", IMPORT_BUDGET_SECONDS)),
+    )
+    args = parser.parse_args()
+
+    times = [import_time() for _ in range(args.runs)]
+    median = statistics.median(times)
+    print(f"import app: median {median * 1000:.0f} ms, min {min(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms")
+    if median > args.budget:
+        raise SystemExit(f"over budget: {median:.2f}s > {args.budget:.2f}s")
+    print(f"within budget ({args.budget:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Memory footprint and query latency of the memory, SQLite and columnar review stores.
+
+    python -m benchmarks.storage_backends [--asins 50] [--reviews 100000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import review_results
+from columnar_store import ColumnarStore
+from storage import MemoryStore, SQLiteStore
+
+INGEST_CHUNK = 500
+
+
+def latency_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(name, make, asins, results, repeat):
+    tracemalloc.start()
+    store = make()
+    start = time.perf_counter()
+    per_asin = len(results) // len(asins)
+    for i, asin in enumerate(asins):
+        chunk = results[i * per_asin:(i + 1) * per_asin]
+        for j in range(0, len(chunk), INGEST_CHUNK):
+            store.add_results(asin, f"Product {asin}", [dict(r) for r in chunk[j:j + INGEST_CHUNK]])
+    ingest_s = time.perf_counter() - start
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    disk = os.path.getsize(store.path) + os.path.getsize(store.path + "-wal") if isinstance(store, SQLiteStore) else 0
+    asin = asins[0]
+    row = {
+        "backend": name,
+        "ingest rev/s": len(results) / ingest_s,
+        "heap MB": heap / 1e6,
+        "disk MB": disk / 1e6,
+        "/products ms": latency_ms(store.summaries, repeat),
+        "/timeseries ms": latency_ms(lambda: store.aggregates(asin, rollups=()).timeseries(), repeat),
+        "/trend ms": latency_ms(lambda: store.aggregates(asin, rollups=("week",)).trend("week"), repeat),
+        "/country ms": latency_ms(lambda: store.aggregates(asin, rollups=()).country_breakdown(), repeat),
+        # list() so lazily-read results (columnar) are materialized like the others
+        "/product ms": latency_ms(lambda: list(store.product(asin)["results"]), repeat),
+    }
+    store.close()
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--asins", type=int, default=50)
+    parser.add_argument("--reviews", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    asins = [f"B{i:09d}" for i in range(args.asins)]
+    results = review_results(args.reviews, seed=7)
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = [
+            run("memory", MemoryStore, asins, results, args.repeat),
+            run("sqlite", lambda: SQLiteStore(Path(tmp) / "reviews.db"), asins, results, args.repeat),
+            run("columnar", ColumnarStore, asins, results, args.repeat),
+        ]
+    print(f"{args.reviews} reviews across {args.asins} ASINs")
+    cols = list(rows[0].keys())
+    print("  ".join(f"{c:>14}" for c in cols))
+    for row in rows:
+        print("  ".join(f"{v:>14}" if isinstance(v, str) else f"{v:>14.2f}" for v in row.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Reproducible benchmark suite: per-function timings and in-process HTTP load.
+
+A synthetic catalog (``benchmarks.synthetic.catalog``) is loaded into a fresh
+store, then the hot functions are timed directly and every endpoint is
+loaded through FastAPI's TestClient. Results go to JSON; with ``--baseline``
+the run is compared against an earlier one (see benchmarks.compare).
+
+    python -m benchmarks.suite [--scale small|medium|large] [--store memory|sqlite|columnar]
+                               [--concurrency 1] [--requests 200] [--out run.json]
+                               [--baseline old.json] [--threshold 0.25]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import compare
+from benchmarks.synthetic import catalog, review_results, review_texts
+
+# (ASINs, reviews) per scale
+SCALES = {"small": (5, 2_000), "medium": (50, 20_000), "large": (200, 200_000)}
+INGEST_CHUNK = 500
+
+# Makes every generated text distinct across the run, so "cold" paths stay uncached
+_unique = itertools.count()
+
+
+def summarize(samples: Sequence[float], wall: float) -> Dict[str, float]:
+    ms = sorted(s * 1000 for s in samples)
+
+    def pct(p: float) -> float:
+        return ms[min(len(ms) - 1, int(p * len(ms)))]
+
+    return {
+        "n": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": statistics.median(ms),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "ops_per_s": len(ms) / wall if wall else 0.0,
+    }
+
+
+def time_calls(fn: Callable[[Any], Any], args: Sequence[Any], warmup: int = 2) -> Dict[str, float]:
+    """Time ``fn(arg)`` for each of ``args`` (after ``warmup`` untimed calls on the first ones)."""
+    for arg in args[:warmup]:
+        fn(arg)
+    samples = []
+    start = time.perf_counter()
+    for arg in args[warmup:]:
+        t = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t)
+    return summarize(samples, time.perf_counter() - start)
+
+
+def load(client, method: str, url: str, requests: Sequence[Dict[str, Any]], concurrency: int) -> Dict[str, float]:
+    """Send one request per kwargs dict in ``requests`` with ``concurrency`` threads; latency per request."""
+
+    def send(kwargs):
+        t = time.perf_counter()
+        r = client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - t
+        if r.status_code >= 400:
+            raise RuntimeError(f"{method} {url} -> {r.status_code}: {r.text[:200]}")
+        return elapsed
+
+    send(requests[0])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        samples = list(pool.map(send, requests[1:]))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def fresh_texts(n: int, seed: int) -> List[str]:
+    return [f"{t} (#{next(_unique)})" for t in review_texts(n, seed=seed)]
+
+
+def fresh_results(n: int, seed: int) -> List[Dict[str, Any]]:
+    results = review_results(n, seed=seed)
+    for r in results:
+        r["text"] = f"{r['text']} (#{next(_unique)})"
+    return results
+
+
+def micro_benchmarks(app, products, requests: int) -> Dict[str, Dict[str, float]]:
+    from aggregates import ProductAggregates
+    from review_dates import DateNormalizer
+
+    store = app.STORE
+    top = products[0][0]
+    raw_dates = [r["date"] for r in review_results(requests * 4, seed=101)]
+    batches = [fresh_texts(100, seed=i) for i in range(max(requests // 10, 5))]
+    write_batches = [fresh_results(INGEST_CHUNK, seed=200 + i) for i in range(max(requests // 20, 5))]
+    normalizer = DateNormalizer()
+    writes = itertools.count()
+    return {
+        "classify/cold": time_calls(app.classify, fresh_texts(requests, seed=1)),
+        "classify/cached": time_calls(app.classify, ["Great value, works perfectly."] * requests),
+        "classify_batch/cold[100]": time_calls(app.classify_batch, batches),
+        "normalize_date/parse": time_calls(lambda d: normalizer(d, None), raw_dates),
+        "normalize_date/memo": time_calls(lambda d: normalizer(d, None), raw_dates),
+        "aggregates.add[500]": time_calls(
+            lambda rs: ProductAggregates.from_results(rs), [products[0][2][:500]] * max(requests // 10, 5)),
+        "store.add_results[500]": time_calls(
+            lambda rs: store.add_results(f"W{next(writes):09d}", "bench", rs), write_batches),
+        "store.summaries": time_calls(lambda _: store.summaries(), range(requests)),
+        "store.timeseries": time_calls(lambda _: store.aggregates(top, rollups=()).timeseries(), range(requests)),
+        "store.trend[week]": time_calls(lambda _: store.aggregates(top, rollups=("week",)).trend("week"), range(requests)),
+        "store.country_breakdown": time_calls(
+            lambda _: store.aggregates(top, rollups=()).country_breakdown(), range(requests)),
+        "store.scan[500]": time_calls(
+            lambda _: list(itertools.islice(store.scan(top), 500)), range(max(requests // 4, 5))),
+        "index.search": time_calls(lambda q: app.review_index.search(q), ["battery life", "flimsy plastic"] * requests),
+        "index.search[phrase]": time_calls(lambda q: app.review_index.search(q), ['"battery life"'] * requests),
+        "index.top_terms[cold]": time_calls(
+            lambda _: (app.review_index._top_cache.clear(), app.review_index.top_terms(top)), range(requests)),
+    }
+
+
+def http_benchmarks(app, products, requests: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+
+    top = products[0][0]
+    few = max(requests // 20, 3)
+    stream_records = [
+        {"asin": f"S{i:09d}", "title": "bench", **r} for i in range(few + 1) for r in fresh_results(200, seed=300 + i)
+    ]
+    stream_bodies = [
+        "\n".join(json.dumps(r) for r in stream_records[i * 200:(i + 1) * 200]).encode() for i in range(few + 1)
+    ]
+    # (method, url, kwargs per request)
+    endpoints = {
+        "GET /": ("GET", "/", [{}] * requests),
+        "GET /health": ("GET", "/health", [{}] * requests),
+        "GET /cache_stats": ("GET", "/cache_stats", [{}] * requests),
+        "GET /metrics": ("GET", "/metrics", [{}] * few),
+        "POST /predict cold": ("POST", "/predict", [{"json": {"text": t}} for t in fresh_texts(requests, seed=2)]),
+        "POST /predict cached": ("POST", "/predict", [{"json": {"text": "Arrived on time, works great."}}] * requests),
+        "POST /predict_batch cold[100]": (
+            "POST", "/predict_batch", [{"json": {"texts": fresh_texts(100, seed=i)}} for i in range(few + 1)]),
+        "POST /ingest_results[200]": (
+            "POST", "/ingest_results",
+            [{"json": {"asin": f"I{i:09d}", "title": "bench", "results": fresh_results(200, seed=400 + i)}}
+             for i in range(few + 1)]),
+        "POST /ingest_reviews[200]": (
+            "POST", "/ingest_reviews",
+            [{"json": {"asin": f"R{i:09d}", "title": "bench",
+                       "reviews": [{k: r[k] for k in ("text", "date", "country")} for r in fresh_results(200, seed=500 + i)]}}
+             for i in range(few + 1)]),
+        "POST /ingest_stream[200]": ("POST", "/ingest_stream", [{"content": body} for body in stream_bodies]),
+        "GET /products": ("GET", "/products", [{}] * requests),
+        "GET /product page": ("GET", f"/product/{top}", [{}] * requests),
+        "GET /product ndjson": (
+            "GET", f"/product/{top}", [{"params": {"format": "ndjson", "fields": "sentiment,day"}}] * few),
+        "GET /timeseries": ("GET", f"/timeseries/{top}", [{}] * requests),
+        "GET /timeseries week": ("GET", f"/timeseries/{top}", [{"params": {"granularity": "week"}}] * requests),
+        "GET /country_sentiment": ("GET", f"/country_sentiment/{top}", [{}] * requests),
+        "GET /dashboard_snapshot": ("GET", f"/dashboard_snapshot/{top}", [{}] * requests),
+        "GET /dashboard_snapshot 304": (
+            "GET", f"/dashboard_snapshot/{top}", [{"headers": {"If-None-Match": "*"}}] * requests),
+        "GET /search": ("GET", "/search", [{"params": {"q": "battery life", "asin": top}}] * requests),
+        "GET /top_terms": ("GET", f"/top_terms/{top}", [{}] * requests),
+        "GET /aggregates/check": ("GET", "/aggregates/check", [{}] * 3),
+    }
+    results = {}
+    with TestClient(app.app) as client:
+        app.warmed_up.wait()
+        for name, (method, url, kwargs) in endpoints.items():
+            results[name] = load(client, method, url, kwargs, concurrency)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip()
+    except OSError:
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--asins", type=int, help="override the scale's ASIN count")
+    parser.add_argument("--reviews", type=int, help="override the scale's review count")
+    parser.add_argument("--store", choices=["memory", "sqlite", "columnar"], default="memory")
+    parser.add_argument("--requests", type=int, default=200, help="timed calls per benchmark")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads for the HTTP benchmarks")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this earlier results file")
+    parser.add_argument("--threshold", type=float, default=compare.DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    asins, reviews = SCALES[args.scale]
+    asins, reviews = args.asins or asins, args.reviews or reviews
+    tmp = tempfile.TemporaryDirectory()
+    # The app reads its settings at import time
+    os.environ["REVIEW_STORE"] = args.store
+    os.environ["REVIEW_DB_PATH"] = str(Path(tmp.name) / "reviews.db")
+    import app
+
+    products = catalog(asins, reviews, seed=args.seed)
+    start = time.perf_counter()
+    for asin, title, results in products:
+        for i in range(0, len(results), INGEST_CHUNK):
+            app.STORE.add_results(asin, title, [dict(r) for r in results[i:i + INGEST_CHUNK]])
+    load_s = time.perf_counter() - start
+    print(f"{reviews} reviews across {asins} ASINs loaded into {args.store} in {load_s:.1f}s")
+    start = time.perf_counter()
+    app.STORE.attach_index(app.review_index)
+    print(f"search index built in {time.perf_counter() - start:.1f}s")
+
+    benchmarks = micro_benchmarks(app, products, args.requests)
+    benchmarks.update(http_benchmarks(app, products, args.requests, args.concurrency))
+    run = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": args.scale,
+            "asins": asins,
+            "reviews": reviews,
+            "store": args.store,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "benchmarks": benchmarks,
+    }
+    tmp.cleanup()
+
+    width = max(len(name) for name in benchmarks)
+    print(f"{'benchmark':<{width}}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}  {'ops/s':>10}")
+    for name, stats in benchmarks.items():
+        print(f"{name:<{width}}  {stats['p50_ms']:>9.3f}  {stats['p95_ms']:>9.3f}  {stats['p99_ms']:>9.3f}  {stats['ops_per_s']:>10.1f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"wrote {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        rows = compare.compare(baseline, run, args.threshold)
+        regressions = compare.report(rows, compare.DEFAULT_METRIC, compare.config_differences(baseline, run))
+        if regressions:
+            raise SystemExit(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
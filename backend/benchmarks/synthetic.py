@@ -0,0 +1,94 @@
+"""Synthetic Amazon-style review texts for benchmarks."""
+import random
+from typing import Any, Dict, List, Tuple
+
+_OPENERS = [
+    "I bought this for my kitchen and",
+    "Ordered this last month,",
+    "Honestly",
+    "After two weeks of daily use",
+    "My wife loves it but",
+    "Not what I expected.",
+    "Five stars!",
+    "Arrived on time and",
+]
+_BODIES = [
+    "the quality is great and it works perfectly.",
+    "it stopped working after a few days, very disappointed.",
+    "the battery life is not bad at all.",
+    "it is kind of flimsy but does the job.",
+    "customer service was helpful and quick to respond!!",
+    "the packaging was damaged and one part was missing.",
+    "it's okay, nothing special, does what it says.",
+    "would NOT recommend, total waste of money.",
+    "absolutely love the design, so easy to clean.",
+    "the instructions were confusing?? took me an hour to set up.",
+    "sturdy build, fits well, good value for the price.",
+    "cheap plastic, broke the first time I used it :(",
+]
+_CLOSERS = ["", "", "Would buy again.", "Returning it.", "Highly recommend!", "Meh.", "Thanks!"]
+
+# Countries and date strings in the shapes extension/content.js captures
+_COUNTRIES = ["India", "the United States", "the United Kingdom", "Canada", "Germany", "Australia", "Japan"]
+_MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December"]
+_LABELS = ["POSITIVE", "NEUTRAL", "NEGATIVE"]
+
+# Share of long-form reviews (8-25 sentences); the rest have 1-6 sentences
+LONG_REVIEW_SHARE = 0.05
+
+
+def review_texts(n: int, seed: int = 0) -> List[str]:
+    """Return ``n`` review texts, mostly 1-6 sentences with a long tail."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        parts = [rng.choice(_OPENERS)]
+        sentences = rng.randint(7, 24) if rng.random() < LONG_REVIEW_SHARE else rng.randint(1, 5)
+        parts.extend(rng.choice(_BODIES) for _ in range(sentences))
+        parts.append(rng.choice(_CLOSERS))
+        texts.append(" ".join(p for p in parts if p))
+    return texts
+
+
+def review_date(rng: random.Random, country: str) -> str:
+    day, month, year = rng.randint(1, 28), rng.randrange(12), rng.randint(2019, 2025)
+    shape = rng.random()
+    if shape < 0.45:
+        return f"Reviewed in {country} on {day} {_MONTHS[month]} {year}"
+    if shape < 0.8:
+        return f"Reviewed in {country} on {_MONTHS[month]} {day}, {year}"
+    if shape < 0.9:
+        return f"{day:02d}/{month + 1:02d}/{year}"
+    unit = rng.choice(["days", "weeks", "months", "years"])
+    return f"{rng.randint(1, 11)} {unit} ago"
+
+
+def review_results(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """``n`` ingest-ready review results (sentiment, confidence, text, date, country)."""
+    rng = random.Random(seed)
+    texts = review_texts(n, seed=seed)
+    results = []
+    for text in texts:
+        country = rng.choice(_COUNTRIES)
+        results.append({
+            "sentiment": rng.choices(_LABELS, weights=[6, 2, 2])[0],
+            "confidence": round(rng.random(), 4),
+            "text": text,
+            "date": review_date(rng, country) if rng.random() > 0.05 else None,
+            "country": country if rng.random() > 0.1 else None,
+        })
+    return results
+
+
+def catalog(asins: int, reviews: int, seed: int = 0) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+    """``(asin, title, results)`` for ``asins`` products sharing ``reviews`` results.
+
+    Popularity is Zipf-like: the first product gets the most reviews.
+    """
+    rng = random.Random(seed)
+    products = [(f"B0{i:08d}", f"Synthetic product {i}", []) for i in range(asins)]
+    owners = rng.choices(range(asins), weights=[1 / (i + 1) for i in range(asins)], k=reviews)
+    for owner, r in zip(owners, review_results(reviews, seed=seed)):
+        products[owner][2].append(r)
+    return products
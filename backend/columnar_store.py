@@ -0,0 +1,550 @@
+"""Compact, array-backed review storage.
+
+Each ASIN keeps its reviews as parallel NumPy columns instead of one dict per
+review:
+
+- sentiment: uint8 code into the store-wide label table (POSITIVE, NEUTRAL, NEGATIVE, ...)
+- confidence: float32, plus the integer millionths the trend rollups sum
+- day: int32 date ordinal of the normalized date, or a negative id into the
+  table of labels that aren't dates ("UNKNOWN", raw fallback strings)
+- date, country: int32 ids into interned string tables (id 0 is None)
+- text: (offset, length) into one shared UTF-8 arena
+
+Aggregates are computed with ``np.bincount`` over the columns, and rows are
+only turned back into dicts when they are read.
+
+With a ``data_dir`` the store is persistent. Every ``add_results`` call is
+appended to a write-ahead log (write_ahead_log.py) before it is applied.
+Once the log outgrows ``snapshot_wal_bytes``, a background thread writes a
+compacted snapshot (one ``.npy`` file per column over all ASINs, the text
+arena, fingerprints and a JSON manifest) and starts a fresh log. On startup
+the latest snapshot is memory-mapped, not parsed: each ASIN's columns are
+read-only slices of the mapped arrays until its next write copies them. Only
+the logs written since that snapshot are replayed.
+
+    data_dir/snapshot-<generation>/   state before wal-<generation>.log
+    data_dir/wal-<generation>.log     writes since then
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from aggregates import GRANULARITIES, SENTIMENTS, ProductAggregates, confidence_micros
+from review_dates import normalize_date
+from storage import ReviewFilter, ReviewStore, _unseen
+from write_ahead_log import WriteAheadLog, fsync_dir, replay
+
+_COLUMNS = {
+    "sentiment": np.uint8,
+    "confidence": np.float32,
+    "confidence_micros": np.int64,
+    "day": np.int32,
+    "date": np.int32,
+    "country": np.int32,
+    "text_start": np.int64,
+    "text_len": np.int32,
+}
+
+SNAPSHOT_FORMAT = 1
+# Review fields a write-ahead log record keeps
+_LOGGED_FIELDS = ("sentiment", "confidence", "text", "date", "country", "day")
+
+
+class _Interner:
+    """Dictionary encoding for repeated strings; id 0 is reserved for None."""
+
+    def __init__(self, values=()):
+        self.values: List[Optional[str]] = [None]
+        self.ids: Dict[Optional[str], int] = {None: 0}
+        for v in values:
+            self.id(v)
+
+    def id(self, value: Optional[str]) -> int:
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+class _TextArena:
+    """Append-only UTF-8 storage shared by every ASIN.
+
+    A restored arena reads its first ``len(base)`` bytes from the snapshot's
+    mapped text file; later texts go to an in-memory buffer after it.
+    """
+
+    def __init__(self, base: Optional[np.ndarray] = None):
+        self.base = base if base is not None else np.zeros(0, dtype=np.uint8)
+        self._base_len = len(self.base)
+        self._buf = bytearray()
+
+    def append(self, text: str):
+        data = text.encode("utf-8")
+        start = self._base_len + len(self._buf)
+        self._buf += data
+        return start, len(data)
+
+    def get(self, start: int, length: int) -> str:
+        if start < self._base_len:
+            return self.base[start:start + length].tobytes().decode("utf-8")
+        start -= self._base_len
+        return self._buf[start:start + length].decode("utf-8")
+
+    def tail(self) -> bytes:
+        """Copy of the bytes appended after ``base``."""
+        return bytes(self._buf)
+
+    def __len__(self) -> int:
+        return self._base_len + len(self._buf)
+
+
+class _Columns:
+    def __init__(self, capacity: int = 64):
+        self.n = 0
+        self.cols = {name: np.zeros(capacity, dtype=dtype) for name, dtype in _COLUMNS.items()}
+
+    @classmethod
+    def wrap(cls, cols: Dict[str, np.ndarray]) -> "_Columns":
+        """Full columns over existing (e.g. read-only mapped) arrays; the next write copies them."""
+        columns = cls(0)
+        columns.cols = cols
+        columns.n = len(cols["sentiment"])
+        return columns
+
+    def reserve(self, extra: int) -> None:
+        capacity = len(self.cols["sentiment"])
+        if self.n + extra <= capacity:
+            return
+        capacity = max(capacity, 64)
+        while capacity < self.n + extra:
+            capacity *= 2
+        for name, col in self.cols.items():
+            grown = np.zeros(capacity, dtype=col.dtype)
+            grown[: self.n] = col[: self.n]
+            self.cols[name] = grown
+
+    def view(self, name: str) -> np.ndarray:
+        return self.cols[name][: self.n]
+
+
+class ColumnarStore(ReviewStore):
+    def __init__(
+        self,
+        data_dir: Optional[Union[str, Path]] = None,
+        snapshot_wal_bytes: int = 64 * 1024 * 1024,
+        fsync: bool = True,
+    ):
+        self._labels = _Interner(SENTIMENTS)
+        self._dates = _Interner()
+        self._countries = _Interner()
+        self._day_labels = _Interner()  # non-date day labels, stored as -id
+        self._arena = _TextArena()
+        self._products: Dict[str, Dict[str, Any]] = {}
+        self._columns: Dict[str, _Columns] = {}
+        self._counts: Dict[str, np.ndarray] = {}
+        self._fingerprints: Dict[str, Set[bytes]] = {}
+        self._versions: Dict[str, int] = {}
+        self._version_total = 0
+        self.store_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        # Restored ASINs' fingerprints, turned into sets on their next write
+        self._mapped_fingerprints: Dict[str, np.ndarray] = {}
+        self.data_dir = Path(data_dir) if data_dir is not None else None
+        self.snapshot_wal_bytes = snapshot_wal_bytes
+        self._wal: Optional[WriteAheadLog] = None
+        self._generation = 0
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_pending = False
+        if self.data_dir is not None:
+            self._restore(fsync)
+
+    def _day_code(self, day: str) -> int:
+        try:
+            parsed = date.fromisoformat(day)
+        except ValueError:
+            parsed = None
+        if parsed is not None and parsed.isoformat() == day:
+            return parsed.toordinal()
+        return -self._day_labels.id(day)
+
+    def _day_label(self, code: int) -> str:
+        return date.fromordinal(code).isoformat() if code > 0 else self._day_labels.values[-code]
+
+    def add_results(self, asin: str, title: str, results: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            seen = self._seen(asin)
+            fresh = _unseen(results, seen)
+            reviews = [r for _, r in fresh]
+            updated_at = datetime.utcnow().isoformat()
+            for r in reviews:
+                # Resolved now and logged, so relative dates ("3 weeks ago") replay to the same day
+                r["day"] = normalize_date(r.get("date"))
+            try:
+                self._intern_labels(reviews)
+                if self._wal is not None:
+                    self._wal.append({
+                        "asin": asin,
+                        "title": title,
+                        "updated_at": updated_at,
+                        "results": [{f: r.get(f) for f in _LOGGED_FIELDS} for r in reviews],
+                    })
+            except BaseException:
+                seen.difference_update(fp for fp, _ in fresh)
+                raise
+            self._apply(asin, title, reviews, updated_at, seen)
+            if self._wal is not None:
+                self._maybe_snapshot(self._wal.size)
+        return len(reviews)
+
+    def _maybe_snapshot(self, logged: int) -> None:
+        # Called under the write lock; the snapshot itself runs in the background
+        if logged >= self.snapshot_wal_bytes and not self._snapshot_pending:
+            self._snapshot_pending = True
+            threading.Thread(target=self.snapshot, name="columnar-snapshot", daemon=True).start()
+
+    def _seen(self, asin: str) -> Set[bytes]:
+        seen = self._fingerprints.get(asin)
+        if seen is None:
+            # Left mapped until _apply keeps the set, so a failed write loses nothing
+            mapped = self._mapped_fingerprints.get(asin)
+            raw = mapped.tobytes() if mapped is not None else b""
+            seen = {raw[i:i + 16] for i in range(0, len(raw), 16)}
+        return seen
+
+    def _intern_labels(self, reviews: List[Dict[str, Any]]) -> None:
+        # Checked before the write is logged, so every logged write can be replayed
+        for r in reviews:
+            if self._labels.id(r["sentiment"]) > np.iinfo(np.uint8).max:
+                raise ValueError("too many distinct sentiment labels for a uint8 code")
+
+    def _apply(self, asin: str, title: str, fresh: List[Dict[str, Any]], updated_at: str, seen: Set[bytes]) -> None:
+        if asin not in self._products:
+            self._products[asin] = {"title": title, "updated_at": updated_at}
+            self._columns[asin] = _Columns()
+            self._counts[asin] = np.zeros(len(SENTIMENTS), dtype=np.int64)
+        self._fingerprints[asin] = seen
+        self._mapped_fingerprints.pop(asin, None)
+        columns = self._columns[asin]
+        columns.reserve(len(fresh))
+        cols, i = columns.cols, columns.n
+        start = i
+        for r in fresh:
+            cols["sentiment"][i] = self._labels.ids[r["sentiment"]]
+            cols["confidence"][i] = r["confidence"]
+            # From the stored float32, so rollups match what iter_results returns
+            cols["confidence_micros"][i] = confidence_micros(float(str(cols["confidence"][i])))
+            cols["day"][i] = self._day_code(r.get("day") or normalize_date(r.get("date")))
+            cols["date"][i] = self._dates.id(r.get("date"))
+            cols["country"][i] = self._countries.id(r.get("country"))
+            cols["text_start"][i], cols["text_len"][i] = self._arena.append(r["text"])
+            i += 1
+        codes = cols["sentiment"][columns.n:i]
+        columns.n = i
+        counts = np.bincount(codes, minlength=len(self._labels.values))
+        self._counts[asin] += counts[1:len(SENTIMENTS) + 1]
+        self._products[asin]["title"] = title or self._products[asin]["title"]
+        self._products[asin]["updated_at"] = updated_at
+        self._versions[asin] = self._versions.get(asin, 0) + 1
+        self._version_total += 1
+        if self.index is not None:
+            self.index.add(asin, list(enumerate(fresh, start)))
+        if self._listeners:
+            payload = self._products[asin]
+            delta = ProductAggregates.from_results(fresh)
+            self._notify(asin, payload["title"], payload["updated_at"], self._versions[asin], delta)
+
+    def __contains__(self, asin: str) -> bool:
+        return asin in self._products
+
+    def asins(self) -> List[str]:
+        return list(self._products.keys())
+
+    def version(self, asin: Optional[str] = None) -> Optional[int]:
+        return self._version_total if asin is None else self._versions.get(asin)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "asin": asin,
+                    "title": payload["title"],
+                    "updated_at": payload["updated_at"],
+                    "review_count": self._columns[asin].n,
+                    "counts": dict(zip(SENTIMENTS, self._counts[asin].tolist())),
+                    "version": self._versions[asin],
+                }
+                for asin, payload in self._products.items()
+            ]
+
+    def product(self, asin: str) -> Optional[Dict[str, Any]]:
+        payload = self._products.get(asin)
+        if payload is None:
+            return None
+        # Lazy: rows are only decoded when the results are iterated
+        return {"title": payload["title"], "results": self.iter_results(asin), "updated_at": payload["updated_at"]}
+
+    def iter_results(self, asin: str) -> Iterator[Dict[str, Any]]:
+        return (r for _, r in self.scan(asin))
+
+    def scan(self, asin: str, start: int = 0, where: Optional[ReviewFilter] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            columns = self._columns[asin]
+            snapshot = {name: columns.view(name)[start:].copy() for name in _COLUMNS}
+        positions = self._matching(snapshot, where) if where is not None else range(len(snapshot["sentiment"]))
+        for i in positions:
+            yield start + i, self._review(snapshot, i)
+
+    def _review(self, snapshot: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+        return {
+            "sentiment": self._labels.values[snapshot["sentiment"][i]],
+            # shortest repr of the float32 gives back the submitted decimal
+            "confidence": float(str(snapshot["confidence"][i])),
+            "text": self._arena.get(int(snapshot["text_start"][i]), int(snapshot["text_len"][i])),
+            "date": self._dates.values[snapshot["date"][i]],
+            "country": self._countries.values[snapshot["country"][i]],
+            "day": self._day_label(int(snapshot["day"][i])),
+        }
+
+    def reviews_at(self, asin: str, positions: Sequence[int]) -> List[Dict[str, Any]]:
+        index = np.asarray(positions, dtype=np.int64)
+        with self._lock:
+            columns = self._columns[asin]
+            snapshot = {name: columns.view(name)[index] for name in _COLUMNS}
+        return [self._review(snapshot, i) for i in range(len(index))]
+
+    def _matching(self, snapshot: Dict[str, np.ndarray], where: ReviewFilter) -> List[int]:
+        # The filter is translated to codes once and applied as vectorized masks
+        mask = np.ones(len(snapshot["sentiment"]), dtype=bool)
+        if where.sentiments is not None:
+            codes = [self._labels.ids[s] for s in where.sentiments if s in self._labels.ids]
+            mask &= np.isin(snapshot["sentiment"], codes)
+        if where.countries is not None:
+            codes = [self._countries.ids[c] for c in where.countries if c in self._countries.ids]
+            mask &= np.isin(snapshot["country"], codes)
+        if where.has_day_range:
+            day = snapshot["day"]
+            mask &= day > 0
+            if where.day_from is not None:
+                mask &= day >= date.fromisoformat(where.day_from).toordinal()
+            if where.day_to is not None:
+                mask &= day <= date.fromisoformat(where.day_to).toordinal()
+        return np.flatnonzero(mask).tolist()
+
+    def aggregates(self, asin: str, rollups: Sequence[str] = GRANULARITIES) -> ProductAggregates:
+        with self._lock:
+            columns = self._columns[asin]
+            sentiment = columns.view("sentiment").copy()
+            day = columns.view("day").copy()
+            country = columns.view("country").copy()
+            micros = columns.view("confidence_micros").copy()
+            counts = self._counts[asin].copy()
+        n_labels = len(self._labels.values)
+        agg = ProductAggregates()
+        agg.review_count = len(sentiment)
+        agg.counts = dict(zip(SENTIMENTS, counts.tolist()))
+        agg.by_date = self._group(day, sentiment, n_labels, self._day_label, order_by_first=False)
+        agg.by_country = self._group(country, sentiment, n_labels, self._countries.values.__getitem__, order_by_first=True)
+        if not rollups:
+            return agg
+        # Trend rollups are merged from per-day sums; only ordinal (dated) days have periods
+        days, inverse = np.unique(day, return_inverse=True)
+        day_micros = np.bincount(inverse.reshape(-1), weights=micros, minlength=len(days))
+        for code, total in zip(days.tolist(), day_micros.tolist()):
+            if code > 0:
+                label = self._day_label(code)
+                agg.merge_day(label, agg.by_date[label], int(total), rollups)
+        return agg
+
+    def _group(self, keys: np.ndarray, sentiment: np.ndarray, n_labels: int, decode, order_by_first: bool):
+        # groupby(keys) x sentiment counts via one bincount over a combined index
+        uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        table = np.bincount(inverse.reshape(-1) * n_labels + sentiment, minlength=len(uniq) * n_labels)
+        table = table.reshape(len(uniq), n_labels)
+        order = np.argsort(first, kind="stable") if order_by_first else range(len(uniq))
+        labels = self._labels.values
+        buckets = {}
+        for g in order:
+            bucket = {s: 0 for s in SENTIMENTS}
+            for code in np.flatnonzero(table[g]).tolist():
+                bucket[labels[code]] = int(table[g, code])
+            buckets[decode(int(uniq[g]))] = bucket
+        return buckets
+
+    # ----- persistence -----
+
+    def _path(self, kind: str, generation: int) -> Path:
+        return self.data_dir / (f"snapshot-{generation:08d}" if kind == "snapshot" else f"wal-{generation:08d}.log")
+
+    def _generations(self, kind: str) -> List[int]:
+        """Generations of the complete snapshots or the logs in ``data_dir``, ascending."""
+        prefix, suffix = ("snapshot-", "") if kind == "snapshot" else ("wal-", ".log")
+        found = []
+        for path in self.data_dir.iterdir():
+            name = path.name
+            if name.startswith(prefix) and name.endswith(suffix):
+                generation = name[len(prefix):len(name) - len(suffix)]
+                if generation.isdigit():
+                    found.append(int(generation))
+        return sorted(found)
+
+    def _restore(self, fsync: bool) -> None:
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        snapshots = self._generations("snapshot")
+        if snapshots:
+            self._generation = snapshots[-1]
+            self._load_snapshot(self._path("snapshot", self._generation))
+        logs = [g for g in self._generations("wal") if g >= self._generation]
+        for g in logs:
+            # Only the newest log can end in a torn record; older ones were closed cleanly
+            for record in replay(self._path("wal", g), truncate=g == logs[-1]):
+                seen = self._seen(record["asin"])
+                fresh = [r for _, r in _unseen(record["results"], seen)]
+                self._intern_labels(fresh)
+                self._apply(record["asin"], record["title"], fresh, record["updated_at"], seen)
+        if logs:
+            self._generation = logs[-1]
+        self._wal = WriteAheadLog(self._path("wal", self._generation), fsync)
+        self._remove_stale()
+        # Compact a long replayed tail (e.g. after a crash during a snapshot) so the next start is fast again
+        with self._lock:
+            self._maybe_snapshot(sum(self._path("wal", g).stat().st_size for g in logs))
+
+    def _load_snapshot(self, path: Path) -> None:
+        manifest = json.loads((path / "manifest.json").read_text())
+        if manifest["format"] != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path}: unsupported snapshot format {manifest['format']}")
+        offsets = np.load(path / "offsets.npy")
+        mapped = "r" if offsets[-1] else None  # empty arrays can't be mapped
+        cols = {name: np.load(path / f"{name}.npy", mmap_mode=mapped) for name in _COLUMNS}
+        fingerprints = np.load(path / "fingerprints.npy", mmap_mode=mapped)
+        counts = np.load(path / "counts.npy")
+        text = path / "text.bin"
+        self._arena = _TextArena(np.memmap(text, dtype=np.uint8, mode="r") if text.stat().st_size else None)
+        self._labels = _Interner(manifest["labels"][1:])
+        self._dates = _Interner(manifest["dates"][1:])
+        self._countries = _Interner(manifest["countries"][1:])
+        self._day_labels = _Interner(manifest["day_labels"][1:])
+        self.store_id = manifest["store_id"]
+        self._version_total = manifest["version_total"]
+        for i, product in enumerate(manifest["products"]):
+            asin, lo, hi = product["asin"], int(offsets[i]), int(offsets[i + 1])
+            self._products[asin] = {"title": product["title"], "updated_at": product["updated_at"]}
+            self._versions[asin] = product["version"]
+            self._columns[asin] = _Columns.wrap({name: col[lo:hi] for name, col in cols.items()})
+            self._counts[asin] = counts[i].copy()
+            self._mapped_fingerprints[asin] = fingerprints[lo:hi]
+
+    def snapshot(self) -> Optional[Path]:
+        """Write a compacted snapshot and start a fresh write-ahead log; returns the snapshot directory."""
+        if self.data_dir is None:
+            return None
+        with self._snapshot_lock:
+            with self._lock:
+                if self._wal is None:
+                    self._snapshot_pending = False
+                    return None
+                state = self._capture()
+                old_wal = self._wal
+                self._generation += 1
+                generation = self._generation
+                self._wal = WriteAheadLog(self._path("wal", generation), old_wal.fsync)
+                self._snapshot_pending = False
+            old_wal.close()
+            path = self._write_snapshot(state, generation)
+            self._remove_stale()
+            return path
+
+    def _capture(self) -> Dict[str, Any]:
+        # Copies of everything a snapshot holds, taken under the write lock
+        asins = list(self._products)
+        sizes = [self._columns[a].n for a in asins]
+        fingerprints = []
+        for asin in asins:
+            seen = self._fingerprints.get(asin)
+            fingerprints.append(b"".join(seen) if seen is not None else self._mapped_fingerprints[asin].tobytes())
+        return {
+            "manifest": {
+                "format": SNAPSHOT_FORMAT,
+                "store_id": self.store_id,
+                "version_total": self._version_total,
+                "labels": list(self._labels.values),
+                "dates": list(self._dates.values),
+                "countries": list(self._countries.values),
+                "day_labels": list(self._day_labels.values),
+                "products": [
+                    {"asin": a, "version": self._versions[a], **self._products[a]} for a in asins
+                ],
+            },
+            "offsets": np.concatenate(([0], np.cumsum(sizes, dtype=np.int64))),
+            "columns": {
+                name: np.concatenate([self._columns[a].view(name) for a in asins] + [np.zeros(0, dtype=dtype)])
+                for name, dtype in _COLUMNS.items()
+            },
+            "counts": np.array([self._counts[a] for a in asins], dtype=np.int64).reshape(len(asins), len(SENTIMENTS)),
+            "fingerprints": np.frombuffer(b"".join(fingerprints), dtype=np.uint8).reshape(-1, 16),
+            "text_base": self._arena.base,
+            "text_tail": self._arena.tail(),
+        }
+
+    def _write_snapshot(self, state: Dict[str, Any], generation: int) -> Path:
+        final = self._path("snapshot", generation)
+        tmp = final.with_name(final.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        arrays = {"offsets": state["offsets"], "counts": state["counts"], "fingerprints": state["fingerprints"],
+                  **state["columns"]}
+        for name, array in arrays.items():
+            with open(tmp / f"{name}.npy", "wb") as f:
+                np.save(f, array)
+                f.flush()
+                os.fsync(f.fileno())
+        with open(tmp / "text.bin", "wb") as f:
+            f.write(memoryview(state["text_base"]))
+            f.write(state["text_tail"])
+            f.flush()
+            os.fsync(f.fileno())
+        with open(tmp / "manifest.json", "w") as f:
+            json.dump(state["manifest"], f)
+            f.flush()
+            os.fsync(f.fileno())
+        fsync_dir(tmp)
+        # The rename publishes the snapshot; a crash before it leaves only a .tmp directory
+        tmp.rename(final)
+        fsync_dir(self.data_dir)
+        return final
+
+    def _remove_stale(self) -> None:
+        # Mapped files of a removed snapshot stay readable until they are unmapped
+        current = self._generation
+        snapshots = [g for g in self._generations("snapshot") if g <= current]
+        latest = snapshots[-1] if snapshots else 0
+        for g in snapshots[:-1]:
+            shutil.rmtree(self._path("snapshot", g), ignore_errors=True)
+        for g in self._generations("wal"):
+            if g < latest:
+                self._path("wal", g).unlink()
+        for tmp in self.data_dir.glob("snapshot-*.tmp"):
+            shutil.rmtree(tmp, ignore_errors=True)
+        fsync_dir(self.data_dir)
+
+    def close(self) -> None:
+        # A final snapshot, so the next start maps it instead of replaying this log
+        if self._wal is not None and self._wal.size:
+            self.snapshot()
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the columns and the text arena (excluding interned tables and fingerprints)."""
+        cols = sum(col.nbytes for c in self._columns.values() for col in c.cols.values())
+        return cols + len(self._arena)
@@ -1,10 +1,18 @@
+import json
 import os
+import re
+import threading
+import time
+from collections import deque
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import streamlit as st
 import altair as alt
 
 API_URL = os.environ.get("API_URL", "https://amazon-reviews-sentiment-analyser-backend.onrender.com/")
+# With live updates on, the page reruns at most this often while deltas arrive
+LIVE_INTERVAL = float(os.environ.get("DASHBOARD_LIVE_INTERVAL", "2"))
 
 st.set_page_config(page_title="Sentiment Dashboard", layout="wide")
 
@@ -30,34 +38,259 @@ def lightify(chart: alt.Chart) -> alt.Chart:
 st.title("Analytics Dashboard")
 st.caption("Analyze and compare reviews across multiple products in near real-time")
 
-@st.cache_data(ttl=15)
-def fetch_products(api_url: str):
-    try:
-        r = requests.get(f"{api_url}/products", timeout=10)
+class ApiClient:
+    """Pooled keep-alive session that revalidates earlier responses with If-None-Match."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._etags = {}  # url -> (etag, decoded body)
+        self._lock = threading.Lock()
+
+    def get_json(self, api_url: str, path: str):
+        url = f"{api_url.rstrip('/')}{path}"
+        with self._lock:
+            cached = self._etags.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        r = self.session.get(url, headers=headers, timeout=10)
+        if r.status_code == 304 and cached:
+            return cached[1]
         r.raise_for_status()
-        return r.json().get("products", [])
-    except Exception as e:
-        st.error(f"Failed to load products: {e}")
-        return []
+        data = r.json()
+        if r.headers.get("ETag"):
+            with self._lock:
+                self._etags[url] = (r.headers["ETag"], data)
+        return data
+
+SENTIMENT_COLUMNS = ["Positive", "Neutral", "Negative"]
+_ISO_DAY = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def date_sort_key(label: str):
+    # The API's timeseries order: ISO dates first, raw fallback buckets after them
+    return (0, label) if _ISO_DAY.fullmatch(label) else (1, label)
+
+def sentiment_frame(keys, positive, neutral, negative, index_name: str, sort_key=None) -> pd.DataFrame:
+    """Counts indexed by date label / country; a missing country is shown as "Unknown"."""
+    index = pd.Index(["Unknown" if k is None else k for k in keys], name=index_name, dtype=object)
+    frame = pd.DataFrame({"Positive": positive, "Neutral": neutral, "Negative": negative}, index=index, dtype="int64")
+    frame = frame.groupby(level=0, sort=False).sum()
+    if sort_key is not None:
+        frame = frame.reindex(sorted(frame.index, key=sort_key))
+    return frame
+
+def add_rows(frame: pd.DataFrame, rows, sort_key=None) -> pd.DataFrame:
+    """``frame`` plus a delta's ``[key, positive, neutral, negative]`` rows; new keys go last (or by ``sort_key``)."""
+    if not rows:
+        return frame
+    keys, positive, neutral, negative = zip(*rows)
+    delta = sentiment_frame(keys, positive, neutral, negative, frame.index.name)
+    order = list(frame.index) + [k for k in delta.index if k not in frame.index]
+    if sort_key is not None:
+        order.sort(key=sort_key)
+    return frame.add(delta, fill_value=0).astype("int64").reindex(order)
+
+def sse_events(lines):
+    """``(id, event, data)`` for each server-sent event in an iterator of decoded lines."""
+    event_id, name, data = None, "message", []
+    for line in lines:
+        if not line:
+            if data:
+                yield event_id, name, "\n".join(data)
+            name, data = "message", []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "id":
+            event_id = value
+        elif field == "event":
+            name = value
+        elif field == "data":
+            data.append(value)
+
+class LiveState:
+    """Dashboard data kept current by the API's /events stream.
+
+    The product list and each viewed product are loaded once (/products and
+    /dashboard_snapshot, revalidated with ETags); after that every pushed delta
+    is added to the local summaries and DataFrames instead of re-pulling them
+    (its rows are buffered and folded into the DataFrames when next read, so
+    a burst of commits costs one pandas op per view). A version gap or a "resync" event drops the affected data, which is
+    reloaded on its next read. Recent deltas are replayed onto fresh loads, so
+    a commit racing a load is neither lost nor counted twice.
+    """
+
+    def __init__(self, client: ApiClient, api_url: str):
+        self.client = client
+        self.api_url = api_url.rstrip("/")
+        self._summaries = None  # asin -> /products row, or None until (re)loaded
+        self._views = {}  # asin -> {"version", "product", "timeseries", "countries", "pending"}
+        self._recent = deque(maxlen=256)
+        self._changed = threading.Condition()
+        self.generation = 0  # bumped on every applied event
+        self.connected = False
+        threading.Thread(target=self._listen, name="dashboard-events", daemon=True).start()
+
+    @staticmethod
+    def _apply_summary(summaries, delta) -> bool:
+        row = summaries.get(delta["asin"])
+        version = row["version"] if row else 0
+        if delta["version"] <= version:
+            return True
+        if delta["version"] != version + 1:
+            return False
+        if row is None:
+            row = summaries[delta["asin"]] = {
+                "asin": delta["asin"], "review_count": 0, "counts": dict.fromkeys(delta["counts"], 0),
+            }
+        row.update(title=delta["title"], updated_at=delta["updated_at"], version=delta["version"])
+        row["review_count"] += delta["review_count"]
+        row["counts"] = {k: row["counts"].get(k, 0) + n for k, n in delta["counts"].items()}
+        return True
+
+    @staticmethod
+    def _apply_view(view, delta) -> bool:
+        if delta["version"] <= view["version"]:
+            return True
+        if delta["version"] != view["version"] + 1:
+            return False
+        product = view["product"]
+        view["version"] = delta["version"]
+        view["product"] = {
+            **product,
+            "title": delta["title"],
+            "updated_at": delta["updated_at"],
+            "review_count": product["review_count"] + delta["review_count"],
+            "counts": {k: product["counts"].get(k, 0) + n for k, n in delta["counts"].items()},
+        }
+        view["pending"]["dates"].extend(delta["dates"])
+        view["pending"]["countries"].extend(delta["countries"])
+        return True
+
+    @staticmethod
+    def _fold(view) -> None:
+        pending = view["pending"]
+        if pending["dates"] or pending["countries"]:
+            view["timeseries"] = add_rows(view["timeseries"], pending["dates"], sort_key=date_sort_key)
+            view["countries"] = add_rows(view["countries"], pending["countries"])
+            view["pending"] = {"dates": [], "countries": []}
+
+    def _apply(self, delta) -> None:
+        with self._changed:
+            self._recent.append(delta)
+            if self._summaries is not None and not self._apply_summary(self._summaries, delta):
+                self._summaries = None
+            view = self._views.get(delta["asin"])
+            if view is not None and not self._apply_view(view, delta):
+                del self._views[delta["asin"]]
+            self.generation += 1
+            self._changed.notify_all()
 
-@st.cache_data(ttl=15)
-def fetch_timeseries(api_url: str, asin: str):
+    def invalidate(self) -> None:
+        with self._changed:
+            self._summaries = None
+            self._views.clear()
+            self.generation += 1
+            self._changed.notify_all()
+
+    def _listen(self) -> None:
+        session = requests.Session()
+        last_id, delay = None, 1.0
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if last_id:
+                headers["Last-Event-ID"] = last_id
+            try:
+                # Read timeout well above the server's keepalive interval
+                with session.get(f"{self.api_url}/events", headers=headers, stream=True, timeout=(5, 60)) as r:
+                    r.raise_for_status()
+                    self.connected, delay = True, 1.0
+                    for event_id, name, data in sse_events(r.iter_lines(decode_unicode=True)):
+                        last_id = event_id or last_id
+                        if name == "delta":
+                            self._apply(json.loads(data))
+                        elif name == "resync":
+                            self.invalidate()
+            except (requests.RequestException, ValueError):
+                pass
+            self.connected = False
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def products(self) -> pd.DataFrame:
+        with self._changed:
+            summaries = self._summaries
+        if summaries is None:
+            rows = self.client.get_json(self.api_url, "/products").get("products", [])
+            # Copies: the client keeps the decoded body for revalidation
+            summaries = {p["asin"]: {**p, "counts": dict(p["counts"])} for p in rows}
+            with self._changed:
+                if all(self._apply_summary(summaries, d) for d in self._recent):
+                    self._summaries = summaries
+        with self._changed:
+            return pd.DataFrame(
+                [dict(p) for p in summaries.values()],
+                columns=["asin", "title", "updated_at", "review_count", "counts", "version"],
+            )
+
+    def product(self, asin: str):
+        """``{version, product, timeseries, countries}`` for ``asin``; the DataFrames are never modified in place."""
+        with self._changed:
+            view = self._views.get(asin)
+        if view is None:
+            snapshot = self.client.get_json(self.api_url, f"/dashboard_snapshot/{asin}")
+            ts, countries = snapshot["timeseries"], snapshot["country_sentiment"]
+            view = {
+                "version": snapshot["version"],
+                "product": {**snapshot["product"], "counts": dict(snapshot["product"]["counts"])},
+                "timeseries": sentiment_frame(
+                    ts["labels"], ts["positive"], ts["neutral"], ts["negative"], "Date", sort_key=date_sort_key),
+                "countries": sentiment_frame(
+                    countries["countries"], countries["positive"], countries["neutral"], countries["negative"], "Country"),
+                "pending": {"dates": [], "countries": []},
+            }
+            with self._changed:
+                # A snapshot raced by writes has no version; it is shown but not kept
+                if view["version"] is not None and all(
+                    self._apply_view(view, d) for d in self._recent if d["asin"] == asin
+                ):
+                    self._views[asin] = view
+        with self._changed:
+            self._fold(view)
+            return {k: view[k] for k in ("version", "product", "timeseries", "countries")}
+
+    def wait_for_change(self, seen: int, timeout: float) -> int:
+        """Block until ``generation`` moves past ``seen`` (or ``timeout`` passes); returns it."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.generation != seen, timeout)
+            return self.generation
+
+# One client (and connection pool) shared by every rerun and session
+@st.cache_resource
+def api_client() -> ApiClient:
+    return ApiClient()
+
+# One event stream per API, shared by every rerun and session
+@st.cache_resource
+def live_state(api_url: str) -> LiveState:
+    return LiveState(api_client(), api_url)
+
+def fetch_products(live: LiveState):
     try:
-        r = requests.get(f"{api_url}/timeseries/{asin}", timeout=10)
-        r.raise_for_status()
-        return r.json()
+        return live.products()
     except Exception as e:
-        st.error(f"Failed to load timeseries for {asin}: {e}")
+        st.error(f"Failed to load products: {e}")
         return None
 
-@st.cache_data(ttl=15)
-def fetch_country_sentiment(api_url: str, asin: str):
+# Timeseries, country breakdown and summary for one product, kept current by /events
+def fetch_view(live: LiveState, asin: str):
     try:
-        r = requests.get(f"{api_url}/country_sentiment/{asin}", timeout=10)
-        r.raise_for_status()
-        return r.json()
+        return live.product(asin)
     except Exception as e:
-        st.error(f"Failed to load country sentiment for {asin}: {e}")
+        st.error(f"Failed to load dashboard data for {asin}: {e}")
         return None
 
 # Sidebar settings
@@ -65,19 +298,22 @@ with st.sidebar:
     st.subheader("Settings")
     API_URL = st.text_input("API URL", API_URL)
     refresh = st.button("Refresh Data")
+    live_updates = st.toggle("Live updates", value=True)
+    live_status = st.empty()
     st.markdown("---")
     st.caption("Keep the extension running while browsing to ingest reviews.")
 
-products = fetch_products(API_URL)
+live = live_state(API_URL)
 if refresh:
-    st.cache_data.clear()
-    products = fetch_products(API_URL)
+    live.invalidate()
+run_started = time.monotonic()
+seen_generation = live.generation
+df_products = fetch_products(live)
 
-if not products:
+if df_products is None or df_products.empty:
     st.info("No products ingested yet. Open some Amazon product pages with the extension running.")
 else:
     # KPIs
-    df_products = pd.DataFrame(products)
     total_products = int(df_products.shape[0])
     total_reviews = int(df_products["review_count"].sum()) if total_products else 0
     most_recent = df_products["updated_at"].max() if total_products else "-"
@@ -93,21 +329,15 @@ else:
     st.markdown("")
 
     # Selection
-    asin_titles = {p["asin"]: p["title"] for p in products}
+    asin_titles = dict(zip(df_products["asin"], df_products["title"]))
     asin = st.selectbox("Select product", options=list(asin_titles.keys()), format_func=lambda a: f"{asin_titles[a]} ({a})")
 
     def render_product_section(asin_value: str, header: str):
         st.subheader(header)
-        ts = fetch_timeseries(API_URL, asin_value)
-        if not ts:
+        view = fetch_view(live, asin_value)
+        if not view:
             return
-        labels = ts["labels"]
-        df = pd.DataFrame({
-            "Date": labels,
-            "Positive": ts["positive"],
-            "Neutral": ts["neutral"],
-            "Negative": ts["negative"],
-        })
+        df = view["timeseries"].reset_index()
         base = alt.Chart(df).encode(x=alt.X("Date:N", title="Date / Bucket"))
         chart = alt.layer(
             base.mark_line(color="#2ecc71", point=True).encode(y=alt.Y("Positive:Q", title="Count"), tooltip=["Date", "Positive"]),
@@ -116,6 +346,8 @@ else:
         ).properties(height=280).interactive()
         st.altair_chart(lightify(chart), use_container_width=True)
 
+    view = fetch_view(live, asin)
+
     # Main tabs (no product comparison)
     tab1, tab2, tab3 = st.tabs(["Sentiment Distribution","Time Trends", "Country Analysis"])
     
@@ -123,19 +355,10 @@ else:
         st.subheader("Sentiment by Country of Origin")
         
         # Country analysis for selected product
-        country_data = fetch_country_sentiment(API_URL, asin)
-        if country_data and country_data["countries"]:
+        df_country_wide = view["countries"].reset_index() if view else None
+        if df_country_wide is not None and not df_country_wide.empty:
             # Create long format data for Altair
-            countries = country_data["countries"]
-            data_long = []
-            for i, country in enumerate(countries):
-                data_long.extend([
-                    {"Country": country, "Sentiment": "Positive", "Count": country_data["positive"][i]},
-                    {"Country": country, "Sentiment": "Neutral", "Count": country_data["neutral"][i]},
-                    {"Country": country, "Sentiment": "Negative", "Count": country_data["negative"][i]}
-                ])
-            
-            df_country_long = pd.DataFrame(data_long)
+            df_country_long = df_country_wide.melt("Country", var_name="Sentiment", value_name="Count")
             
             # Stacked bar chart for country sentiment
             chart_country = alt.Chart(df_country_long).mark_bar().encode(
@@ -150,13 +373,6 @@ else:
             st.altair_chart(lightify(chart_country), use_container_width=True)
             
             # Country comparison table (wide format)
-            df_country_wide = pd.DataFrame({
-                "Country": country_data["countries"],
-                "Positive": country_data["positive"],
-                "Neutral": country_data["neutral"],
-                "Negative": country_data["negative"]
-            })
-            
             st.subheader("Country Breakdown")
             st.dataframe(df_country_wide, use_container_width=True, hide_index=True)
         else:
@@ -166,11 +382,7 @@ else:
         st.subheader("Sentiment Distribution & Confidence Analysis")
         
         # Get product data for sentiment analysis
-        product_data = None
-        for p in products:
-            if p["asin"] == asin:
-                product_data = p
-                break
+        product_data = view["product"] if view else None
         
         if product_data:
             col1, col2 = st.columns(2)
@@ -238,17 +450,11 @@ else:
         st.subheader("Sentiment Trends Over Time")
         
         # Individual time trends for selected product
-        ts = fetch_timeseries(API_URL, asin)
-        if ts and ts["labels"]:
+        df_time = view["timeseries"].reset_index() if view else None
+        if df_time is not None and not df_time.empty:
             st.markdown(f"**{asin_titles[asin]}**")
             
-            # Create time series data (wide -> long for cleaner legend and styling)
-            df_time = pd.DataFrame({
-                "Date": ts["labels"],
-                "Positive": ts["positive"],
-                "Neutral": ts["neutral"],
-                "Negative": ts["negative"]
-            })
+            # Time series data (wide -> long for cleaner legend and styling)
             df_time_long = df_time.melt("Date", var_name="Sentiment", value_name="Value")
             # Coerce dates to temporal axis by parsing to pandas datetime where possible
             try:
@@ -300,11 +506,11 @@ else:
             # Time series summary
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Peak Positive", max(ts["positive"]) if ts["positive"] else 0)
+                st.metric("Peak Positive", int(df_time["Positive"].max()))
             with col2:
-                st.metric("Peak Neutral", max(ts["neutral"]) if ts["neutral"] else 0)
+                st.metric("Peak Neutral", int(df_time["Neutral"].max()))
             with col3:
-                st.metric("Peak Negative", max(ts["negative"]) if ts["negative"] else 0)
+                st.metric("Peak Negative", int(df_time["Negative"].max()))
         else:
             st.info("No time series data available for this product")
 
@@ -315,4 +521,12 @@ else:
     })
     st.dataframe(pretty, use_container_width=True, hide_index=True)
 
-st.caption("By Ayushi Bose")
\ No newline at end of file
+st.caption("By Ayushi Bose")
+
+# Rerun as soon as /events delivers a change (at most every LIVE_INTERVAL seconds).
+# The status update each second lets Streamlit interrupt the wait for widget reruns.
+if live_updates:
+    while live.wait_for_change(seen_generation, timeout=1.0) == seen_generation:
+        live_status.caption("Live: connected" if live.connected else "Live: reconnecting…")
+    time.sleep(max(0.0, run_started + LIVE_INTERVAL - time.monotonic()))
+    st.rerun()
\ No newline at end of file
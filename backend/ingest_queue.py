@@ -0,0 +1,144 @@
+"""Asynchronous ingest of raw review texts: a bounded queue in front of a
+score-then-store pipeline.
+
+``IngestQueue.submit`` only enqueues the job, so the endpoint can answer
+before anything is scored, and raises ``asyncio.QueueFull`` once ``depth``
+jobs, or ``max_reviews`` reviews between them, are waiting. Two stages run
+as tasks on the event loop with their work on the threadpool: scoring
+drains queued jobs (up to ``max_batch`` reviews) and scores all their texts
+in one call, and storing commits each scored batch per ASIN, in submission
+order, while the next batch is scored.
+``close`` finishes every accepted job.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# (asin, title, reviews with text, date and country)
+Job = Tuple[str, str, List[Dict[str, Any]]]
+
+
+class IngestQueue:
+    def __init__(
+        self,
+        score: Callable[[List[str]], List[Dict[str, Any]]],
+        store: Callable[[str, str, List[Dict[str, Any]]], int],
+        depth: int = 1000,
+        max_batch: int = 2000,
+        max_reviews: int = 100_000,
+    ):
+        if depth < 1 or max_reviews < 1:
+            raise ValueError("depth and max_reviews must be at least 1")
+        self.score = score
+        self.store = store
+        self.depth = depth
+        self.max_batch = max_batch
+        self.max_reviews = max_reviews
+        self._jobs: Optional["asyncio.Queue[Optional[Job]]"] = None
+        self._scored: Optional["asyncio.Queue[Optional[List[Job]]]"] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._queued_reviews = 0
+        # Reviews through each stage
+        self.counts = {"accepted": 0, "rejected": 0, "scored": 0, "stored": 0, "skipped": 0, "failed": 0}
+        self.score_batches = 0
+        self.store_commits = 0
+
+    async def start(self) -> None:
+        self._jobs = asyncio.Queue(maxsize=self.depth)
+        # One batch waits for the store while the next is scored
+        self._scored = asyncio.Queue(maxsize=1)
+        self._tasks = {
+            asyncio.ensure_future(self._score_stage()),
+            asyncio.ensure_future(self._store_stage()),
+        }
+
+    def submit(self, asin: str, title: str, reviews: List[Dict[str, Any]]) -> int:
+        """Queue ``reviews`` of ``asin``; the number of jobs now waiting."""
+        if self._jobs is None:
+            raise RuntimeError("IngestQueue is not started")
+        try:
+            if self._queued_reviews + len(reviews) > self.max_reviews:
+                raise asyncio.QueueFull
+            self._jobs.put_nowait((asin, title, reviews))
+        except asyncio.QueueFull:
+            self.counts["rejected"] += len(reviews)
+            raise
+        self.counts["accepted"] += len(reviews)
+        self._queued_reviews += len(reviews)
+        return self._jobs.qsize()
+
+    async def _score_stage(self) -> None:
+        done = False
+        while not done:
+            batch = [await self._jobs.get()]
+            if batch[0] is None:
+                break
+            size = len(batch[0][2])
+            while size < self.max_batch and not self._jobs.empty():
+                job = self._jobs.get_nowait()
+                if job is None:
+                    done = True
+                    break
+                batch.append(job)
+                size += len(job[2])
+            self._queued_reviews -= size
+            texts = [r["text"] for _, _, reviews in batch for r in reviews]
+            try:
+                scores = await run_in_threadpool(self.score, texts)
+            except Exception:
+                logger.exception("scoring %d queued reviews failed", len(texts))
+                self.counts["failed"] += len(texts)
+                continue
+            self.score_batches += 1
+            self.counts["scored"] += len(texts)
+            scored = iter(scores)
+            await self._scored.put([
+                (asin, title, [{**next(scored), **r} for r in reviews]) for asin, title, reviews in batch
+            ])
+        await self._scored.put(None)
+
+    async def _store_stage(self) -> None:
+        while True:
+            batch = await self._scored.get()
+            if batch is None:
+                return
+            # Jobs of one ASIN in a batch are committed together, in order
+            groups: Dict[str, Dict[str, Any]] = {}
+            for asin, title, results in batch:
+                group = groups.setdefault(asin, {"title": "", "results": []})
+                group["title"] = title or group["title"]
+                group["results"].extend(results)
+            for asin, group in groups.items():
+                try:
+                    stored = await run_in_threadpool(self.store, asin, group["title"], group["results"])
+                except Exception:
+                    logger.exception("storing %d queued reviews of %s failed", len(group["results"]), asin)
+                    self.counts["failed"] += len(group["results"])
+                    continue
+                self.store_commits += 1
+                self.counts["stored"] += stored
+                self.counts["skipped"] += len(group["results"]) - stored
+
+    async def close(self) -> None:
+        """Score and store everything accepted, then stop the stages."""
+        if self._jobs is None:
+            return
+        await self._jobs.put(None)
+        await asyncio.gather(*self._tasks)
+        self._jobs = self._scored = None
+        self._tasks = set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "max_reviews": self.max_reviews,
+            "queued_jobs": self._jobs.qsize() if self._jobs is not None else 0,
+            "queued_reviews": self._queued_reviews,
+            **self.counts,
+            "score_batches": self.score_batches,
+            "store_commits": self.store_commits,
+        }
@@ -0,0 +1,75 @@
+"""Local, pre-parsed VADER lexicon.
+
+The API never downloads NLTK data at startup. Instead the lexicon is compiled
+once, at build time, into a pickled dict next to this module:
+
+    python -m lexicon            # from the backend directory
+
+Set ``VADER_LEXICON_PATH`` to load it from somewhere else.
+"""
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Dict
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+FORMAT_VERSION = 1
+DEFAULT_PATH = Path(__file__).resolve().parent / "data" / "vader_lexicon.pickle"
+
+
+class LexiconNotFoundError(RuntimeError):
+    pass
+
+
+def lexicon_path() -> Path:
+    return Path(os.environ.get("VADER_LEXICON_PATH", DEFAULT_PATH))
+
+
+def load_lexicon(path: Path = None) -> Dict[str, float]:
+    path = path or lexicon_path()
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        raise LexiconNotFoundError(
+            f"VADER lexicon not found at {path}. Build it with `python -m lexicon` "
+            "from the backend directory (needs NLTK's vader_lexicon data once), "
+            "or point VADER_LEXICON_PATH at a compiled copy."
+        ) from None
+    if not isinstance(payload, dict) or payload.get("version") != FORMAT_VERSION:
+        raise LexiconNotFoundError(f"{path} is not a compiled lexicon (format v{FORMAT_VERSION}); rebuild it.")
+    return payload["lexicon"]
+
+
+def load_analyzer(path: Path = None) -> SentimentIntensityAnalyzer:
+    """A ``SentimentIntensityAnalyzer`` backed by the compiled lexicon (no NLTK data lookup)."""
+    sia = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    sia.lexicon_file = None
+    sia.lexicon = load_lexicon(path)
+    sia.constants = VaderConstants()
+    return sia
+
+
+def build(path: Path = None) -> Path:
+    """Compile NLTK's vader_lexicon.txt into the pickled form ``load_lexicon`` reads."""
+    import nltk
+
+    path = path or lexicon_path()
+    try:
+        sia = SentimentIntensityAnalyzer()
+    except LookupError:
+        nltk.download("vader_lexicon")
+        sia = SentimentIntensityAnalyzer()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": FORMAT_VERSION, "lexicon": sia.lexicon}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    out = build(Path(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print(f"Wrote {out}")
@@ -0,0 +1,104 @@
+"""Fan-out of per-ASIN store changes to server-sent-event subscribers.
+
+The store calls ``DeltaBroker.publish`` (from any thread) after every commit;
+the broker numbers the change, keeps the last ``history`` of them for clients
+reconnecting with Last-Event-ID, and queues it for each subscriber on the
+event loop. A subscriber that falls ``queue_size`` events behind, or resumes
+from an id older than the history, gets a single "resync" event instead and
+should reload its state.
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+# (id, event name, JSON data)
+Event = Tuple[int, str, str]
+
+
+class Subscription:
+    def __init__(self, asins: Optional[Set[str]], queue_size: int):
+        self.asins = asins
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, asin: str) -> bool:
+        return self.asins is None or asin in self.asins
+
+    def resync(self, event_id: int) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait((event_id, "resync", "{}"))
+
+    async def get(self) -> Event:
+        return await self.queue.get()
+
+
+class DeltaBroker:
+    def __init__(self, history: int = 1000, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._history: Deque[Tuple[int, str, Event]] = deque(maxlen=history)
+        self._subscribers: List[Subscription] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next_id = 1
+        self.published = 0
+        self.resyncs = 0
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Deliver on ``loop`` from now on; None stops delivery."""
+        self._loop = loop
+
+    def publish(self, asin: str, change: Dict[str, Any]) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        data = json.dumps(change, separators=(",", ":"))
+        loop.call_soon_threadsafe(self._dispatch, asin, data)
+
+    def _dispatch(self, asin: str, data: str) -> None:
+        event = (self._next_id, "delta", data)
+        self._next_id += 1
+        self.published += 1
+        self._history.append((event[0], asin, event))
+        for sub in self._subscribers:
+            if sub.wants(asin):
+                try:
+                    sub.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self.resyncs += 1
+                    sub.resync(event[0])
+
+    def subscribe(self, asins: Optional[Set[str]] = None, last_id: Optional[int] = None) -> Subscription:
+        """Must be called on the event loop. ``last_id`` replays the retained events after it."""
+        sub = Subscription(asins, self.queue_size)
+        if last_id is not None:
+            oldest = self._history[0][0] if self._history else self._next_id
+            if last_id + 1 < oldest or last_id >= self._next_id:
+                # Missed events are gone (or the id is from another server run)
+                sub.resync(self._next_id - 1)
+            else:
+                for event_id, asin, event in self._history:
+                    if event_id > last_id and sub.wants(asin):
+                        try:
+                            sub.queue.put_nowait(event)
+                        except asyncio.QueueFull:
+                            sub.resync(event_id)
+                            break
+        self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub in self._subscribers:
+            self._subscribers.remove(sub)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "last_id": self._next_id - 1,
+        }
+
+
+def format_event(event: Event) -> str:
+    event_id, name, data = event
+    return f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
@@ -0,0 +1,78 @@
+"""Coalescing of concurrent single-item calls into batches.
+
+``MicroBatcher.submit(item)`` parks the caller on a future. With no batch
+in flight an item is dispatched at once, so a lone caller never waits;
+items arriving while a batch runs queue up and go out together when it
+finishes, ``window`` seconds after the first of them or once ``max_batch``
+have queued, whichever comes first. Batches are handed to ``fn`` as one
+list on the threadpool, off the event loop, and each caller gets its own
+result back.
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 64, window: float = 0.002):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.fn = fn
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if not self._running or len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            # The loop only keeps weak references to tasks
+            self._running.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        # Items that queued up behind this batch go out now
+        if self._pending:
+            self._flush()
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await run_in_threadpool(self.fn, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            # Callers that went away (client disconnects) have cancelled futures
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,75 @@
+"""Incremental newline-delimited JSON reading for request body streams.
+
+``iter_lines`` turns an async iterator of body chunks (optionally gzip
+compressed) into numbered lines without ever buffering more than one line;
+gzip bodies are inflated a bounded piece at a time, so a small body that
+expands to one huge line cannot take more memory than that.
+"""
+import zlib
+from typing import AsyncIterator, Optional, Tuple
+
+MAX_LINE_BYTES = 1024 * 1024
+# Largest piece of a gzip body inflated at once
+INFLATE_CHUNK = 64 * 1024
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+    gzip: bool = False,
+    max_line_bytes: int = MAX_LINE_BYTES,
+) -> AsyncIterator[Tuple[int, Optional[bytes], Optional[Exception]]]:
+    """Yield ``(line_no, line, error)``; blank lines are skipped, over-long lines yield an error."""
+    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzip else None
+    buf = b""
+    line_no = 0
+    skipping = False  # inside an over-long line, dropping bytes until its newline
+
+    async def data():
+        async for chunk in chunks:
+            if inflate is None:
+                if chunk:
+                    yield chunk
+                continue
+            while chunk:
+                out = inflate.decompress(chunk, INFLATE_CHUNK)
+                chunk = inflate.unconsumed_tail
+                if out:
+                    yield out
+        if inflate is not None:
+            tail = inflate.flush()
+            if tail:
+                yield tail
+            if not inflate.eof:
+                raise zlib.error("truncated gzip body")
+
+    async for chunk in data():
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            if nl < 0:
+                if not skipping:
+                    buf += chunk[start:]
+                    if len(buf) > max_line_bytes:
+                        line_no += 1
+                        yield line_no, None, LineTooLong(f"line exceeds {max_line_bytes} bytes")
+                        buf = b""
+                        skipping = True
+                break
+            if skipping:
+                skipping = False
+            else:
+                line = buf + chunk[start:nl]
+                line_no += 1
+                if len(line) > max_line_bytes:
+                    yield line_no, None, LineTooLong(f"line exceeds {max_line_bytes} bytes")
+                elif line.strip():
+                    yield line_no, line, None
+            buf = b""
+            start = nl + 1
+    if buf.strip() and not skipping:
+        line_no += 1
+        yield line_no, buf, None
@@ -0,0 +1,145 @@
+"""Normalization of the raw review date strings captured by the extension.
+
+``normalize_date`` maps strings such as "Reviewed in India on 5 August 2025",
+"Reviewed in the United States on March 3, 2024", "2024-03-03" or
+"3 weeks ago" to an ISO date (YYYY-MM-DD). Anything it can't read is returned
+unchanged (stripped) as its own bucket, and empty input becomes "UNKNOWN".
+
+Patterns are precompiled, month names are resolved through a lookup table
+instead of trial ``strptime`` calls, and results are memoized per raw string.
+Relative dates are resolved against the current UTC day, so they are meant to
+be normalized once, at ingest time.
+"""
+import calendar
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+UNKNOWN = "UNKNOWN"
+
+# "5 August 2025" (day month year) and "March 3, 2024" (month day, year)
+_DAY_MONTH_YEAR = re.compile(r"(\d{1,2})(\s+)([A-Za-z]+)(\s+)(\d{4})")
+_MONTH_DAY_YEAR = re.compile(r"([A-Za-z]+)(\s+)(\d{1,2}),(\s*)(\d{4})")
+# The relative form content.js's findReviewDate falls back to
+_RELATIVE = re.compile(r"(\d+)\s+(day|week|month|year)s?\s+ago", re.IGNORECASE)
+_ISO_LABEL = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Full and abbreviated English month names, as strptime's %B / %b accept them
+_MONTHS: Dict[str, int] = {}
+for _i in range(1, 13):
+    _MONTHS[calendar.month_name[_i].lower()] = _i
+    _MONTHS[calendar.month_abbr[_i].lower()] = _i
+
+
+def _iso(year: int, month: int, day: int) -> Optional[str]:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _months_back(today: date, n: int) -> date:
+    y, m = divmod(today.year * 12 + today.month - 1 - n, 12)
+    m += 1
+    if y < 1:
+        return date.min
+    return date(y, m, min(today.day, calendar.monthrange(y, m)[1]))
+
+
+def _relative(n: int, unit: str, today: date) -> str:
+    unit = unit.lower()
+    try:
+        if unit == "day":
+            return (today - timedelta(days=n)).isoformat()
+        if unit == "week":
+            return (today - timedelta(weeks=n)).isoformat()
+        if unit == "month":
+            return _months_back(today, n).isoformat()
+        return _months_back(today, 12 * n).isoformat()
+    except OverflowError:
+        return date.min.isoformat()
+
+
+class DateNormalizer:
+    """Memoizing raw-date -> ISO-date mapper (see module docstring)."""
+
+    def __init__(self, max_memo: int = 100_000):
+        self.max_memo = max_memo
+        self._memo: Dict[str, str] = {}
+        # Relative results are only valid for the day they were computed on
+        self._relative_memo: Dict[str, str] = {}
+        self._relative_day: Optional[date] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, raw: Optional[str], today: Optional[date] = None) -> str:
+        if not raw:
+            return UNKNOWN
+        hit = self._memo.get(raw)
+        if hit is not None:
+            self.hits += 1
+            return hit
+        today = today or datetime.utcnow().date()
+        if today == self._relative_day:
+            hit = self._relative_memo.get(raw)
+            if hit is not None:
+                self.hits += 1
+                return hit
+        self.misses += 1
+        label, relative = self._parse(raw.strip(), today)
+        with self._lock:
+            if relative:
+                if today != self._relative_day:
+                    self._relative_memo = {}
+                    self._relative_day = today
+                memo = self._relative_memo
+            else:
+                memo = self._memo
+            if len(memo) >= self.max_memo:
+                memo.clear()
+            memo[raw] = label
+        return label
+
+    def _parse(self, s: str, today: date) -> Tuple[str, bool]:
+        if not s:
+            return UNKNOWN, False
+        m = _DAY_MONTH_YEAR.search(s)
+        if m:
+            month = _MONTHS.get(m.group(3).lower())
+            if month:
+                iso = _iso(int(m.group(5)), month, int(m.group(1)))
+                if iso:
+                    return iso, False
+        m = _MONTH_DAY_YEAR.search(s)
+        # strptime's "%B %d, %Y" needs whitespace after the comma
+        if m and m.group(4):
+            month = _MONTHS.get(m.group(1).lower())
+            if month:
+                iso = _iso(int(m.group(5)), month, int(m.group(3)))
+                if iso:
+                    return iso, False
+        try:
+            return datetime.fromisoformat(s).date().isoformat(), False
+        except ValueError:
+            pass
+        m = _RELATIVE.search(s)
+        if m:
+            return _relative(int(m.group(1)), m.group(2), today), True
+        return s, False  # fallback raw bucket
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._memo) + len(self._relative_memo),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+normalize_date = DateNormalizer()
+
+
+def date_sort_key(label: str):
+    # ISO dates first, in order; raw fallback buckets after them
+    return (0, label) if _ISO_LABEL.fullmatch(label) else (1, label)
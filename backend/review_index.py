@@ -0,0 +1,357 @@
+"""Inverted index over stored review texts, for /search and /top_terms.
+
+Texts are split with VADER's own tokenization (whitespace split, single
+characters dropped, one attached PUNC_LIST entry removed; see
+``VaderBatchScorer.word``), then lowercased and stripped of surrounding
+punctuation. Every stored review is one document. Per document the index
+keeps its ASIN, sentiment and store position, and its term ids in order in
+one flat forward array. Per term it keeps the ascending ids of the documents
+containing it.
+
+A query intersects the posting lists of its terms, rarest first; phrases
+are then confirmed against the candidates' term sequences in the forward
+array. /top_terms counts, with a bincount over an ASIN's slice of the
+forward array, how many of its positive and negative reviews contain each
+term. Everything after tokenization is NumPy, so neither touches raw texts.
+
+The store feeds the index from ``add_results`` (``ReviewStore.attach_index``);
+appends and the snapshots queries take of the arrays share one lock. While
+the reviews stored earlier are backfilled, new ones are held back and
+indexed after them, so document ids keep following insertion order.
+"""
+import re
+import string
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from aggregates import SENTIMENTS
+
+_STRIP = string.punctuation + "“”‘’…"
+_PHRASE = re.compile(r'"([^"]*)"')
+
+# Not useful as /top_terms results; still searchable
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being below
+between both but by can can't could couldn't did didn't do does doesn't doing don't down during each even ever
+every few for from further get got had hadn't has hasn't have haven't having he her here hers herself him himself
+his how i i'm i've if in into is isn't it it's its itself just let's like me more most much my myself no nor not
+now of off on once one only or other our ours ourselves out over own really same she should shouldn't so some
+still such than that that's the their theirs them themselves then there these they they're this those through to
+too under until up us very was wasn't we we're were weren't what when where which while who whom why will with
+won't would wouldn't you you're your yours yourself yourselves
+""".split())
+
+
+class _Growable:
+    """Append-only NumPy vector; ``view()`` stays valid while later appends reallocate."""
+
+    def __init__(self, dtype, capacity: int = 4):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.n = 0
+
+    def extend(self, values: np.ndarray) -> None:
+        end = self.n + len(values)
+        if end > len(self._data):
+            grown = np.empty(max(end, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self.n] = self._data[:self.n]
+            self._data = grown
+        self._data[self.n:end] = values
+        self.n = end
+
+    def view(self) -> np.ndarray:
+        return self._data[:self.n]
+
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+
+def parse_query(q: str) -> Tuple[List[str], List[str]]:
+    """``("quoted phrases", bare terms)`` of a query string, before tokenization."""
+    phrases = [p for p in _PHRASE.findall(q) if p.strip()]
+    return phrases, _PHRASE.sub(" ", q).replace('"', " ").split()
+
+
+class ReviewIndex:
+    def __init__(self, word: Callable[[str], Optional[str]], max_cached_tokens: int = 1_000_000):
+        self._word = word
+        self.max_cached_tokens = max_cached_tokens
+        self._raw: Dict[str, Optional[str]] = {}  # raw whitespace token -> term (None if dropped)
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._postings: List[_Growable] = []
+        self._stop = _Growable(np.bool_, 1024)
+        self._asin_ids: Dict[str, int] = {}
+        self._asin_docs: List[_Growable] = []
+        self._sentiment_codes = {s: i for i, s in enumerate(SENTIMENTS)}
+        self._forward = _Growable(np.int32, 1024)
+        self._first = _Growable(np.bool_, 1024)  # first occurrence of the term in its document
+        self._doc_start = _Growable(np.int64, 256)
+        self._doc_len = _Growable(np.int32, 256)
+        self._doc_asin = _Growable(np.int32, 256)
+        self._doc_sentiment = _Growable(np.uint8, 256)
+        self._doc_position = _Growable(np.int64, 256)
+        self._top_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        # (asin, reviews) added during a backfill, and each ASIN's first held position
+        self._backlog: Optional[List[Tuple[str, List[Tuple[int, Dict[str, Any]]]]]] = None
+        self._backlog_start: Dict[str, int] = {}
+        self._lock = threading.RLock()  # re-entered when finish_backfill indexes under it
+
+    # ----- tokenization -----
+
+    def _term(self, raw: str) -> Optional[str]:
+        term = self._raw.get(raw, False)
+        if term is False:
+            if len(self._raw) >= self.max_cached_tokens:
+                self._raw = {}
+            word = self._word(raw)
+            term = word.lower().strip(_STRIP) if word is not None else None
+            self._raw[raw] = term = term if term and len(term) > 1 else None
+        return term
+
+    def terms(self, text: str) -> List[str]:
+        """``text``'s index terms, in order."""
+        return [t for t in map(self._term, text.split()) if t is not None]
+
+    def _id(self, term: str) -> int:
+        tid = self._term_ids.get(term)
+        if tid is None:
+            tid = self._term_ids[term] = len(self._terms)
+            self._terms.append(term)
+            self._postings.append(_Growable(np.int32))
+            self._stop.extend(np.array([term in STOPWORDS]))
+        return tid
+
+    # ----- updates -----
+
+    @property
+    def ready(self) -> bool:
+        """False from ``begin_backfill`` until ``finish_backfill`` has indexed everything held."""
+        return self._backlog is None
+
+    def begin_backfill(self) -> None:
+        """Hold ``add`` calls until ``finish_backfill``, so reviews stored earlier get the lower ids."""
+        with self._lock:
+            if self._backlog is None:
+                self._backlog, self._backlog_start = [], {}
+
+    def backfill_end(self, asin: str) -> Optional[int]:
+        """First store position of ``asin`` that was held back, if any; backfills stop before it."""
+        with self._lock:
+            return self._backlog_start.get(asin)
+
+    def backfill(self, asin: str, reviews: Sequence[Tuple[int, Dict[str, Any]]]) -> None:
+        self._add(asin, reviews)
+
+    def finish_backfill(self) -> None:
+        # Catch up while writes keep arriving, then index the rest holding the lock, so
+        # writers wait briefly instead of outpacing the catch-up indefinitely
+        for _ in range(3):
+            with self._lock:
+                held, self._backlog = self._backlog, []
+            for asin, reviews in held:
+                self._add(asin, reviews)
+        with self._lock:
+            for asin, reviews in self._backlog:
+                self._add(asin, reviews)
+            self._backlog = None
+
+    def add(self, asin: str, reviews: Sequence[Tuple[int, Dict[str, Any]]]) -> None:
+        """Index ``(store position, review)`` pairs stored for ``asin``."""
+        if not reviews:
+            return
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.append((asin, list(reviews)))
+                self._backlog_start.setdefault(asin, reviews[0][0])
+                return
+        self._add(asin, reviews)
+
+    def _add(self, asin: str, reviews: Sequence[Tuple[int, Dict[str, Any]]]) -> None:
+        if not reviews:
+            return
+        tokenized = [self.terms(r["text"]) for _, r in reviews]
+        lens = np.fromiter(map(len, tokenized), dtype=np.int32, count=len(tokenized))
+        with self._lock:
+            code = self._asin_ids.get(asin)
+            if code is None:
+                code = self._asin_ids[asin] = len(self._asin_docs)
+                self._asin_docs.append(_Growable(np.int32))
+            ids = np.fromiter((self._id(t) for terms in tokenized for t in terms), dtype=np.int32, count=int(lens.sum()))
+            first_doc = self._doc_len.n
+            local = np.repeat(np.arange(len(reviews), dtype=np.int64), lens)
+            # Each (document, term) pair once, at its first occurrence
+            _, first_at = np.unique(local * len(self._terms) + ids, return_index=True)
+            first = np.zeros(len(ids), dtype=bool)
+            first[first_at] = True
+            starts = self._forward.n + np.concatenate(([0], np.cumsum(lens)[:-1])).astype(np.int64)
+            self._forward.extend(ids)
+            self._first.extend(first)
+            self._doc_start.extend(starts)
+            self._doc_len.extend(lens)
+            self._doc_asin.extend(np.full(len(reviews), code, dtype=np.int32))
+            self._doc_sentiment.extend(np.fromiter(
+                (self._sentiment_codes.get(r.get("sentiment"), 255) for _, r in reviews), dtype=np.uint8, count=len(reviews)))
+            self._doc_position.extend(np.fromiter((p for p, _ in reviews), dtype=np.int64, count=len(reviews)))
+            self._asin_docs[code].extend(np.arange(first_doc, first_doc + len(reviews), dtype=np.int32))
+            # Postings: documents grouped by term, ascending within each term
+            pair_terms = ids[first]
+            pair_docs = (local[first] + first_doc).astype(np.int32)
+            order = np.argsort(pair_terms, kind="stable")
+            pair_terms, pair_docs = pair_terms[order], pair_docs[order]
+            if len(pair_terms):
+                bounds = np.flatnonzero(np.diff(pair_terms)) + 1
+                heads = pair_terms[np.concatenate(([0], bounds))].tolist()
+                for tid, docs in zip(heads, np.split(pair_docs, bounds)):
+                    self._postings[tid].extend(docs)
+
+    # ----- queries -----
+
+    def _snapshot(self, names: Iterable[str]) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, f"_{name}").view() for name in names}
+
+    def search(
+        self,
+        q: str,
+        asins: Optional[Set[str]] = None,
+        sentiments: Optional[Set[str]] = None,
+        before: Optional[int] = None,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """Documents containing every term and phrase of ``q``, newest first.
+
+        Returns ``{"terms", "phrases", "total", "hits", "more"}`` where ``hits``
+        are ``(doc id, asin, store position)`` for up to ``limit`` matches older
+        than document ``before``, ``more`` tells whether older ones remain and
+        ``total`` counts every match.
+        """
+        raw_phrases, raw_terms = parse_query(q)
+        phrases = [terms for terms in map(self.terms, raw_phrases) if terms]
+        terms = [t for raw in raw_terms for t in self.terms(raw)]
+        out = {"terms": terms, "phrases": [" ".join(p) for p in phrases], "total": 0, "hits": [], "more": False}
+        wanted = terms + [t for p in phrases for t in p]
+        if not wanted:
+            return out
+        with self._lock:
+            ids = [self._term_ids.get(t) for t in wanted]
+            if None in ids:
+                return out
+            postings = {tid: self._postings[tid].view() for tid in set(ids)}
+            asin_codes = [self._asin_ids[a] for a in asins or () if a in self._asin_ids]
+            docs = self._snapshot(("doc_asin", "doc_sentiment", "doc_position", "doc_start", "doc_len", "forward"))
+            asin_names = list(self._asin_ids)
+        if asins is not None and not asin_codes:
+            return out
+
+        # Rarest posting list first keeps every intersection small
+        ordered = sorted(postings.values(), key=len)
+        matches = ordered[0]
+        for other in ordered[1:]:
+            matches = np.intersect1d(matches, other, assume_unique=True)
+        if asins is not None:
+            matches = matches[np.isin(docs["doc_asin"][matches], asin_codes)]
+        if sentiments is not None:
+            codes = [self._sentiment_codes[s] for s in sentiments if s in self._sentiment_codes]
+            matches = matches[np.isin(docs["doc_sentiment"][matches], codes)]
+        for phrase in phrases:
+            if len(phrase) > 1:
+                matches = self._containing(docs, matches, [self._term_ids[t] for t in phrase])
+        out["total"] = int(len(matches))
+        if before is not None:
+            matches = matches[matches < before]
+        out["more"] = bool(len(matches) > limit)
+        page = matches[::-1][:limit]
+        out["hits"] = [
+            (doc, asin_names[code], position)
+            for doc, code, position in zip(
+                page.tolist(), docs["doc_asin"][page].tolist(), docs["doc_position"][page].tolist())
+        ]
+        return out
+
+    @staticmethod
+    def _containing(docs: Dict[str, np.ndarray], candidates: np.ndarray, phrase: List[int]) -> np.ndarray:
+        """The ``candidates`` whose term sequence contains ``phrase``."""
+        k = len(phrase)
+        forward = docs["forward"]
+        windows = np.maximum(docs["doc_len"][candidates].astype(np.int64) - k + 1, 0)
+        total = int(windows.sum())
+        if not total:
+            return candidates[:0]
+        if total > len(forward) // 8:
+            # Many candidates: one pass over the whole forward array is cheaper than their windows
+            pos = np.flatnonzero(forward[:len(forward) - k + 1] == phrase[0])
+            for j, tid in enumerate(phrase[1:], 1):
+                pos = pos[forward[pos + j] == tid]
+            owner = np.searchsorted(docs["doc_start"], pos, side="right") - 1
+            # Drop matches running past the end of their document
+            owner = owner[pos + k <= docs["doc_start"][owner] + docs["doc_len"][owner]]
+            found = np.zeros(len(docs["doc_len"]), dtype=bool)
+            found[owner] = True
+            return candidates[found[candidates]]
+        owner = np.repeat(np.arange(len(candidates)), windows)
+        pos = np.repeat(docs["doc_start"][candidates], windows) + (
+            np.arange(total) - np.repeat(np.cumsum(windows) - windows, windows))
+        for j, tid in enumerate(phrase):
+            hit = forward[pos + j] == tid
+            pos, owner = pos[hit], owner[hit]
+        return candidates[np.unique(owner)]
+
+    def top_terms(self, asin: str, limit: int = 20) -> Optional[Dict[str, Any]]:
+        """Most common non-stopword terms of ``asin``'s positive and negative reviews (reviews containing them)."""
+        with self._lock:
+            code = self._asin_ids.get(asin)
+            if code is None:
+                return None
+            asin_docs = self._asin_docs[code].view()
+            key = (code, len(asin_docs), limit)
+            cached = self._top_cache.get(key)
+            if cached is not None:
+                self._top_cache.move_to_end(key)
+                return cached
+            docs = self._snapshot(("doc_sentiment", "doc_start", "doc_len", "forward", "first", "stop"))
+            # Append-only, so ids below this count stay valid outside the lock
+            terms, n_terms = self._terms, len(self._terms)
+
+        counts, totals = {}, {}
+        for sentiment in ("POSITIVE", "NEGATIVE"):
+            selected = asin_docs[docs["doc_sentiment"][asin_docs] == self._sentiment_codes[sentiment]]
+            lens = docs["doc_len"][selected].astype(np.int64)
+            pos = np.repeat(docs["doc_start"][selected], lens) + (
+                np.arange(int(lens.sum())) - np.repeat(np.cumsum(lens) - lens, lens))
+            pos = pos[docs["first"][pos]]
+            counts[sentiment] = np.bincount(docs["forward"][pos], minlength=n_terms)
+            totals[sentiment] = len(selected)
+
+        result: Dict[str, Any] = {"reviews": {s.lower(): n for s, n in totals.items()}}
+        for sentiment, other in (("POSITIVE", "NEGATIVE"), ("NEGATIVE", "POSITIVE")):
+            n = np.where(docs["stop"], 0, counts[sentiment])
+            top = np.argpartition(-n, limit)[:limit] if len(n) > limit else np.arange(len(n))
+            top = top[np.lexsort((top, -n[top]))]
+            top = top[n[top] > 0]
+            result[sentiment.lower()] = [
+                {
+                    "term": terms[t],
+                    "reviews": int(n[t]),
+                    "rate": n[t] / totals[sentiment],
+                    "other_rate": counts[other][t] / totals[other] if totals[other] else 0.0,
+                }
+                for t in top.tolist()
+            ]
+        with self._lock:
+            self._top_cache[key] = result
+            while len(self._top_cache) > 256:
+                self._top_cache.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            arrays = (self._forward, self._first, self._stop, self._doc_start, self._doc_len, self._doc_asin,
+                      self._doc_sentiment, self._doc_position, *self._postings, *self._asin_docs)
+            return {
+                "documents": self._doc_len.n,
+                "terms": len(self._terms),
+                "tokens": self._forward.n,
+                "array_bytes": sum(a.nbytes() for a in arrays),
+            }
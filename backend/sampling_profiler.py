@@ -0,0 +1,77 @@
+"""Opt-in per-request sampling profiler.
+
+While a request is in flight a background thread samples the Python stack of
+every other thread every ``interval`` seconds. When the request finishes the
+samples are written to ``<directory>/<time>-<request>.folded`` in the folded
+stack format ("root;caller;callee count" per line) read by flamegraph.pl,
+speedscope and inferno. Requests shorter than one interval may get no sample
+and no file. Concurrent requests see each other's stacks; profile one request
+at a time for clean graphs.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Session:
+    def __init__(self, profiler: "RequestProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.samples: Counter = Counter()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        self.profiler._samplers.add(me)
+        try:
+            while not self._done.wait(self.profiler.interval):
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident in self.profiler._samplers:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_name(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    self.samples[";".join(reversed(stack))] += 1
+            self.profiler._write(self)
+        finally:
+            self.profiler._samplers.discard(me)
+
+    def stop(self) -> None:
+        # The sampler thread writes the file, so callers on the event loop never block on I/O
+        self._done.set()
+
+
+class RequestProfiler:
+    def __init__(self, directory, interval: float = 0.005):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self._samplers = set()
+
+    def start(self, name: str) -> _Session:
+        return _Session(self, name)
+
+    def _write(self, session: _Session) -> None:
+        if not session.samples:
+            return
+        stamp = time.strftime("%Y%m%dT%H%M%S") + f"{time.time() % 1:.6f}"[1:]
+        path = self.directory / f"{stamp}-{_UNSAFE.sub('_', session.name).strip('_')[:80]}.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in session.samples.most_common():
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,141 @@
+"""Content-addressed cache of classification results.
+
+Entries are keyed by a digest of the whitespace-normalized review text (VADER
+tokenizes on whitespace, so collapsing runs of whitespace never changes the
+score) and evicted least-recently-used once the configured memory budget is
+exceeded, or lazily once older than the optional TTL.
+"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Rough per-entry bookkeeping cost on top of the key and value objects
+# (OrderedDict node + hash table slot + value tuple).
+_ENTRY_OVERHEAD = 160
+
+
+def text_key(text: str) -> bytes:
+    normalized = " ".join(text.split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+
+class ScoreCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[str, float, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _entry_size(key: bytes) -> int:
+        return sys.getsizeof(key) + _ENTRY_OVERHEAD
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            label, confidence, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {"sentiment": label, "confidence": confidence}
+
+    def put(self, key: bytes, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._insert(key, result)
+
+    def _insert(self, key: bytes, result: Dict[str, Any]) -> None:
+        # Called under the lock
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (result["sentiment"], result["confidence"], time.monotonic())
+        self._bytes += self._entry_size(key)
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: bytes) -> None:
+        del self._entries[key]
+        self._bytes -= self._entry_size(key)
+
+    def warm(
+        self,
+        texts: Iterable[str],
+        score: Callable[[List[str]], List[Dict[str, Any]]],
+        chunk: int = 5000,
+    ) -> int:
+        """Seed the cache with ``score``'s results for uncached ``texts``; returns entries added.
+
+        Stored labels may come from clients (/ingest_results), so texts are
+        scored again rather than trusted. Stops once the cache is full.
+        """
+        added = 0
+        keys: List[bytes] = []
+        batch: List[str] = []
+        pending_bytes = 0
+        for text in texts:
+            if not text:
+                continue
+            key = text_key(text)
+            with self._lock:
+                if key in self._entries:
+                    continue
+                if self._bytes + pending_bytes + self._entry_size(key) > self.max_bytes:
+                    break
+            keys.append(key)
+            batch.append(text)
+            pending_bytes += self._entry_size(key)
+            if len(batch) >= chunk:
+                added += self._put_new(keys, score(batch))
+                keys, batch, pending_bytes = [], [], 0
+        if batch:
+            added += self._put_new(keys, score(batch))
+        return added
+
+    def _put_new(self, keys: List[bytes], results: List[Dict[str, Any]]) -> int:
+        added = 0
+        with self._lock:
+            for key, result in zip(keys, results):
+                # Live traffic may have cached it meanwhile
+                if key not in self._entries:
+                    self._insert(key, result)
+                    added += 1
+        return added
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
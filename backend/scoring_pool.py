@@ -0,0 +1,54 @@
+"""Multi-core scoring for large batches.
+
+``ScoringPool`` starts its worker processes up front; each one builds its own
+analyzer and ``VaderBatchScorer`` once, in the pool initializer. A batch is cut
+into contiguous shards, scored in parallel and reassembled in input order.
+"""
+import multiprocessing
+from typing import List, Optional, Sequence
+
+_worker_scorer = None
+
+
+def _init_worker() -> None:
+    global _worker_scorer
+    from lexicon import load_analyzer
+    from sentiment_engine import VaderBatchScorer
+
+    _worker_scorer = VaderBatchScorer(load_analyzer())
+
+
+def _score_shard(texts: List[str]) -> List[float]:
+    return _worker_scorer.compound_scores(texts)
+
+
+def _ready(_: int) -> bool:
+    return _worker_scorer is not None
+
+
+class ScoringPool:
+    def __init__(self, workers: int, min_batch: int = 2000, shard_size: Optional[int] = None):
+        self.workers = workers
+        self.min_batch = min_batch
+        self.shard_size = shard_size
+        # spawn, not fork: the API process runs threads (uvicorn, the FastAPI threadpool)
+        ctx = multiprocessing.get_context("spawn")
+        self._pool = ctx.Pool(processes=workers, initializer=_init_worker)
+        # Block until every worker has loaded the lexicon so the first big batch
+        # doesn't pay for it.
+        self._pool.map(_ready, range(workers), chunksize=1)
+
+    def accepts(self, n: int) -> bool:
+        """True when a batch of ``n`` texts should go to the pool instead of inline."""
+        return n >= self.min_batch
+
+    def compound_scores(self, texts: Sequence[str]) -> List[float]:
+        texts = list(texts)
+        size = self.shard_size or max(1, -(-len(texts) // self.workers))
+        shards = [texts[i:i + size] for i in range(0, len(texts), size)]
+        # Pool.map returns shard results in submission order
+        return [c for shard in self._pool.map(_score_shard, shards, chunksize=1) for c in shard]
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
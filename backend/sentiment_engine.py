@@ -0,0 +1,363 @@
+"""Vectorized VADER scoring for whole batches of review texts.
+
+``VaderBatchScorer`` returns exactly what ``SentimentIntensityAnalyzer.polarity_scores``
+returns for every text, but it tokenizes the batch once, resolves each raw token
+through a cached vocabulary index and evaluates the VADER rules (boosters,
+negation, ALL CAPS, idioms, "least", "but", punctuation emphasis) with NumPy over
+the flattened token array of the whole batch.
+"""
+import string
+import threading
+from itertools import chain
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_PUNCT_CHARS = frozenset(string.punctuation)
+
+# Vocabulary id 0 is a padding token with every flag cleared; shifted windows
+# that run past the start or end of a text point at it.
+_PAD = ""
+
+# Per-token flags (computed once per distinct token when it enters the vocabulary)
+_BOOL_COLUMNS = (
+    "in_lex",     # token.lower() in lexicon
+    "upper",      # token.isupper()
+    "booster",    # token.lower() in BOOSTER_DICT
+    "negated",    # VaderConstants.negated([token])
+    "kind",       # token.lower() == "kind"
+    "of",         # token.lower() == "of"
+    "least",      # token.lower() == "least"
+    "at_very",    # token.lower() in ("at", "very")
+    "but",        # token.lower() == "but"
+    "never",      # token == "never" (VADER compares these case-sensitively)
+    "so_this",    # token in ("so", "this")
+)
+_FLOAT_COLUMNS = ("valence", "boost_val")
+
+
+class _RawTokenIndex(dict):
+    """Maps raw whitespace tokens to vocabulary ids, resolving misses on demand."""
+
+    def __init__(self, resolve):
+        super().__init__()
+        self._resolve = resolve
+
+    def __missing__(self, raw: str) -> int:
+        tid = self[raw] = self._resolve(raw)
+        return tid
+
+
+class VaderBatchScorer:
+    """Batch equivalent of ``SentimentIntensityAnalyzer.polarity_scores``.
+
+    The lexicon and constants are taken from ``analyzer`` so both always agree.
+    The vocabulary grows with the tokens seen; it is rebuilt once it holds more
+    than ``max_vocab`` raw tokens.
+    """
+
+    def __init__(self, analyzer, max_vocab: int = 500_000):
+        self.lexicon: Dict[str, float] = analyzer.lexicon
+        self.constants = analyzer.constants
+        self.max_vocab = max_vocab
+        self._punc = frozenset(self.constants.PUNC_LIST)
+        self._max_punc = max(len(p) for p in self.constants.PUNC_LIST)
+        # The vocabulary is mutated while scoring; FastAPI runs sync handlers in a threadpool
+        self._lock = threading.Lock()
+        self._reset_vocab()
+
+    # ----- vocabulary -----
+
+    def _reset_vocab(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._raw = _RawTokenIndex(self._resolve_raw)
+        self._capacity = 0
+        self._cols: Dict[str, np.ndarray] = {}
+        self._grow(max(1024, len(self.lexicon) + 1024))
+        self._token_id(_PAD)
+        # Pre-register the lexicon so its valences sit in one contiguous block
+        for word in self.lexicon:
+            self._token_id(word)
+        c = self.constants
+        self._idioms = [
+            (tuple(self._token_id(w) for w in seq.split(" ")), float(value))
+            for seq, value in c.SPECIAL_CASE_IDIOMS.items()
+        ]
+        self._booster_bigrams = [
+            tuple(self._token_id(w) for w in seq.split(" "))
+            for seq in c.BOOSTER_DICT
+            if seq.count(" ") == 1
+        ]
+
+    def _grow(self, capacity: int) -> None:
+        for name in _BOOL_COLUMNS:
+            col = np.zeros(capacity, dtype=bool)
+            if name in self._cols:
+                col[: self._capacity] = self._cols[name]
+            self._cols[name] = col
+        for name in _FLOAT_COLUMNS:
+            col = np.zeros(capacity, dtype=np.float64)
+            if name in self._cols:
+                col[: self._capacity] = self._cols[name]
+            self._cols[name] = col
+        self._capacity = capacity
+
+    def _token_id(self, token: str) -> int:
+        tid = self._ids.get(token)
+        if tid is not None:
+            return tid
+        tid = len(self._ids)
+        if tid >= self._capacity:
+            self._grow(self._capacity * 2)
+        self._ids[token] = tid
+        if token == _PAD:
+            return tid
+        cols = self._cols
+        c = self.constants
+        lower = token.lower()
+        if lower in self.lexicon:
+            cols["in_lex"][tid] = True
+            cols["valence"][tid] = self.lexicon[lower]
+        if lower in c.BOOSTER_DICT:
+            cols["booster"][tid] = True
+            cols["boost_val"][tid] = c.BOOSTER_DICT[lower]
+        cols["upper"][tid] = token.isupper()
+        cols["negated"][tid] = c.negated([token])
+        cols["kind"][tid] = lower == "kind"
+        cols["of"][tid] = lower == "of"
+        cols["least"][tid] = lower == "least"
+        cols["at_very"][tid] = lower in ("at", "very")
+        cols["but"][tid] = lower == "but"
+        cols["never"][tid] = token == "never"
+        cols["so_this"][tid] = token in ("so", "this")
+        return tid
+
+    def _normalize(self, raw: str) -> str:
+        # Same result as SentiText._words_and_emoticons: a token made of one
+        # PUNC_LIST entry plus a punctuation-free word (len > 1) becomes the word.
+        for k in range(1, self._max_punc + 1):
+            if len(raw) - k < 2:
+                break
+            if raw[-k:] in self._punc:
+                word = raw[:-k]
+                if _PUNCT_CHARS.isdisjoint(word):
+                    return word
+            if raw[:k] in self._punc:
+                word = raw[k:]
+                if _PUNCT_CHARS.isdisjoint(word):
+                    return word
+        return raw
+
+    def _resolve_raw(self, raw: str) -> int:
+        if len(raw) <= 1:
+            return -1  # VADER drops single-character tokens
+        return self._token_id(self._normalize(raw))
+
+    def word(self, raw: str) -> Optional[str]:
+        """VADER's word for one whitespace-separated token, or None if VADER drops it."""
+        return self._normalize(raw) if len(raw) > 1 else None
+
+    # ----- scoring -----
+
+    def polarity_scores(self, texts: Sequence[str]) -> List[Dict[str, float]]:
+        """Return one ``{"neg", "neu", "pos", "compound"}`` dict per text."""
+        if not texts:
+            return []
+        with self._lock:
+            neg, neu, pos, compound, has_tokens = self._score(texts)
+        out = []
+        for i, scored in enumerate(has_tokens.tolist()):
+            if scored:
+                out.append({
+                    "neg": round(neg[i], 3),
+                    "neu": round(neu[i], 3),
+                    "pos": round(pos[i], 3),
+                    "compound": round(compound[i], 4),
+                })
+            else:
+                out.append({"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0})
+        return out
+
+    def compound_scores(self, texts: Sequence[str]) -> List[float]:
+        """Return only the rounded compound score per text."""
+        if not texts:
+            return []
+        with self._lock:
+            _, _, _, compound, has_tokens = self._score(texts)
+        return [round(c, 4) if scored else 0.0 for c, scored in zip(compound, has_tokens.tolist())]
+
+    def _score(self, texts: Sequence[str]):
+        if len(self._raw) > self.max_vocab:
+            self._reset_vocab()
+        texts = [t if isinstance(t, str) else str(t.encode("utf-8")) for t in texts]
+        n = len(texts)
+
+        # Tokenize once and map every raw token to a vocabulary id (-1 = dropped)
+        split = [t.split() for t in texts]
+        raw_lens = np.fromiter(map(len, split), dtype=np.int64, count=n)
+        raw_ids = np.fromiter(
+            map(self._raw.__getitem__, chain.from_iterable(split)),
+            dtype=np.int64,
+            count=int(raw_lens.sum()),
+        )
+        keep = raw_ids >= 0
+        tid = raw_ids[keep]
+        text_of = np.repeat(np.arange(n), raw_lens)[keep]
+        lens = np.bincount(text_of, minlength=n)
+        starts = np.zeros(n, dtype=np.int64)
+        np.cumsum(lens[:-1], out=starts[1:])
+        index = np.arange(tid.size)
+        pos = index - starts[text_of]
+        end = (starts + lens)[text_of]
+
+        cols = self._cols
+        in_lex = cols["in_lex"]
+        upper = cols["upper"]
+
+        def prev(k: int) -> np.ndarray:
+            out = np.zeros_like(tid)
+            out[k:] = tid[:-k]
+            out[pos < k] = 0
+            return out
+
+        def nxt(k: int) -> np.ndarray:
+            out = np.zeros_like(tid)
+            out[:-k] = tid[k:]
+            out[index + k >= end] = 0
+            return out
+
+        p1, p2, p3 = prev(1), prev(2), prev(3)
+        n1, n2 = nxt(1), nxt(2)
+
+        # SentiText.allcap_differential
+        allcaps = np.bincount(text_of, weights=upper[tid], minlength=n)
+        cap_diff = (lens - allcaps > 0) & (lens - allcaps < lens)
+        cap_tok = cap_diff[text_of]
+
+        c = self.constants
+        lex = in_lex[tid]
+        v = np.where(lex, cols["valence"][tid], 0.0)
+        v = np.where(lex & upper[tid] & cap_tok, np.where(v > 0, v + c.C_INCR, v - c.C_INCR), v)
+
+        for start_i, pk in enumerate((p1, p2, p3)):
+            cond = lex & (pos > start_i) & ~in_lex[pk]
+            # VaderConstants.scalar_inc_dec
+            boost = cols["booster"][pk]
+            s = np.where(boost, cols["boost_val"][pk], 0.0)
+            s = np.where(boost & (v < 0), s * -1, s)
+            s = np.where(boost & upper[pk] & cap_tok, np.where(v > 0, s + c.C_INCR, s - c.C_INCR), s)
+            if start_i == 1:
+                s = np.where(s != 0, s * 0.95, s)
+            elif start_i == 2:
+                s = np.where(s != 0, s * 0.9, s)
+            v = np.where(cond, v + s, v)
+            # _never_check
+            if start_i == 0:
+                v = np.where(cond & cols["negated"][p1], v * c.N_SCALAR, v)
+            elif start_i == 1:
+                emph = cols["never"][p2] & cols["so_this"][p1]
+                v = np.where(cond & emph, v * 1.5, np.where(cond & cols["negated"][p2], v * c.N_SCALAR, v))
+            else:
+                emph = (cols["never"][p3] & cols["so_this"][p2]) | cols["so_this"][p1]
+                v = np.where(cond & emph, v * 1.25, np.where(cond & cols["negated"][p3], v * c.N_SCALAR, v))
+                v = np.where(cond, self._idioms_check(v, tid, p1, p2, p3, n1, n2), v)
+
+        # _least_check
+        least_before = cols["least"][p1] & ~in_lex[p1]
+        v = np.where(lex & (pos > 1) & least_before & ~cols["at_very"][p2], v * c.N_SCALAR, v)
+        v = np.where(lex & (pos == 1) & least_before, v * c.N_SCALAR, v)
+
+        # Boosters and "kind of" contribute 0; so does everything off-lexicon
+        skip = cols["booster"][tid] | (cols["kind"][tid] & cols["of"][n1])
+        value_at = np.where(lex & ~skip, v, 0.0)
+
+        # polarity_scores looks each item up with list.index(), i.e. every
+        # repeat of a token takes the valence computed at its first occurrence.
+        key = text_of * len(self._ids) + tid
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        sent = value_at[first[inverse.reshape(-1)]]
+
+        # _but_check
+        but_at = np.flatnonzero(cols["but"][tid])
+        no_but = np.iinfo(np.int64).max
+        bi = np.full(n, no_but)
+        np.minimum.at(bi, text_of[but_at], pos[but_at])
+        bi_tok = bi[text_of]
+        has_but = bi_tok != no_but
+        sent = np.where(has_but & (pos < bi_tok), sent * 0.5, np.where(has_but & (pos > bi_tok), sent * 1.5, sent))
+
+        sum_s, pos_sum, neg_sum = self._sequential_sums(
+            np.stack([sent, np.where(sent > 0, sent + 1, 0.0), np.where(sent < 0, sent - 1, 0.0)]),
+            starts,
+            lens,
+        )
+        neu_count = np.bincount(text_of, weights=sent == 0, minlength=n)
+
+        # Punctuation emphasis
+        ep = np.fromiter((t.count("!") for t in texts), dtype=np.int64, count=n)
+        qm = np.fromiter((t.count("?") for t in texts), dtype=np.int64, count=n)
+        amp = np.minimum(ep, 4) * 0.292 + np.where(qm > 1, np.where(qm <= 3, qm * 0.18, 0.96), 0.0)
+
+        sum_s = np.where(sum_s > 0, sum_s + amp, np.where(sum_s < 0, sum_s - amp, sum_s))
+        compound = sum_s / np.sqrt((sum_s * sum_s) + 15)
+
+        abs_neg = np.abs(neg_sum)
+        pos_adj = np.where(pos_sum > abs_neg, pos_sum + amp, pos_sum)
+        neg_adj = np.where(pos_sum < abs_neg, neg_sum - amp, neg_sum)
+        has_tokens = lens > 0
+        total = np.where(has_tokens, pos_adj + np.abs(neg_adj) + neu_count, 1.0)
+        return (
+            np.abs(neg_adj / total).tolist(),
+            np.abs(neu_count / total).tolist(),
+            np.abs(pos_adj / total).tolist(),
+            compound.tolist(),
+            has_tokens,
+        )
+
+    def _idioms_check(self, v, tid, p1, p2, p3, n1, n2) -> np.ndarray:
+        # First matching preceding sequence wins, following ones override it.
+        preceding = ((p1, tid), (p2, p1, tid), (p2, p1), (p3, p2, p1), (p3, p2))
+        found = np.zeros(tid.size, dtype=bool)
+        out = v
+        for window in preceding:
+            hit, value = self._match_idiom(window)
+            out = np.where(hit & ~found, value, out)
+            found |= hit
+        for window in ((tid, n1), (tid, n1, n2)):
+            hit, value = self._match_idiom(window)
+            out = np.where(hit, value, out)
+        bigram = np.zeros(tid.size, dtype=bool)
+        for a, b in self._booster_bigrams:
+            bigram |= ((p3 == a) & (p2 == b)) | ((p2 == a) & (p1 == b))
+        return np.where(bigram, out + self.constants.B_DECR, out)
+
+    def _match_idiom(self, window):
+        hit = np.zeros(window[0].size, dtype=bool)
+        value = np.zeros(window[0].size, dtype=np.float64)
+        for ids, idiom_value in self._idioms:
+            if len(ids) != len(window):
+                continue
+            m = np.ones(window[0].size, dtype=bool)
+            for col, token_id in zip(window, ids):
+                m &= col == token_id
+            hit |= m
+            value[m] = idiom_value
+        return hit, value
+
+    @staticmethod
+    def _sequential_sums(values: np.ndarray, starts: np.ndarray, lens: np.ndarray):
+        # Accumulate token by token, left to right, exactly like Python's sum()
+        # over the per-text sentiment list, so results agree to the last bit.
+        n = lens.size
+        order = np.argsort(-lens, kind="stable")
+        lens_sorted = lens[order]
+        starts_sorted = starts[order]
+        acc = np.zeros((values.shape[0], n))
+        active = n
+        for k in range(int(lens_sorted[0]) if n else 0):
+            while lens_sorted[active - 1] <= k:
+                active -= 1
+            acc[:, :active] += values[:, starts_sorted[:active] + k]
+        out = np.empty_like(acc)
+        out[:, order] = acc
+        return out
@@ -0,0 +1,348 @@
+"""One review store shared by every API worker process.
+
+``uvicorn app:app --workers N`` runs N processes, and each in-process store
+(memory, columnar) would only see the ingests its own worker handled. Here a
+single store server process owns the store (any ``REVIEW_STORE`` backend)
+and the search index, and the workers (``REVIEW_STORE=remote``) use them
+through ``RemoteStore`` over a Unix socket:
+
+    python -m shared_store --socket /tmp/reviews.sock        # REVIEW_STORE=columnar, ...
+    REVIEW_STORE=remote STORE_SOCKET=/tmp/reviews.sock uvicorn app:app --workers 4
+
+Writes are serialized by the one store, so every worker reads the same
+reviews, aggregates and versions right after any worker's write is
+acknowledged. Each worker thread keeps its own connection; scans are paged.
+Every commit's change is pushed to each worker with listeners (its /events
+stream) over a separate subscription connection, in commit order.
+
+Messages are pickled (``multiprocessing.connection``), so the socket is
+created accessible only to the user running the server. Errors come back as
+their type name and message. A subscriber that falls SUBSCRIBER_QUEUE
+changes behind is disconnected; it reconnects, and its listeners see the
+version gap.
+"""
+import argparse
+import builtins
+import itertools
+import os
+import queue
+import signal
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from aggregates import GRANULARITIES, ProductAggregates
+from storage import DEFAULT_DB_PATH, ReviewFilter, ReviewStore, make_store
+
+DEFAULT_SOCKET = DEFAULT_DB_PATH.with_name("reviews.sock")
+
+# Reviews per scan round trip
+SCAN_PAGE = 1000
+# Changes queued for one subscriber before it is disconnected
+SUBSCRIBER_QUEUE = 10000
+
+
+class RemoteError(RuntimeError):
+    """An error raised in the store server whose type is not a builtin exception."""
+
+
+def _error(name: str, message: str) -> Exception:
+    exc_type = getattr(builtins, name, None)
+    if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+        return exc_type(message)
+    return RemoteError(f"{name}: {message}")
+
+
+class StoreServer:
+    def __init__(self, store: ReviewStore, address: str, index=None):
+        self.store = store
+        self.index = index
+        self.address = address
+        self._subscribers: List["queue.Queue"] = []
+        self._subscribers_lock = threading.Lock()
+        # Created with no group or other access: anyone who can connect can make the server unpickle
+        umask = os.umask(0o077)
+        try:
+            self._listener = Listener(address, family="AF_UNIX")
+        finally:
+            os.umask(umask)
+        self._handlers: Dict[str, Callable[..., Any]] = {
+            "hello": lambda: {"store_id": store.store_id, "index": index is not None},
+            "add_results": store.add_results,
+            "contains": lambda asin: asin in store,
+            "asins": store.asins,
+            "version": store.version,
+            "summaries": store.summaries,
+            "product": self._product,
+            "scan": lambda asin, start, where, limit: list(itertools.islice(store.scan(asin, start, where), limit)),
+            "reviews_at": store.reviews_at,
+            "aggregates": store.aggregates,
+            "check_aggregates": store.check_aggregates,
+        }
+        if index is not None:
+            self._handlers.update({
+                "index_ready": lambda: index.ready,
+                "search": index.search,
+                "top_terms": index.top_terms,
+                "index_stats": index.stats,
+            })
+        store.add_listener(self._publish)
+
+    def _product(self, asin: str) -> Optional[Dict[str, Any]]:
+        # Header only; clients scan the results
+        product = self.store.product(asin)
+        return None if product is None else {"title": product["title"], "updated_at": product["updated_at"]}
+
+    def _publish(self, asin: str, change: Dict[str, Any]) -> None:
+        # Under the store's write lock, so queues receive changes in commit order
+        with self._subscribers_lock:
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait((asin, change))
+                except queue.Full:
+                    # A stalled worker must not grow the server without bound; its feed closes
+                    self._subscribers.remove(q)
+                    while not q.empty():
+                        q.get_nowait()
+                    q.put_nowait(None)
+
+    def serve_forever(self) -> None:
+        while True:
+            conn = self._listener.accept()
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        try:
+            role = conn.recv()
+            if role == "subscribe":
+                self._feed(conn)
+                return
+            while True:
+                method, args, kwargs = conn.recv()
+                try:
+                    reply = ("ok", self._handlers[method](*args, **kwargs))
+                except Exception as e:
+                    # Not the exception itself: it may not pickle
+                    reply = ("error", (type(e).__name__, str(e)))
+                conn.send(reply)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _feed(self, conn: Connection) -> None:
+        q: "queue.Queue" = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+        with self._subscribers_lock:
+            self._subscribers.append(q)
+        try:
+            conn.send("subscribed")
+            while True:
+                change = q.get()
+                if change is None:
+                    return
+                conn.send(change)
+        finally:
+            with self._subscribers_lock:
+                if q in self._subscribers:
+                    self._subscribers.remove(q)
+
+    def close(self) -> None:
+        self.store.remove_listener(self._publish)
+        self._listener.close()
+
+
+class RemoteStore(ReviewStore):
+    """``ReviewStore`` of a ``StoreServer`` at ``address``."""
+
+    def __init__(self, address: str, connect_timeout: float = 10.0):
+        self.address = str(address)
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+        self._connections: List[Connection] = []
+        self._lock = threading.Lock()
+        self._feed: Optional[threading.Thread] = None
+        self._subscribed = threading.Event()
+        self._closed = False
+        hello = self._call("hello")
+        self.store_id = hello["store_id"]
+        self.index = RemoteIndex(self) if hello["index"] else None
+
+    def _connect(self, role: str) -> Connection:
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                conn = Client(self.address, family="AF_UNIX")
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The store server may still be starting
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        conn.send(role)
+        return conn
+
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect("call")
+            with self._lock:
+                self._connections.append(conn)
+        try:
+            conn.send((method, args, kwargs))
+            status, value = conn.recv()
+        except (EOFError, OSError):
+            # Reconnect on the next call (e.g. after the store server restarted)
+            self._local.conn = None
+            conn.close()
+            with self._lock:
+                self._connections.remove(conn)
+            raise
+        if status == "error":
+            raise _error(*value)
+        return value
+
+    def add_listener(self, fn: Callable[[str, Dict[str, Any]], None]) -> None:
+        super().add_listener(fn)
+        with self._lock:
+            if self._feed is None:
+                self._feed = threading.Thread(target=self._follow, name="store-feed", daemon=True)
+                self._feed.start()
+        # Changes committed after this returns reach the listener
+        self._subscribed.wait(self.connect_timeout)
+
+    def _follow(self) -> None:
+        while not self._closed:
+            try:
+                conn = self._connect("subscribe")
+                with self._lock:
+                    self._connections.append(conn)
+                conn.recv()
+                self._subscribed.set()
+                while True:
+                    asin, change = conn.recv()
+                    for fn in self._listeners:
+                        fn(asin, change)
+            except (EOFError, OSError):
+                # Changes committed while disconnected are lost; listeners see the version gap
+                time.sleep(0.5)
+
+    def add_results(self, asin: str, title: str, results: List[Dict[str, Any]]) -> int:
+        return self._call("add_results", asin, title, results)
+
+    def __contains__(self, asin: str) -> bool:
+        return self._call("contains", asin)
+
+    def asins(self) -> List[str]:
+        return self._call("asins")
+
+    def version(self, asin: Optional[str] = None) -> Optional[int]:
+        return self._call("version", asin)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        return self._call("summaries")
+
+    def product(self, asin: str) -> Optional[Dict[str, Any]]:
+        product = self._call("product", asin)
+        if product is not None:
+            product["results"] = self.iter_results(asin)
+        return product
+
+    def iter_results(self, asin: str) -> Iterator[Dict[str, Any]]:
+        return (r for _, r in self.scan(asin))
+
+    def scan(self, asin: str, start: int = 0, where: Optional[ReviewFilter] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        while True:
+            page = self._call("scan", asin, start, where, SCAN_PAGE)
+            yield from page
+            if len(page) < SCAN_PAGE:
+                return
+            # Positions only grow, so the next page starts after the last one
+            start = page[-1][0] + 1
+
+    def reviews_at(self, asin: str, positions: Sequence[int]) -> List[Dict[str, Any]]:
+        return self._call("reviews_at", asin, list(positions))
+
+    def attach_index(self, index, chunk: int = 5000) -> None:
+        raise NotImplementedError("the store server keeps the index of a shared store")
+
+    def aggregates(self, asin: str, rollups: Sequence[str] = GRANULARITIES) -> ProductAggregates:
+        return self._call("aggregates", asin, tuple(rollups))
+
+    def check_aggregates(self) -> Dict[str, List[str]]:
+        return self._call("check_aggregates")
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+
+class RemoteIndex:
+    """The store server's ``review_index.ReviewIndex``, queried through a ``RemoteStore``."""
+
+    def __init__(self, store: RemoteStore):
+        self._store = store
+
+    @property
+    def ready(self) -> bool:
+        return self._store._call("index_ready")
+
+    def search(self, q: str, **kwargs) -> Dict[str, Any]:
+        return self._store._call("search", q, **kwargs)
+
+    def top_terms(self, asin: str, limit: int = 20) -> Optional[Dict[str, Any]]:
+        return self._store._call("top_terms", asin, limit)
+
+    def stats(self) -> Dict[str, int]:
+        return self._store._call("index_stats")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the review store to API workers started with REVIEW_STORE=remote.")
+    parser.add_argument("--socket", default=os.environ.get("STORE_SOCKET", str(DEFAULT_SOCKET)))
+    args = parser.parse_args()
+
+    if os.environ.get("REVIEW_STORE", "").lower() == "remote":
+        raise SystemExit("the store server needs a local REVIEW_STORE (sqlite, memory or columnar)")
+    socket = Path(args.socket)
+    if socket.exists():
+        try:
+            Client(str(socket), family="AF_UNIX").close()
+        except (ConnectionRefusedError, FileNotFoundError):
+            socket.unlink()  # left behind by a server that died
+        else:
+            raise SystemExit(f"a store server is already listening on {socket}")
+
+    store = make_store()
+    index = None
+    if os.environ.get("SEARCH_INDEX", "1") != "0":
+        from lexicon import load_analyzer
+        from review_index import ReviewIndex
+        from sentiment_engine import VaderBatchScorer
+
+        index = ReviewIndex(VaderBatchScorer(load_analyzer()).word)
+        index.begin_backfill()
+    server = StoreServer(store, str(socket), index)
+    if index is not None:
+        threading.Thread(target=store.attach_index, args=(index,), name="index-backfill", daemon=True).start()
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"store server ({type(store).__name__}) listening on {socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
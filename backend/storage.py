@@ -0,0 +1,658 @@
+"""Review storage backends.
+
+``MemoryStore`` keeps everything in process-local dicts (the original
+behaviour); ``SQLiteStore`` persists reviews in an embedded SQLite database in
+WAL mode. Both maintain per-ASIN aggregates at write time, so the read
+endpoints never rescan raw reviews.
+
+Every ``add_results`` call bumps the ASIN's ``version()``; together with the
+store's random ``store_id`` it makes the HTTP ETags of the read endpoints.
+Listeners registered with ``add_listener`` get each call's change (the new
+version plus the aggregate delta of the reviews it stored), in version order.
+An attached ``review_index.ReviewIndex`` is fed the stored reviews with their
+``scan`` positions, which ``reviews_at`` maps back to reviews.
+
+``scan()`` walks one ASIN's reviews in insertion order as ``(position,
+review)`` pairs, optionally narrowed by a ``ReviewFilter``; positions only
+grow, so ``/product`` uses them as pagination cursors.
+
+``make_store()`` picks the backend from ``REVIEW_STORE`` (``sqlite``,
+``memory`` or ``columnar``, see columnar_store.py) and ``REVIEW_DB_PATH``;
+``REVIEW_DATA_DIR`` makes the columnar store persistent (snapshots plus a
+write-ahead log). ``remote`` uses the store of a shared_store.py server at
+``STORE_SOCKET``, so several API worker processes share one store.
+"""
+import hashlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from aggregates import CONFIDENCE_KEY, GRANULARITIES, SENTIMENTS, ProductAggregates
+from review_dates import normalize_date
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / "data" / "reviews.db"
+
+# Fields of a stored review, in the order they are returned
+REVIEW_FIELDS = ("sentiment", "confidence", "text", "date", "country", "day")
+
+_ISO_DAY = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def review_fingerprint(r: Dict[str, Any]) -> bytes:
+    """Identity of a review within an ASIN: whitespace-normalized text + raw date + country."""
+    key = "\x1f".join((" ".join(r["text"].split()), r.get("date") or "", r.get("country") or ""))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def _unseen(results: List[Dict[str, Any]], seen: Set[bytes]) -> List[Tuple[bytes, Dict[str, Any]]]:
+    """Results whose fingerprint is not in ``seen`` (also dropping repeats within ``results``); updates ``seen``."""
+    fresh = []
+    for r in results:
+        fp = review_fingerprint(r)
+        if fp not in seen:
+            seen.add(fp)
+            fresh.append((fp, r))
+    return fresh
+
+
+class ReviewFilter:
+    """Server-side review filter: any of ``sentiments``/``countries``, normalized day in [day_from, day_to].
+
+    Unset parts match everything; a day range only matches ISO-dated reviews.
+    """
+
+    def __init__(
+        self,
+        sentiments: Optional[Iterable[str]] = None,
+        countries: Optional[Iterable[str]] = None,
+        day_from: Optional[str] = None,
+        day_to: Optional[str] = None,
+    ):
+        self.sentiments = set(sentiments) if sentiments else None
+        self.countries = set(countries) if countries else None
+        self.day_from = day_from
+        self.day_to = day_to
+
+    @property
+    def has_day_range(self) -> bool:
+        return self.day_from is not None or self.day_to is not None
+
+    def matches(self, r: Dict[str, Any]) -> bool:
+        if self.sentiments is not None and r["sentiment"] not in self.sentiments:
+            return False
+        if self.countries is not None and r.get("country") not in self.countries:
+            return False
+        if self.has_day_range:
+            day = r.get("day") or normalize_date(r.get("date"))
+            if not _ISO_DAY.fullmatch(day):
+                return False
+            if self.day_from is not None and day < self.day_from:
+                return False
+            if self.day_to is not None and day > self.day_to:
+                return False
+        return True
+
+
+class ReviewStore:
+    """Interface shared by the storage backends."""
+
+    # Distinguishes this store's versions from those of an earlier (e.g. wiped) store
+    store_id: str = ""
+    _listeners: Tuple[Callable[[str, Dict[str, Any]], None], ...] = ()
+    # review_index.ReviewIndex fed by add_results, once attached
+    index: Any = None
+    # Held by add_results for the whole write
+    _lock: threading.Lock
+
+    def add_listener(self, fn: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Call ``fn(asin, change)`` after every ``add_results``, under the store's write lock."""
+        self._listeners = (*self._listeners, fn)
+
+    def remove_listener(self, fn: Callable[[str, Dict[str, Any]], None]) -> None:
+        self._listeners = tuple(f for f in self._listeners if f is not fn)
+
+    def _notify(self, asin: str, title: str, updated_at: str, version: int, delta: ProductAggregates) -> None:
+        change = {"asin": asin, "version": version, "title": title, "updated_at": updated_at, **delta.compact()}
+        for fn in self._listeners:
+            fn(asin, change)
+
+    def add_results(self, asin: str, title: str, results: List[Dict[str, Any]]) -> int:
+        """Store the results not already stored for ``asin``; returns how many were stored."""
+        raise NotImplementedError
+
+    def __contains__(self, asin: str) -> bool:
+        raise NotImplementedError
+
+    def asins(self) -> List[str]:
+        raise NotImplementedError
+
+    def version(self, asin: Optional[str] = None) -> Optional[int]:
+        """Write counter of ``asin`` (None if unknown), or of the whole store when ``asin`` is None."""
+        raise NotImplementedError
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """One ``{asin, title, updated_at, review_count, counts, version}`` dict per product."""
+        raise NotImplementedError
+
+    def product(self, asin: str) -> Optional[Dict[str, Any]]:
+        """``{title, results, updated_at}`` for ``asin``, or None; ``results`` may be a lazy iterable."""
+        raise NotImplementedError
+
+    def iter_results(self, asin: str) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def scan(self, asin: str, start: int = 0, where: Optional[ReviewFilter] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """``(position, review)`` for ``asin``'s reviews at ``position >= start`` matching ``where``, in insertion order."""
+        for position, r in enumerate(self.iter_results(asin)):
+            if position >= start and (where is None or where.matches(r)):
+                yield position, r
+
+    def reviews_at(self, asin: str, positions: Sequence[int]) -> List[Dict[str, Any]]:
+        """``asin``'s reviews at the given ``scan`` positions, in that order."""
+        wanted, found = set(positions), {}
+        if wanted:
+            for position, r in self.scan(asin, start=min(wanted)):
+                if position in wanted:
+                    found[position] = r
+                    if len(found) == len(wanted):
+                        break
+        return [found[p] for p in positions]
+
+    def attach_index(self, index, chunk: int = 5000) -> None:
+        """Keep ``index`` current from add_results, then index every review stored before.
+
+        Writes may go on meanwhile: the index holds them until the backfill is
+        done (``index.ready``).
+        """
+        index.begin_backfill()
+        with self._lock:
+            self.index = index
+        for summary in self.summaries():
+            asin = summary["asin"]
+            # Once the write lock is free, every write not counted in summary has been held
+            with self._lock:
+                end = index.backfill_end(asin)
+            batch = []
+            for position, r in itertools.islice(self.scan(asin), summary["review_count"]):
+                if end is not None and position >= end:
+                    break
+                batch.append((position, r))
+                if len(batch) == chunk:
+                    index.backfill(asin, batch)
+                    batch = []
+            index.backfill(asin, batch)
+        index.finish_backfill()
+
+    def aggregates(self, asin: str, rollups: Sequence[str] = GRANULARITIES) -> ProductAggregates:
+        """``asin``'s aggregates; backends may leave trend rollups not in ``rollups`` empty."""
+        raise NotImplementedError
+
+    def check_aggregates(self) -> Dict[str, List[str]]:
+        """Rebuild every ASIN's aggregates from raw results and report the parts that differ."""
+        mismatches = {}
+        for asin in self.asins():
+            rebuilt = ProductAggregates.from_results(self.iter_results(asin))
+            diff = self.aggregates(asin).diff(rebuilt)
+            if diff:
+                mismatches[asin] = diff
+        return mismatches
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStore(ReviewStore):
+    def __init__(self):
+        # { asin: { "title": str, "results": [ReviewResult...], "updated_at": iso } }
+        self.data: Dict[str, Dict[str, Any]] = {}
+        self._aggregates: Dict[str, ProductAggregates] = {}
+        self._fingerprints: Dict[str, Set[bytes]] = {}
+        self._versions: Dict[str, int] = {}
+        self._version_total = 0
+        self.store_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+
+    def add_results(self, asin: str, title: str, results: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            if asin not in self.data:
+                self.data[asin] = {
+                    "title": title,
+                    "results": [],
+                    "updated_at": datetime.utcnow().isoformat(),
+                }
+                self._aggregates[asin] = ProductAggregates()
+                self._fingerprints[asin] = set()
+            fresh = [r for _, r in _unseen(results, self._fingerprints[asin])]
+            for r in fresh:
+                r["day"] = normalize_date(r.get("date"))
+            start = len(self.data[asin]["results"])
+            self.data[asin]["results"].extend(fresh)
+            self._aggregates[asin].add(fresh)
+            self.data[asin]["title"] = title or self.data[asin]["title"]
+            self.data[asin]["updated_at"] = datetime.utcnow().isoformat()
+            self._versions[asin] = self._versions.get(asin, 0) + 1
+            self._version_total += 1
+            if self.index is not None:
+                self.index.add(asin, list(enumerate(fresh, start)))
+            if self._listeners:
+                payload = self.data[asin]
+                delta = ProductAggregates.from_results(fresh)
+                self._notify(asin, payload["title"], payload["updated_at"], self._versions[asin], delta)
+        return len(fresh)
+
+    def __contains__(self, asin: str) -> bool:
+        return asin in self.data
+
+    def asins(self) -> List[str]:
+        return list(self.data.keys())
+
+    def version(self, asin: Optional[str] = None) -> Optional[int]:
+        return self._version_total if asin is None else self._versions.get(asin)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        summaries = []
+        # Under the lock so each summary's counts match its version
+        with self._lock:
+            for asin, payload in self.data.items():
+                agg = self._aggregates[asin]
+                summaries.append({
+                    "asin": asin,
+                    "title": payload.get("title", asin),
+                    "updated_at": payload.get("updated_at"),
+                    "review_count": agg.review_count,
+                    "counts": dict(agg.counts),
+                    "version": self._versions.get(asin, 0),
+                })
+        return summaries
+
+    def product(self, asin: str) -> Optional[Dict[str, Any]]:
+        return self.data.get(asin)
+
+    def iter_results(self, asin: str) -> Iterator[Dict[str, Any]]:
+        return iter(self.data[asin]["results"])
+
+    def reviews_at(self, asin: str, positions: Sequence[int]) -> List[Dict[str, Any]]:
+        results = self.data[asin]["results"]
+        return [results[p] for p in positions]
+
+    def scan(self, asin: str, start: int = 0, where: Optional[ReviewFilter] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        results = self.data[asin]["results"]
+        # The list only grows, so positions stay valid while ingest appends to it
+        for position in range(start, len(results)):
+            r = results[position]
+            if where is None or where.matches(r):
+                yield position, r
+
+    def aggregates(self, asin: str, rollups: Sequence[str] = GRANULARITIES) -> ProductAggregates:
+        # Copied under the lock: the live aggregates change with every ingest
+        with self._lock:
+            return self._aggregates[asin].copy(rollups)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    asin TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    positive INTEGER NOT NULL DEFAULT 0,
+    neutral INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    asin TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    text TEXT NOT NULL,
+    date TEXT,
+    day TEXT NOT NULL,
+    country TEXT,
+    fingerprint BLOB
+);
+CREATE INDEX IF NOT EXISTS reviews_asin ON reviews (asin);
+-- _migrate adds a unique (asin, fingerprint) index, so the database itself dedupes
+-- reviews written by several processes sharing the file
+CREATE INDEX IF NOT EXISTS reviews_asin_day ON reviews (asin, day);
+CREATE INDEX IF NOT EXISTS reviews_asin_country ON reviews (asin, country);
+-- Per-ASIN sentiment counts by normalized date ('date') or country ('country').
+-- Country keys are JSON-encoded so a missing country (null) is a key too;
+-- seq records first-seen order. Trend rollups use dims 'day', 'week' and
+-- 'month', with the confidence sum (in millionths) as one more "sentiment".
+CREATE TABLE IF NOT EXISTS buckets (
+    asin TEXT NOT NULL,
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (asin, dim, key, sentiment)
+) WITHOUT ROWID;
+"""
+
+_UPSERT_BUCKET = """
+INSERT INTO buckets (asin, dim, key, sentiment, n, seq) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (asin, dim, key, sentiment) DO UPDATE SET n = n + excluded.n
+"""
+
+
+class SQLiteStore(ReviewStore):
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the FastAPI threadpool, serialized by a lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        # Per-ASIN fingerprint sets, loaded from the reviews table on first use
+        self._fingerprints: Dict[str, Set[bytes]] = {}
+
+    def _migrate(self) -> None:
+        if "version" not in {r["name"] for r in self._conn.execute("PRAGMA table_info(products)")}:
+            self._conn.execute("ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('store_id', ?)", (uuid.uuid4().hex[:12],))
+        self.store_id = self._conn.execute("SELECT value FROM meta WHERE key = 'store_id'").fetchone()[0]
+        columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(reviews)")}
+        if "fingerprint" not in columns:
+            self._conn.execute("ALTER TABLE reviews ADD COLUMN fingerprint BLOB")
+            rows = self._conn.execute("SELECT id, text, date, country FROM reviews").fetchall()
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE reviews SET fingerprint = ? WHERE id = ?",
+                [(review_fingerprint(dict(r)), r["id"]) for r in rows],
+            )
+            self._conn.execute("COMMIT")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Version 1 added trend rollups; backfill them for older databases
+            rows = []
+            for (asin,) in self._conn.execute("SELECT asin FROM products").fetchall():
+                reviews = self._conn.execute(
+                    "SELECT sentiment, confidence, day FROM reviews WHERE asin = ? ORDER BY id", (asin,))
+                agg = ProductAggregates.from_results(dict(r) for r in reviews)
+                rows.extend(self._rollup_rows(asin, agg))
+            self._conn.execute("BEGIN")
+            self._conn.executemany(_UPSERT_BUCKET, rows)
+            self._conn.execute("PRAGMA user_version = 1")
+            self._conn.execute("COMMIT")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 2:
+            # Version 2 makes (asin, fingerprint) unique; drop duplicates that processes
+            # sharing the file could store before, and recount their products
+            self._conn.execute("BEGIN IMMEDIATE")
+            asins = [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT asin FROM reviews WHERE fingerprint IS NOT NULL "
+                "AND id NOT IN (SELECT MIN(id) FROM reviews WHERE fingerprint IS NOT NULL GROUP BY asin, fingerprint)")]
+            for asin in asins:
+                self._conn.execute(
+                    "DELETE FROM reviews WHERE asin = ? AND fingerprint IS NOT NULL AND id NOT IN "
+                    "(SELECT MIN(id) FROM reviews WHERE asin = ? GROUP BY fingerprint)", (asin, asin))
+                self._recount(asin)
+            self._conn.execute("DROP INDEX IF EXISTS reviews_asin_fingerprint")
+            self._conn.execute("CREATE UNIQUE INDEX reviews_asin_fingerprint ON reviews (asin, fingerprint)")
+            self._conn.execute("PRAGMA user_version = 2")
+            self._conn.execute("COMMIT")
+
+    def _recount(self, asin: str) -> None:
+        """Rebuild ``asin``'s counts and buckets from its reviews (inside a transaction)."""
+        reviews = self._conn.execute(
+            "SELECT sentiment, confidence, day, country FROM reviews WHERE asin = ? ORDER BY id", (asin,))
+        agg = ProductAggregates.from_results(dict(r) for r in reviews)
+        self._conn.execute(
+            "UPDATE products SET review_count = ?, positive = ?, neutral = ?, negative = ? WHERE asin = ?",
+            (agg.review_count, agg.counts["POSITIVE"], agg.counts["NEUTRAL"], agg.counts["NEGATIVE"], asin),
+        )
+        self._conn.execute("DELETE FROM buckets WHERE asin = ?", (asin,))
+        self._conn.executemany(_UPSERT_BUCKET, self._bucket_rows(asin, agg, 0) + self._rollup_rows(asin, agg))
+
+    @staticmethod
+    def _bucket_rows(asin: str, agg: ProductAggregates, seq: int) -> List[Tuple]:
+        # Date and country buckets, numbered in first-seen order after seq
+        rows = []
+        for dim, buckets, encode in (
+            ("date", agg.by_date, str),
+            ("country", agg.by_country, json.dumps),
+        ):
+            for i, (key, bucket) in enumerate(buckets.items()):
+                for sentiment, n in bucket.items():
+                    if n:
+                        rows.append((asin, dim, encode(key), sentiment, n, seq + i + 1))
+        return rows
+
+    @staticmethod
+    def _rollup_rows(asin: str, agg: ProductAggregates) -> List[Tuple]:
+        return [
+            (asin, granularity, period, key, n, 0)
+            for granularity in GRANULARITIES
+            for period, bucket in agg.rollups[granularity].items()
+            for key, n in bucket.items()
+            if n
+        ]
+
+    def _seen(self, asin: str) -> Set[bytes]:
+        seen = self._fingerprints.get(asin)
+        if seen is None:
+            rows = self._conn.execute("SELECT fingerprint FROM reviews WHERE asin = ?", (asin,))
+            seen = self._fingerprints[asin] = {r[0] for r in rows}
+        return seen
+
+    @staticmethod
+    def _stored_fingerprints(cur: sqlite3.Cursor, asin: str, fingerprints: List[bytes]) -> Set[bytes]:
+        stored = set()
+        for i in range(0, len(fingerprints), 500):
+            chunk = fingerprints[i:i + 500]
+            rows = cur.execute(
+                f"SELECT fingerprint FROM reviews WHERE asin = ? AND fingerprint IN ({', '.join('?' * len(chunk))})",
+                (asin, *chunk),
+            )
+            stored.update(r[0] for r in rows)
+        return stored
+
+    def add_results(self, asin: str, title: str, results: List[Dict[str, Any]]) -> int:
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            seen = self._seen(asin)
+            # The set is only a fast path: other processes may share the database file
+            fresh = _unseen(results, seen)
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                # Under the database write lock, so no other process can store these meanwhile
+                stored = self._stored_fingerprints(cur, asin, [fp for fp, _ in fresh])
+                if stored:
+                    fresh = [(fp, r) for fp, r in fresh if fp not in stored]
+                for _, r in fresh:
+                    r["day"] = normalize_date(r.get("date"))
+                delta = ProductAggregates()
+                delta.add(r for _, r in fresh)
+                cur.execute(
+                    "INSERT INTO products (asin, title, updated_at, version) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (asin) DO UPDATE SET title = CASE WHEN excluded.title != '' "
+                    "THEN excluded.title ELSE title END, updated_at = excluded.updated_at, version = version + 1",
+                    (asin, title, now),
+                )
+                seq = cur.execute("SELECT COALESCE(MAX(id), 0) FROM reviews").fetchone()[0]
+                cur.executemany(
+                    "INSERT OR IGNORE INTO reviews (asin, sentiment, confidence, text, date, day, country, fingerprint) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (asin, r["sentiment"], r["confidence"], r["text"], r.get("date"), r["day"], r.get("country"), fp)
+                        for fp, r in fresh
+                    ],
+                )
+                cur.execute(
+                    "UPDATE products SET review_count = review_count + ?, positive = positive + ?, "
+                    "neutral = neutral + ?, negative = negative + ? WHERE asin = ?",
+                    (delta.review_count, delta.counts["POSITIVE"], delta.counts["NEUTRAL"], delta.counts["NEGATIVE"], asin),
+                )
+                cur.executemany(_UPSERT_BUCKET, self._bucket_rows(asin, delta, seq) + self._rollup_rows(asin, delta))
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                seen.difference_update(fp for fp, _ in fresh)
+                raise
+            if self.index is not None:
+                # Inserted under the write lock, so the new rows got ids seq + 1, seq + 2, ...
+                self.index.add(asin, [(seq + 1 + i, r) for i, (_, r) in enumerate(fresh)])
+            if self._listeners:
+                row = cur.execute("SELECT title, updated_at, version FROM products WHERE asin = ?", (asin,)).fetchone()
+                self._notify(asin, row["title"], row["updated_at"], row["version"], delta)
+        return len(fresh)
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def __contains__(self, asin: str) -> bool:
+        return bool(self._query("SELECT 1 FROM products WHERE asin = ?", (asin,)))
+
+    def asins(self) -> List[str]:
+        return [r["asin"] for r in self._query("SELECT asin FROM products ORDER BY rowid")]
+
+    def version(self, asin: Optional[str] = None) -> Optional[int]:
+        if asin is None:
+            return self._query("SELECT COALESCE(SUM(version), 0) FROM products")[0][0]
+        rows = self._query("SELECT version FROM products WHERE asin = ?", (asin,))
+        return rows[0][0] if rows else None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "asin": r["asin"],
+                "title": r["title"],
+                "updated_at": r["updated_at"],
+                "review_count": r["review_count"],
+                "counts": {"POSITIVE": r["positive"], "NEUTRAL": r["neutral"], "NEGATIVE": r["negative"]},
+                "version": r["version"],
+            }
+            for r in self._query("SELECT * FROM products ORDER BY rowid")
+        ]
+
+    def product(self, asin: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT title, updated_at FROM products WHERE asin = ?", (asin,))
+        if not rows:
+            return None
+        results = (r for _, r in self.scan(asin))
+        return {"title": rows[0]["title"], "results": results, "updated_at": rows[0]["updated_at"]}
+
+    def iter_results(self, asin: str) -> Iterator[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT sentiment, confidence, text, date, country, day FROM reviews WHERE asin = ? ORDER BY id",
+            (asin,),
+        )
+        return (dict(r) for r in rows)
+
+    # Rows fetched per query while scanning, so the lock is never held for a whole ASIN
+    SCAN_BATCH = 500
+
+    def scan(self, asin: str, start: int = 0, where: Optional[ReviewFilter] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # Positions are review ids: unique and increasing, though not contiguous
+        clauses, params = ["asin = ?", "id >= ?"], [asin, start]
+        if where is not None:
+            if where.sentiments is not None:
+                clauses.append(f"sentiment IN ({', '.join('?' * len(where.sentiments))})")
+                params.extend(where.sentiments)
+            if where.countries is not None:
+                clauses.append(f"country IN ({', '.join('?' * len(where.countries))})")
+                params.extend(where.countries)
+            if where.has_day_range:
+                clauses.append("day GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'")
+            if where.day_from is not None:
+                clauses.append("day >= ?")
+                params.append(where.day_from)
+            if where.day_to is not None:
+                clauses.append("day <= ?")
+                params.append(where.day_to)
+        sql = (
+            "SELECT id, sentiment, confidence, text, date, country, day FROM reviews "
+            f"WHERE {' AND '.join(clauses)} ORDER BY id LIMIT {self.SCAN_BATCH}"
+        )
+        while True:
+            rows = self._query(sql, params)
+            for r in rows:
+                review = dict(r)
+                yield review.pop("id"), review
+            if len(rows) < self.SCAN_BATCH:
+                return
+            params[1] = rows[-1]["id"] + 1
+
+    def reviews_at(self, asin: str, positions: Sequence[int]) -> List[Dict[str, Any]]:
+        found = {}
+        for i in range(0, len(positions), self.SCAN_BATCH):
+            chunk = positions[i:i + self.SCAN_BATCH]
+            rows = self._query(
+                "SELECT id, sentiment, confidence, text, date, country, day FROM reviews "
+                f"WHERE asin = ? AND id IN ({', '.join('?' * len(chunk))})",
+                (asin, *chunk),
+            )
+            for r in rows:
+                review = dict(r)
+                found[review.pop("id")] = review
+        return [found[p] for p in positions]
+
+    def aggregates(self, asin: str, rollups: Sequence[str] = GRANULARITIES) -> ProductAggregates:
+        agg = ProductAggregates()
+        product = self._query("SELECT * FROM products WHERE asin = ?", (asin,))
+        if not product:
+            return agg
+        agg.review_count = product[0]["review_count"]
+        agg.counts = {"POSITIVE": product[0]["positive"], "NEUTRAL": product[0]["neutral"], "NEGATIVE": product[0]["negative"]}
+        dims = ("date", "country", *(g for g in rollups if g in GRANULARITIES))
+        rows = self._query(
+            f"SELECT dim, key, sentiment, n FROM buckets WHERE asin = ? AND dim IN ({', '.join('?' * len(dims))}) ORDER BY seq",
+            (asin, *dims),
+        )
+        for r in rows:
+            if r["dim"] == "date":
+                buckets, key = agg.by_date, r["key"]
+            elif r["dim"] == "country":
+                buckets, key = agg.by_country, json.loads(r["key"])
+            else:
+                buckets, key = agg.rollups[r["dim"]], r["key"]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {s: 0 for s in SENTIMENTS}
+                if r["dim"] in GRANULARITIES:
+                    bucket[CONFIDENCE_KEY] = 0
+            bucket[r["sentiment"]] = r["n"]
+        return agg
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def make_store() -> ReviewStore:
+    kind = os.environ.get("REVIEW_STORE", "sqlite").lower()
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "sqlite":
+        return SQLiteStore(os.environ.get("REVIEW_DB_PATH", DEFAULT_DB_PATH))
+    if kind == "columnar":
+        from columnar_store import ColumnarStore
+
+        return ColumnarStore(
+            os.environ.get("REVIEW_DATA_DIR") or None,
+            snapshot_wal_bytes=int(float(os.environ.get("SNAPSHOT_WAL_MB", "64")) * 1024 * 1024),
+            fsync=os.environ.get("WAL_FSYNC", "1") != "0",
+        )
+    if kind == "remote":
+        from shared_store import DEFAULT_SOCKET, RemoteStore
+
+        return RemoteStore(os.environ.get("STORE_SOCKET", str(DEFAULT_SOCKET)))
+    raise ValueError(f"Unknown REVIEW_STORE {kind!r} (expected 'sqlite', 'memory', 'columnar' or 'remote')")
@@ -0,0 +1,37 @@
+import pytest
+
+from benchmarks.synthetic import review_results
+from columnar_store import ColumnarStore
+
+ASIN = "B000000001"
+
+
+def test_failed_log_write_keeps_mapped_fingerprints(tmp_path):
+    store = ColumnarStore(data_dir=tmp_path)
+    stored = review_results(200, seed=1)
+    assert store.add_results(ASIN, "title", [dict(r) for r in stored]) == 200
+    store.close()
+
+    # Restored from the snapshot: the ASIN's fingerprints are still memory-mapped
+    store = ColumnarStore(data_dir=tmp_path)
+
+    def fail(record):
+        raise OSError("disk full")
+
+    append = store._wal.append
+    store._wal.append = fail
+    with pytest.raises(OSError):
+        store.add_results(ASIN, "title", review_results(10, seed=2))
+    store._wal.append = append
+
+    # Reviews already on disk are still recognized, and the failed ones were not kept
+    assert store.add_results(ASIN, "title", [dict(r) for r in stored]) == 0
+    assert store.add_results(ASIN, "title", review_results(10, seed=2)) == 10
+    store.snapshot()
+    store.close()
+
+    store = ColumnarStore(data_dir=tmp_path)
+    assert store.summaries()[0]["review_count"] == 210
+    assert store.add_results(ASIN, "title", [dict(r) for r in stored]) == 0
+    assert store.check_aggregates() == {}
+    store.close()
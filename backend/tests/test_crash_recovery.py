@@ -0,0 +1,67 @@
+import signal
+import socket
+import threading
+import time
+
+import httpx
+
+from benchmarks.crash_recovery import identity, start_server, stored_reviews
+from benchmarks.synthetic import review_results
+
+ASINS = [f"B{i:09d}" for i in range(3)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_acknowledged_writes_survive_sigkill(tmp_path):
+    port = free_port()
+    # A small log budget, so the kill can also land during a snapshot
+    proc, url, _ = start_server(port, str(tmp_path), snapshot_mb=0.05)
+    acked = {asin: set() for asin in ASINS}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(w: int) -> None:
+        with httpx.Client(timeout=10) as client:
+            n = 0
+            while not stop.is_set():
+                n += 1
+                asin = ASINS[n % len(ASINS)]
+                batch = review_results(20, seed=w * 100_000 + n)
+                for j, r in enumerate(batch):
+                    r["text"] = f"{r['text']} (writer {w} batch {n} #{j})"
+                try:
+                    client.post(url + "/ingest_results", json={"asin": asin, "title": "", "results": batch}).raise_for_status()
+                except httpx.HTTPError:
+                    return
+                with lock:
+                    acked[asin].update(map(identity, batch))
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(2)]
+    try:
+        for t in threads:
+            t.start()
+        time.sleep(1.5)
+        proc.send_signal(signal.SIGKILL)
+        proc.wait()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    proc, url, _ = start_server(port, str(tmp_path), snapshot_mb=0.05)
+    try:
+        assert any(acked.values())
+        for asin in ASINS:
+            reviews = stored_reviews(url, asin)
+            assert len(reviews) == len(set(reviews)), f"{asin} has duplicated reviews"
+            assert not acked[asin] - set(reviews), f"{asin} lost acknowledged reviews"
+        check = httpx.get(url + "/aggregates/check", timeout=60).json()
+        assert check["ok"], check["mismatches"]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
@@ -0,0 +1,63 @@
+import os
+import stat
+import threading
+import time
+from multiprocessing.connection import Client
+
+import pytest
+
+import shared_store
+from benchmarks.synthetic import review_results
+from shared_store import RemoteError, RemoteStore, StoreServer
+from storage import MemoryStore
+
+ASIN = "B000000001"
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = StoreServer(MemoryStore(), str(tmp_path / "store.sock"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.close()
+
+
+def test_socket_is_private(server):
+    # No access for group or others, from the moment it exists
+    assert stat.S_IMODE(os.stat(server.address).st_mode) & 0o077 == 0
+
+
+def test_errors_reach_the_caller(server):
+    class Unpicklable(Exception):
+        def __reduce__(self):
+            raise TypeError("cannot pickle")
+
+    def fail():
+        raise Unpicklable("bad state")
+
+    server._handlers["fail"] = fail
+    store = RemoteStore(server.address)
+    with pytest.raises(KeyError):
+        store.aggregates(ASIN)
+    with pytest.raises(RemoteError, match="Unpicklable: bad state"):
+        store._call("fail")
+    # The connection survived both errors
+    assert store.add_results(ASIN, "title", review_results(3, seed=1)) == 3
+    store.close()
+
+
+def test_stalled_subscriber_is_disconnected(server, monkeypatch):
+    monkeypatch.setattr(shared_store, "SUBSCRIBER_QUEUE", 5)
+    stalled = Client(server.address, family="AF_UNIX")
+    stalled.send("subscribe")
+    assert stalled.recv() == "subscribed"
+    store = RemoteStore(server.address)
+    for i in range(200):
+        store.add_results(ASIN, "title", review_results(1, seed=i))
+    assert server._subscribers == []
+    # What was queued before the drop still arrives, then the feed ends
+    with pytest.raises(EOFError):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            stalled.recv()
+    store.close()
@@ -0,0 +1,43 @@
+import sqlite3
+
+from benchmarks.synthetic import review_results
+from storage import SQLiteStore
+
+ASIN = "B000000001"
+
+
+def test_stores_sharing_a_file_store_each_review_once(tmp_path):
+    path = tmp_path / "reviews.db"
+    # Two stores on one file, like uvicorn workers or an ingest script next to the server
+    first, second = SQLiteStore(path), SQLiteStore(path)
+    assert second.add_results(ASIN, "title", review_results(5, seed=1)) == 5
+    reviews = review_results(100, seed=2)
+    assert first.add_results(ASIN, "title", [dict(r) for r in reviews]) == 100
+    # second loaded its fingerprints before first's write
+    assert second.add_results(ASIN, "title", [dict(r) for r in reviews]) == 0
+    assert second.summaries()[0]["review_count"] == 105
+    assert second.check_aggregates() == {}
+    first.close()
+    second.close()
+
+
+def test_migration_drops_duplicates_stored_before_the_unique_index(tmp_path):
+    path = tmp_path / "reviews.db"
+    store = SQLiteStore(path)
+    store.add_results(ASIN, "title", review_results(50, seed=3))
+    store.close()
+    # Duplicate every review the way two processes could before version 2
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("DROP INDEX reviews_asin_fingerprint")
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute(
+        "INSERT INTO reviews (asin, sentiment, confidence, text, date, day, country, fingerprint) "
+        "SELECT asin, sentiment, confidence, text, date, day, country, fingerprint FROM reviews")
+    conn.execute("UPDATE products SET review_count = review_count * 2")
+    conn.close()
+
+    store = SQLiteStore(path)
+    assert store.summaries()[0]["review_count"] == 50
+    assert store.check_aggregates() == {}
+    assert store.add_results(ASIN, "title", review_results(50, seed=3)) == 0
+    store.close()
@@ -0,0 +1,78 @@
+"""Append-only, checksummed log of store writes (see columnar_store.py).
+
+Each record is one JSON object framed by its byte length and CRC32. It is
+appended, and unless ``fsync=False`` fsynced, before the write it describes
+is applied or acknowledged, so replaying the log over the last snapshot
+gives back every acknowledged write. A crash mid-append leaves a torn final
+record, which ``replay`` cuts off the file.
+"""
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+
+# Payload length and CRC32, little-endian
+_HEADER = struct.Struct("<II")
+
+
+def fsync_dir(path: Union[str, Path]) -> None:
+    """Make file creations, renames and removals in directory ``path`` durable."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    def __init__(self, path: Union[str, Path], fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        created = not self.path.exists()
+        self._file = open(self.path, "ab")
+        self.size = self._file.tell()
+        if created and fsync:
+            fsync_dir(self.path.parent)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        # One write per record, so a crash can only tear the last one
+        self._file.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.size += _HEADER.size + len(payload)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def replay(path: Union[str, Path], truncate: bool = True) -> Iterator[Dict[str, Any]]:
+    """The records of the log at ``path``, in order.
+
+    A short or corrupt record ends the log: with ``truncate`` the file is cut
+    back to the last good record (the tail a crash tore); otherwise it raises
+    ``ValueError``, for logs that were closed cleanly and must be whole.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        body = offset + _HEADER.size
+        if body > len(data):
+            break
+        length, crc = _HEADER.unpack_from(data, offset)
+        payload = data[body:body + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        yield json.loads(payload)
+        offset = body + length
+    if offset < len(data):
+        if not truncate:
+            raise ValueError(f"{path}: corrupt record at byte {offset}")
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
@@ -1,6 +1,7 @@
 // === CONFIG ===
 const API_URL = "https://amazon-reviews-sentiment-analyser-backend.onrender.com/"; // changed to deployed URL
 const BATCH_SIZE = 10;
+const INGEST_RETRIES = 3; // resends of an ingest the backend answered 429 (queue full)
 const CONF_LABEL_KEY = "data-sentiment-labeled";
 
 const REVIEW_SELECTORS = [
@@ -156,23 +157,35 @@ function storeResultsForPopup(results) {
   const asin = findProductASIN();
   const title = findProductTitle();
   if (asin) {
-    fetch(`${API_URL}/ingest_results`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ asin, title, results })
-    }).then(r => {
-      if (!r.ok) throw new Error(`Ingest failed ${r.status}`);
-      return r.json();
-    }).then(j => {
-      console.log(`Ingested ${j.stored} results to backend for ${asin}`);
-    }).catch(err => {
-      console.warn("Ingest to backend failed:", err);
-    });
+    // The backend scores and stores the raw reviews itself, after answering
+    const reviews = results.map(({ text, date, country }) => ({ text, date, country }));
+    ingestReviews(asin, title, reviews, INGEST_RETRIES);
   } else {
     console.warn("ASIN not found; skipping backend ingestion");
   }
 }
 
+function ingestReviews(asin, title, reviews, retries) {
+  fetch(`${API_URL}/ingest_reviews`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ asin, title, reviews })
+  }).then(r => {
+    if (r.status === 429 && retries > 0) {
+      // Ingest queue is full; try again once it had time to drain
+      const wait = Number(r.headers.get("Retry-After")) || 1;
+      setTimeout(() => ingestReviews(asin, title, reviews, retries - 1), wait * 1000);
+      return null;
+    }
+    if (!r.ok) throw new Error(`Ingest failed ${r.status}`);
+    return r.json();
+  }).then(j => {
+    if (j) console.log(`Queued ${j.accepted} reviews for backend ingestion of ${asin}`);
+  }).catch(err => {
+    console.warn("Ingest to backend failed:", err);
+  });
+}
+
 async function fetchBatch(texts) {
   try {
     const res = await fetch(`${API_URL}/predict_batch`, {